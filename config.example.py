@@ -65,6 +65,12 @@ class Config:
 
     #: Postgres credentials
     POSTGRES = {}
+
+    #: Credentials of Postgres read replicas, in the same format as POSTGRES
+    POSTGRES_REPLICAS = []
+
+    #: Seconds of replication lag after which a replica stops being read from
+    POSTGRES_REPLICA_MAX_LAG = 5
     
     #: Shared secret for LVSP
     LVSP_SECRET = ""
@@ -75,6 +81,63 @@ class Config:
     #: Secret for various things
     SECRET_KEY = "secret"
 
+    #: How many recent messages to keep in memory per channel
+    MESSAGE_CACHE_CHANNEL_SIZE = 100
+
+    #: How many messages to keep in memory across all channels
+    MESSAGE_CACHE_MAX_MESSAGES = 50000
+
+    #: How many messages to index for search in one query
+    SEARCH_INDEX_BATCH_SIZE = 500
+
+    #: How often (in seconds) queued messages get indexed for search
+    SEARCH_INDEX_INTERVAL = 0.5
+
+    #: How many guilds to keep member name indexes of, for member queries
+    MEMBER_NAME_INDEX_MAX_GUILDS = 1000
+
+    #: How many guilds to keep roles, emojis, vanity code and features of
+    GUILD_SNAPSHOT_MAX_GUILDS = 5000
+
+    #: How long (in seconds) member list updates are held so they can be
+    #: merged into one GUILD_MEMBER_LIST_UPDATE, 0 sends them right away
+    LAZY_GUILD_COALESCE_WINDOW = 0.1
+
+    #: Past this many merged operations, SYNC the affected ranges instead
+    LAZY_GUILD_COALESCE_MAX_OPS = 20
+
+    #: Approximate memory (in bytes) member lists can take before idle
+    #: lists start getting evicted, least recently used first
+    LAZY_GUILD_MEMORY_BUDGET = 256 * 1024 * 1024
+
+    #: Presence changes of a user within this many seconds of each
+    #: other are dispatched once, 0 dispatches every change
+    PRESENCE_DEBOUNCE_WINDOW = 0.25
+
+    #: How long (in seconds) a user stays typing after triggering it
+    TYPING_TTL = 10
+
+    #: Repeat typing triggers only dispatch TYPING_START again
+    #: once this many seconds passed since the last one
+    TYPING_REDISPATCH_INTERVAL = 8
+
+    #: Max TYPING_STARTs dispatched per second in a single channel,
+    #: 0 for no limit
+    TYPING_CHANNEL_RATE = 0
+
+    #: How ratelimits are enforced:
+    #:  - "bucket": token buckets, per process
+    #:  - "gcra": GCRA, per process
+    #:  - "shared": GCRA in shared memory, the same for every worker
+    RATELIMIT_BACKEND = "bucket"
+
+    #: Name of the shared memory block used by the "shared" backend
+    RATELIMIT_SHM_NAME = "litecord_ratelimits"
+
+    #: How many keys the GCRA backends can hold (16 bytes each), keys
+    #: past that are let through without being limited
+    RATELIMIT_SLOTS = 1 << 18
+
 
 class Development(Config):
     DEBUG = True
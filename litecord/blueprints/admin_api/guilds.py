@@ -17,7 +17,9 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
-from quart import Blueprint, jsonify
+import json
+
+from quart import Blueprint, jsonify, stream_with_context
 from typing import List, TYPE_CHECKING
 
 from litecord.auth import admin_check
@@ -27,7 +29,8 @@ from litecord.schemas import validate
 from litecord.admin_schemas import GUILD_UPDATE, FEATURES
 from litecord.common.guilds import delete_guild
 from litecord.errors import NotFound
-from litecord.utils import extract_limit
+from litecord.json import LitecordJSONEncoder
+from litecord.utils import extract_limit, str_bool
 
 if TYPE_CHECKING:
     from litecord.typing_hax import app, request
@@ -76,6 +79,7 @@ async def _update_features(guild_id: int, features: list):
         features,
         guild_id,
     )
+    app.storage.invalidate_guild(guild_id)
 
     guild = await app.storage.get_guild_full(guild_id)
     await app.dispatcher.guild.dispatch(guild_id, ("GUILD_UPDATE", guild))
@@ -192,6 +196,43 @@ async def delete_guild_as_admin(guild_id):
     return "", 204
 
 
+@bp.route("/<int:guild_id>/members", methods=["GET"])
+async def get_guild_members(guild_id: int):
+    """Get the members of a guild, paginated by user ID.
+
+    With ?stream=true, every member is sent as a single JSON array
+    that is written as it is read from the database.
+    """
+    await admin_check()
+
+    args = request.args.to_dict()
+    if str_bool(args.pop("stream", False)):
+
+        @stream_with_context
+        async def _stream():
+            yield "["
+            first = True
+            async for member in app.storage.iter_members(guild_id):
+                yield ("" if first else ",") + json.dumps(
+                    member, cls=LitecordJSONEncoder
+                )
+                first = False
+            yield "]"
+
+        return app.response_class(_stream(), mimetype="application/json")
+
+    j = validate(
+        args,
+        {
+            "limit": {"coerce": int, "min": 1, "max": 1000, "default": 1000},
+            "after": {"coerce": int, "min": 0, "default": 0},
+        },
+    )
+
+    members = await app.storage.get_member_page(guild_id, j["limit"], j["after"])
+    return jsonify(members)
+
+
 @bp.route("/<int:guild_id>/features", methods=["GET"])
 async def get_features(guild_id: int):
     """Get the feature list of a guild"""
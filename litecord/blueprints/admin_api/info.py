@@ -89,3 +89,22 @@ async def get_counts():
     counts = dict(counts)
     counts["private_channels"] = counts["dms"] + counts["group_dms"]
     return jsonify(counts)
+
+
+@bp.route("/metrics", methods=["GET"])
+async def get_metrics():
+    """Get statistics about the in-memory state of this instance."""
+    await admin_check()
+    return jsonify(
+        {
+            "message_cache": app.message_cache.stats(),
+            "statements": app.statements.stats(),
+            "replicas": app.replicas.stats(),
+            "search_index": app.search_indexer.stats(),
+            "member_names": app.storage.member_names.stats(),
+            "lazy_guilds": app.lazy_guild.stats(),
+            "presences": app.presence.stats(),
+            "typing": app.typing.stats(),
+            "ratelimits": app.ratelimiter.stats(),
+        }
+    )
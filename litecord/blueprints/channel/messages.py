@@ -43,7 +43,6 @@ from litecord.schemas import (
     USER_MENTION,
 )
 from litecord.utils import query_tuple_from_args, extract_limit, to_update, toggle_flag
-from litecord.json import pg_set_json
 from litecord.permissions import get_permissions
 
 from litecord.embed.sanitizer import fill_embed
@@ -79,22 +78,14 @@ async def message_search(
 ) -> List[dict]:
     user_id = await token_check()
 
-    where_clause = ""
-    if before:
-        where_clause += f"AND id < {before}"
-
-    elif after:
-        where_clause += f"AND id > {after}"
+    if before is None and after is None and order == "DESC":
+        rows = await app.storage.latest_message_rows(channel_id, limit)
+    else:
+        rows = await app.storage.channel_message_rows(
+            channel_id, limit, before, after, order
+        )
 
-    return await app.storage.get_messages(
-        user_id=user_id,
-        where_clause=f"""
-            WHERE channel_id = $1 {where_clause}
-            ORDER BY id {order}
-            LIMIT {limit}
-        """,
-        args=(channel_id,),
-    )
+    return await app.storage.hydrate_messages(rows, user_id)
 
 
 async def around_message_search(
@@ -108,15 +99,20 @@ async def around_message_search(
     user_id = await token_check()
     halved_limit = limit // 2
 
-    around_message = await app.storage.get_message(around_id, user_id)
-    around_message = [around_message] if around_message else []
-    before_messages = await message_search(
+    around_message = await app.storage.fetch_message_rows(
+        where_clause="WHERE id = $1 AND channel_id = $2",
+        args=(around_id, channel_id),
+    )
+    before_messages = await app.storage.channel_message_rows(
         channel_id, halved_limit, before=around_id, order="DESC"
     )
-    after_messages = await message_search(
+    after_messages = await app.storage.channel_message_rows(
         channel_id, halved_limit, after=around_id, order="ASC"
     )
-    return list(reversed(before_messages)) + around_message + after_messages
+
+    # hydrate the whole page at once
+    rows = list(reversed(before_messages)) + around_message + after_messages
+    return await app.storage.hydrate_messages(rows, user_id)
 
 
 @bp.route("/<int:channel_id>/messages", methods=["GET"])
@@ -313,8 +309,6 @@ async def create_message(
             mentions.append(reply_id)
 
     async with app.db.acquire() as conn:
-        await pg_set_json(conn)
-
         await conn.execute(
             """
             INSERT INTO messages (id, channel_id, guild_id, author_id,
@@ -341,6 +335,10 @@ async def create_message(
             mention_roles,
         )
 
+    await app.storage.bump_last_message(channel_id, message_id)
+    app.search_indexer.enqueue([message_id])
+    if author_id:
+        app.typing.stop(channel_id, author_id)
     return message_id
 
 
@@ -655,6 +653,10 @@ async def edit_message(channel_id, message_id):
             message_id,
         )
 
+    if updated or flags is not None:
+        app.message_cache.invalidate(message_id)
+        app.search_indexer.enqueue([message_id])
+
     message = await app.storage.get_message(message_id, user_id)
 
     # only dispatch MESSAGE_UPDATE if any update
@@ -667,8 +669,6 @@ async def edit_message(channel_id, message_id):
         message.get("flags", 0) & MessageFlags.crossposted == MessageFlags.crossposted
     ):
         async with app.db.acquire() as conn:
-            await pg_set_json(conn)
-
             guild_id = await app.storage.guild_from_channel(channel_id)
             message_reference = {
                 "guild_id": guild_id,
@@ -701,6 +701,8 @@ async def edit_message(channel_id, message_id):
                     args.append(embeds)
 
                 await conn.execute(query.format(""), *args)
+                app.message_cache.invalidate(id)
+                app.search_indexer.enqueue([id])
 
                 if refurl:
                     await _spawn_embed(
@@ -749,8 +751,6 @@ async def _del_msg_fkeys(message_id: int, channel_id: int):
 
     # handle crossposted messages >.<
     async with app.db.acquire() as conn:
-        await pg_set_json(conn)
-
         message_reference = {
             "guild_id": guild_id,
             "channel_id": channel_id,
@@ -776,6 +776,8 @@ async def _del_msg_fkeys(message_id: int, channel_id: int):
                 id,
                 row["flags"] | MessageFlags.source_message_deleted,
             )
+            app.message_cache.invalidate(id)
+            app.search_indexer.enqueue([id])
 
             message = await app.storage.get_message(id)
             await app.dispatcher.channel.dispatch(
@@ -800,6 +802,8 @@ async def _del_msg_fkeys(message_id: int, channel_id: int):
             message_id,
         )
 
+    app.search_indexer.discard([message_id])
+
 
 @bp.route("/<int:channel_id>/messages/<int:message_id>", methods=["DELETE"])
 async def delete_message(channel_id, message_id):
@@ -831,6 +835,8 @@ async def delete_message(channel_id, message_id):
     """,
         message_id,
     )
+    app.message_cache.delete(message_id)
+    await app.storage.fix_last_message(channel_id, [message_id])
 
     await app.dispatcher.channel.dispatch(
         channel_id,
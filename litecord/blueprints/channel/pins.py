@@ -111,6 +111,8 @@ async def add_pin(channel_id, message_id):
         channel_id,
         message_id,
     )
+    app.message_cache.update(message_id, lambda row: row.update(pinned=message_id))
+    app.search_indexer.enqueue([message_id])
 
     await _dispatch_pins_update(channel_id)
 
@@ -136,6 +138,8 @@ async def delete_pin(channel_id, message_id):
         channel_id,
         message_id,
     )
+    app.message_cache.update(message_id, lambda row: row.update(pinned=None))
+    app.search_indexer.enqueue([message_id])
 
     await _dispatch_pins_update(channel_id)
 
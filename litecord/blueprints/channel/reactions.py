@@ -166,6 +166,15 @@ async def add_reaction(channel_id: int, message_id: int, emoji: str):
         emoji_id,
         emoji_text,
     )
+    app.message_cache.update(
+        message_id,
+        lambda row: row.update(
+            reactions=[
+                *row["reactions"],
+                (user_id, int(emoji_type), emoji_id, emoji_text),
+            ]
+        ),
+    )
 
     partial = partial_emoji(emoji_type, emoji_id, emoji_name)
     payload = _make_payload(user_id, channel_id, message_id, partial)
@@ -228,6 +237,19 @@ async def _remove_reaction(channel_id: int, message_id: int, user_id: int, emoji
         main_emoji,
     )
 
+    def _remove_from_row(row):
+        row["reactions"] = [
+            reaction
+            for reaction in row["reactions"]
+            if not (
+                reaction[0] == user_id
+                and reaction[1] == emoji_type
+                and main_emoji in (reaction[2], reaction[3])
+            )
+        ]
+
+    app.message_cache.update(message_id, _remove_from_row)
+
     partial = partial_emoji(emoji_type, emoji_id, emoji_name)
     payload = _make_payload(user_id, channel_id, message_id, partial)
 
@@ -312,6 +334,7 @@ async def remove_all_reactions(channel_id, message_id):
     """,
         message_id,
     )
+    app.message_cache.update(message_id, lambda row: row.update(reactions=[]))
 
     payload = {"channel_id": str(channel_id), "message_id": str(message_id)}
 
@@ -49,7 +49,6 @@ from litecord.blueprints.dm_channels import (
     gdm_destroy,
 )
 from litecord.utils import str_bool, to_update
-from litecord.json import pg_set_json
 from litecord.embed.messages import process_url_embed, msg_update_embeds
 from litecord.pubsub.user import dispatch_user
 from litecord.permissions import get_permissions, Target
@@ -183,6 +182,7 @@ async def _delete_messages(channel_id):
     """,
         channel_id,
     )
+    app.message_cache.delete_channel(channel_id)
 
 
 async def _guild_cleanup(channel_id):
@@ -194,14 +194,19 @@ async def _guild_cleanup(channel_id):
         channel_id,
     )
 
-    await app.db.execute(
+    guild_id = await app.db.fetchval(
         """
     DELETE FROM invites
     WHERE channel_id = $1
+    RETURNING guild_id
     """,
         channel_id,
     )
 
+    # it might have been the vanity invite
+    if guild_id is not None:
+        app.storage.invalidate_guild(guild_id)
+
     await app.db.execute(
         """
     DELETE FROM webhooks
@@ -296,6 +301,7 @@ async def close_channel(channel_id):
         """,
             channel_id,
         )
+        app.storage.drop_channel_route(channel_id)
 
         # clean its member list representation
         app.lazy_guild.remove_channel(channel_id)
@@ -467,6 +473,7 @@ async def delete_channel_overwrite(channel_id: int, overwrite_id: int):
         perms = await get_permissions(user_id, channel_id)
         await _dispatch_action(guild_id, channel_id, user_id, perms)
 
+    await app.lazy_guild.chan_update(channel_id)
     await _mass_chan_update(guild_id, [channel_id])
     return "", 204
 
@@ -593,6 +600,7 @@ async def _update_text_channel(channel_id: int, j: dict, _user_id: int):
             j["type"],
             channel_id,
         )
+        app.storage.drop_channel_route(channel_id)
 
         await app.db.execute(
             f"""
@@ -714,6 +722,10 @@ async def trigger_typing(channel_id):
     user_id = await token_check()
     ctype, guild_id = await channel_check(user_id, channel_id)
 
+    # repeat triggers only keep the user typing
+    if not app.typing.start(channel_id, user_id):
+        return "", 204
+
     await app.dispatcher.channel.dispatch(
         channel_id,
         (
@@ -853,6 +865,7 @@ async def _msg_update_flags(message_id: int, flags: int):
         flags,
         message_id,
     )
+    app.message_cache.invalidate(message_id)
 
 
 async def _msg_get_flags(message_id: int):
@@ -1017,8 +1030,6 @@ async def publish_message(channel_id: int, message_id: int):
         result_id = app.winter_factory.snowflake()
 
         async with app.db.acquire() as conn:
-            await pg_set_json(conn)
-
             await conn.execute(
                 """
                 INSERT INTO messages (id, channel_id, guild_id,
@@ -1049,6 +1060,8 @@ async def publish_message(channel_id: int, message_id: int):
                 hook["avatar"],
             )
 
+            await app.storage.bump_last_message(hook["channel_id"], result_id)
+            app.search_indexer.enqueue([result_id])
             payload = await app.storage.get_message(result_id, include_member=True)
             await app.dispatcher.channel.dispatch(
                 hook["channel_id"], ("MESSAGE_CREATE", payload)
@@ -1103,6 +1116,10 @@ async def bulk_delete(channel_id: int):
         channel_id,
         list(message_ids),
     )
+    for id in message_ids:
+        app.message_cache.delete(id)
+
+    await app.storage.fix_last_message(channel_id, list(message_ids))
 
     await app.dispatcher.channel.dispatch(channel_id, ("MESSAGE_DELETE_BULK", payload))
     return "", 204
@@ -94,14 +94,7 @@ async def channel_check(
         raise NotFound(50024)
 
     if ctype in GUILD_CHANS:
-        guild_id = await app.db.fetchval(
-            """
-        SELECT guild_id
-        FROM guild_channels
-        WHERE guild_channels.id = $1
-        """,
-            channel_id,
-        )
+        guild_id = await app.storage.guild_from_channel(channel_id)
         assert guild_id is not None
         result = await guild_check(user_id, guild_id, raise_err=False)
         if not result:
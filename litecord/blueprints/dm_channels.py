@@ -95,6 +95,7 @@ async def gdm_create(user_id, peer_id) -> int:
         channel_id,
         ChannelType.GROUP_DM.value,
     )
+    app.storage.set_channel_route(channel_id, None, ChannelType.GROUP_DM.value)
 
     await app.db.execute(
         """
@@ -214,6 +215,7 @@ async def gdm_destroy(channel_id):
     """,
         channel_id,
     )
+    app.storage.drop_channel_route(channel_id)
 
     await app.dispatcher.channel.dispatch(channel_id, ("CHANNEL_DELETE", chan))
     await app.dispatcher.channel.drop(channel_id)
@@ -91,6 +91,7 @@ async def create_dm(user_id: int, recipient_id: int):
         dm_id,
         ChannelType.DM.value,
     )
+    app.storage.set_channel_route(dm_id, None, ChannelType.DM.value)
 
     await app.db.execute(
         """
@@ -58,7 +58,7 @@ async def api_gateway_bot():
     bucket = ratelimit.get_bucket(user_id)
 
     # timestamp of bucket reset
-    reset_ts = bucket._window + bucket.second
+    reset_ts = bucket.reset_at
 
     # how many seconds until bucket reset
     # TODO: this logic should be changed to follow update_rate_limit's
@@ -76,7 +76,7 @@ async def api_gateway_bot():
             "shards": shards,
             "session_start_limit": {
                 "total": bucket.requests,
-                "remaining": bucket._tokens,
+                "remaining": bucket.remaining,
                 "reset_after": int(reset_after_ts * 1000),
                 "max_concurrency": 1,
             },
@@ -38,6 +38,7 @@ bp = Blueprint("guild_emoji", __name__)
 
 async def _dispatch_emojis(guild_id):
     """Dispatch a Guild Emojis Update payload to a guild."""
+    app.storage.invalidate_guild(guild_id)
     await app.dispatcher.guild.dispatch(
         guild_id,
         (
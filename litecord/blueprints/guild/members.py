@@ -78,25 +78,11 @@ async def get_members(guild_id):
         request.args.to_dict(),
         {
             "limit": {"coerce": int, "min": 1, "max": 1000, "default": 1},
-            "offset": {"coerce": int, "default": 0},
+            "after": {"coerce": int, "min": 0, "default": 0},
         },
     )
 
-    limit, after = j["limit"], j["after"]
-
-    user_ids = await app.db.fetch(
-        f"""
-    SELECT user_id
-    WHERE guild_id = $1, user_id > $2
-    LIMIT {limit}
-    ORDER BY user_id ASC
-    """,
-        guild_id,
-        after,
-    )
-
-    user_ids = [r[0] for r in user_ids]
-    members = await app.storage.get_member_multi(guild_id, user_ids)
+    members = await app.storage.get_member_page(guild_id, j["limit"], j["after"])
     return jsonify(members)
 
 
@@ -175,6 +161,7 @@ async def modify_guild_member(guild_id, member_id):
             member_id,
             guild_id,
         )
+        app.storage.member_names.set_nick(guild_id, member_id, nick)
 
         nick_flag = True
 
@@ -255,6 +242,7 @@ async def update_nickname(guild_id):
             user_id,
             guild_id,
         )
+        app.storage.member_names.set_nick(guild_id, user_id, j["nick"] or None)
         presence_dict["nick"] = j["nick"] or None
 
     if to_update(j, member, "avatar"):
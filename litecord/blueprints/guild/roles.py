@@ -70,6 +70,7 @@ async def create_guild_role(guild_id: int):
 
 async def _role_update_dispatch(role_id: int, guild_id: int):
     """Dispatch a GUILD_ROLE_UPDATE with updated information on a role."""
+    app.storage.invalidate_guild(guild_id)
     role = await app.storage.get_role(role_id, guild_id)
 
     await maybe_lazy_guild_dispatch(guild_id, "role_position_update", role)
@@ -285,6 +286,7 @@ async def delete_guild_role(guild_id, role_id):
     if res == "DELETE 0":
         raise NotFound(10011)
 
+    app.storage.invalidate_guild(guild_id)
     await maybe_lazy_guild_dispatch(guild_id, "role_delete", role_id, True)
 
     await app.dispatcher.guild.dispatch(
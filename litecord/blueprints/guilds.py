@@ -45,6 +45,7 @@ from .checks import guild_check, guild_owner_check, guild_perm_check
 from litecord.utils import str_bool, to_update
 from litecord.errors import BadRequest, ManualFormError, MissingAccess
 from litecord.permissions import get_permissions
+from litecord.search import SEARCH_COUNT_CAP, search_filters
 
 DEFAULT_EVERYONE_PERMS = 1071698660929
 
@@ -156,118 +157,69 @@ async def handle_search(guild_id: Optional[int], channel_id: Optional[int] = Non
     else:
         assert guild_id is not None
         can_read = await fetch_readable_channels(guild_id, user_id)
+        if j.get("channel_id"):
+            can_read = [channel for channel in j["channel_id"] if channel in can_read]
 
-    extra = ""
-    args = [guild_id, can_read, j["limit"], j["offset"]]
-    if j.get("content"):
-        extra += f" AND content ILIKE '%'||${len(args) + 1}||'%'"
-        args.append(j["content"])
-    if j.get("min_id"):
-        extra += f" AND id > ${len(args) + 1}"
-        args.append(j["min_id"])
-    if j.get("max_id"):
-        extra += f" AND id < ${len(args) + 1}"
-        args.append(j["max_id"])
-    if j.get("author_id"):
-        extra += f"AND author_id = ANY(${len(args) + 1}::bigint[])"
-        args.append(j["author_id"])
-    if j.get("channel_id") and not channel_id:
-        can_read = [channel for channel in j["channel_id"] if channel in can_read]
-    if j.get("mentions"):
-        extra += f" AND content = ANY(${len(args) + 1}::text[])"
-        args.append(
-            [f"%<@{id}>%" for id in j["mentions"]]
-            + [f"%<@!{id}>%" for id in j["mentions"]]
-        )
-    if j.get("link_hostname"):
-        extra += f" AND content = ANY(${len(args) + 1}::text[])"
-        args.append(
-            [f"%http://{hostname}%" for hostname in j["link_hostname"]]
-            + [f"%https://{hostname}%" for hostname in j["link_hostname"]]
-        )
-    if j.get("embed_provider"):
-        extra += f" AND embeds::text == ANY(${len(args) + 1}::text[])"
-        args.append(
-            ['%"provider": {"name": %s%' % provider for provider in j["embed_provider"]]
+    if not j["include_nsfw"] and can_read:
+        nsfw_ids = await app.db.fetch(
+            """
+        SELECT id
+        FROM guild_channels
+        WHERE id = ANY($1::bigint[]) AND nsfw = true
+        """,
+            can_read,
         )
-    if j.get("embed_type"):
-        extra += f" AND embeds::text == ANY(${len(args) + 1}::text[])"
-        args.append(['%"type": %s%' % type for type in j["embed_type"]])
-    if j.get("attachment_filename"):
-        extra += f" AND (SELECT COUNT(*) FROM attachments WHERE attachments.message_id = id AND attachments.filename = ANY(${len(args) + 1}::text[])) > 0"
-        args.append([f"%{filename}%" for filename in j["attachment_filename"]])
-    if j.get("attachment_extension"):
-        extra += f" AND (SELECT COUNT(*) FROM attachments WHERE attachments.message_id = id AND attachments.filename = ANY(${len(args) + 1}::text[])) > 0"
-        args.append([f"%.{extension}" for extension in j["attachment_extension"]])
-    if j["mention_everyone"] is not None:
-        extra += f" AND mention_everyone = ${len(args) + 1}"
-        args.append(j["mention_everyone"])
-    if j["pinned"] is not None:
-        extra += f" AND (SELECT COUNT(*) FROM channel_pins WHERE message_id = id) {'>' if j['pinned'] else '='} 0"
-    if not j["include_nsfw"]:
-        extra += " AND (SELECT nsfw FROM guild_channels WHERE id = channel_id) = false"
-    for has in j.get("has", []):
-        if has == "-embed":
-            extra += " AND embeds IS '[]'"
-        elif has == "embed":
-            extra += " AND embeds IS NOT '[]'"
-        if has == "-sticker":
-            extra += " AND sticker_ids IS '[]'"
-        elif has == "sticker":
-            extra += " AND sticker_ids IS NOT '[]'"
-        if has == "-link":
-            extra += " AND content NOT ILIKE '%'||'http://'||'%' AND content NOT ILIKE '%'||'https://'||'%'"
-        elif has == "link":
-            extra += " AND (content ILIKE '%'||'http://'||'%' OR content ILIKE ''%'||'https://'||'%')"
-        if has == "-file":
-            extra += " AND (SELECT COUNT(*) FROM attachments WHERE message_id = id) = 0"
-        elif has == "file":
-            extra += " AND (SELECT COUNT(*) FROM attachments WHERE message_id = id) > 0"
-        if has == "-image":
-            extra += " AND (SELECT COUNT(*) FROM attachments WHERE message_id = id AND image IS TRUE) = 0 AND embeds::text NOT ILIKE '%'||'\"type\": \"image\"'||'%'"
-        elif has == "image":
-            extra += " AND ((SELECT COUNT(*) FROM attachments WHERE message_id = id AND image IS TRUE) > 0 OR embeds::text ILIKE '%'||'\"type\": \"image\"'||'%')"
-        if has == "-video":
-            extra += " AND (SELECT COUNT(*) FROM attachments WHERE message_id = id AND (filename ILIKE '%.mp4' OR filename ILIKE '%.webm' OR filename ILIKE '%.mov')) = 0 AND embeds::text NOT ILIKE '%'||'\"type\": \"video\"'||'%'"
-        elif has == "video":
-            extra += " AND ((SELECT COUNT(*) FROM attachments WHERE message_id = id AND (filename ILIKE '%.mp4' OR filename ILIKE '%.webm' OR filename ILIKE '%.mov')) > 0 OR embeds::text ILIKE '%'||'\"type\": \"video\"'||'%')"
-        if has == "-sound":
-            extra += " AND (SELECT COUNT(*) FROM attachments WHERE message_id = id AND (filename ILIKE '%.mp3' OR filename ILIKE '%.ogg' OR filename ILIKE '%.wav' OR filename ILIKE '%.flac')) = 0"
-        elif has == "sound":
-            extra += " AND (SELECT COUNT(*) FROM attachments WHERE message_id = id AND (filename ILIKE '%.mp3' OR filename ILIKE '%.ogg' OR filename ILIKE '%.wav' OR filename ILIKE '%.flac')) > 0"
-    for author_type in j.get("author_type", []):
-        if author_type == "-webhook":
-            extra += " AND author_id IS NOT NULL"
-        elif author_type == "webhook":
-            extra += " AND author_id IS NULL"
-        if author_type == "-bot":
-            extra += " AND NOT ((SELECT bot FROM users WHERE id = author_id) = true)"
-        elif author_type == "bot":
-            extra += " AND (SELECT bot FROM users WHERE id = author_id) = true"
-        if author_type == "-user":
-            extra += " AND NOT ((SELECT bot FROM users WHERE id = author_id) = false)"
-        elif author_type == "user":
-            extra += " AND (SELECT bot FROM users WHERE id = author_id) = false"
+        nsfw_ids = {row["id"] for row in nsfw_ids}
+        can_read = [channel for channel in can_read if channel not in nsfw_ids]
+
+    args: List[Any] = [can_read]
+    conditions, uses_index = search_filters(j, args)
+    if uses_index:
+        # messages that weren't indexed yet can't be told apart by these
+        conditions += " AND search.message_id IS NOT NULL"
+
+    matches = f"""
+        FROM messages
+        LEFT JOIN message_search AS search ON search.message_id = messages.id
+        WHERE messages.channel_id = ANY($1::bigint[])
+        {conditions}
+    """
 
     # we ignore sort_by because idk how to sort by relevance
 
-    messages = await app.storage.get_messages(
-        user_id=user_id,
-        extra_clause=", COUNT(*) OVER() as total_results",
-        where_clause=f"""
-            WHERE guild_id = $1
-            AND channel_id = ANY($2::bigint[])
-            {extra}
-            ORDER BY id {j["sort_order"]}
-            LIMIT $3 OFFSET $4
+    message_ids = await app.db.fetch(
+        f"""
+        SELECT messages.id
+        {matches}
+        ORDER BY messages.id {j["sort_order"]}
+        LIMIT ${len(args) + 1} OFFSET ${len(args) + 2}
         """,
-        args=args,
+        *args,
+        j["limit"],
+        j["offset"],
     )
+    message_ids = [row["id"] for row in message_ids]
+
+    if len(message_ids) < j["limit"] and (message_ids or not j["offset"]):
+        # this page is the last one, no need to count
+        results = j["offset"] + len(message_ids)
+    else:
+        results = await app.db.fetchval(
+            f"""
+            SELECT COUNT(*) FROM (
+                SELECT 1
+                {matches}
+                LIMIT {SEARCH_COUNT_CAP}
+            ) AS matches
+            """,
+            *args,
+        )
 
-    results = 0 if not messages else messages[0]["total_results"]
+    messages = await app.storage.get_messages(message_ids, user_id=user_id)
+    by_id = {int(message["id"]): message for message in messages}
+    messages = [by_id[message_id] for message_id in message_ids if message_id in by_id]
     for row in messages:
         row["hit"] = True
-        row.pop("total_results", None)
 
     return {
         "total_results": results,
@@ -395,6 +347,7 @@ async def handle_guild_create(
                 guild_id,
             )
 
+    app.storage.invalidate_guild(guild_id)
     guild = await app.storage.get_guild(guild_id, user_id)
     extra = await app.storage.get_guild_extra(
         guild_id, user_id, 250
@@ -523,6 +476,7 @@ async def handle_guild_update(guild_id: int, check: bool = True):
             features or None,
             guild_id,
         )
+        app.storage.invalidate_guild(guild_id)
 
     fields = [
         "verification_level",
@@ -743,6 +697,7 @@ async def change_vanity_url(guild_id: int):
         guild_id,
         inv_code,
     )
+    app.storage.invalidate_guild(guild_id)
 
     return jsonify(await app.storage.get_invite(inv_code))
 
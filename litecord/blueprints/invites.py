@@ -246,14 +246,19 @@ async def get_invite(invite_code: str):
 
 async def delete_invite(invite_code: str):
     """Delete an invite."""
-    await app.db.fetchval(
+    guild_id = await app.db.fetchval(
         """
     DELETE FROM invites
     WHERE code = $1
+    RETURNING guild_id
     """,
         invite_code,
     )
 
+    # it might have been the vanity invite
+    if guild_id is not None:
+        app.storage.invalidate_guild(guild_id)
+
 
 @bp.route("/invite/<invite_code>", methods=["DELETE"])
 @bp.route("/invites/<invite_code>", methods=["DELETE"])
@@ -179,6 +179,7 @@ async def partners_apply():
         features,
         guild_id,
     )
+    app.storage.invalidate_guild(guild_id)
 
     guild = await app.storage.get_guild_full(guild_id, user_id)
     await app.dispatcher.guild.dispatch(guild_id, ("GUILD_UPDATE", guild))
@@ -438,7 +438,7 @@ async def _create_payment_source():
         6969,
         "Visa",
         "4242424242424242",
-        json.dumps(j["billing_address"]),
+        j["billing_address"],
     )
 
     return jsonify(await get_payment_source(user_id, new_source_id))
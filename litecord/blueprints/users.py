@@ -212,6 +212,7 @@ async def handle_user_update(user_id: int, check_password: bool = True):
         discrim = await _try_username_patch(user_id, j["username"])
         user["username"] = j["username"]
         user["discriminator"] = discrim
+        app.storage.member_names.set_username(user_id, j["username"])
 
     if to_update(j, user, "discriminator"):
         if check_password:
@@ -664,8 +665,8 @@ async def _get_mentions():
     )
 
     res = []
-    for row in rows:
-        message = await app.storage.get_message(row["id"])
+    messages = await app.storage.get_messages([row["id"] for row in rows])
+    for message in messages:
         gid = int(message["guild_id"])
 
         # ignore messages pre-messages.guild_id
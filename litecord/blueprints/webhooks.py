@@ -55,7 +55,6 @@ from litecord.common.messages import (
 from litecord.embed.sanitizer import fill_embed, fetch_mediaproxy_img
 from litecord.embed.messages import process_url_embed, is_media_url
 from litecord.embed.schemas import EmbedURL
-from litecord.json import pg_set_json
 from litecord.enums import MessageType
 from litecord.images import STATIC_IMAGE_MIMES
 
@@ -391,8 +390,6 @@ async def create_message_webhook(guild_id, channel_id, webhook_id, data):
     message_id = app.winter_factory.snowflake()
 
     async with app.db.acquire() as conn:
-        await pg_set_json(conn)
-
         await conn.execute(
             """
             INSERT INTO messages (id, channel_id, guild_id,
@@ -424,6 +421,8 @@ async def create_message_webhook(guild_id, channel_id, webhook_id, data):
             info["avatar"],
         )
 
+    await app.storage.bump_last_message(channel_id, message_id)
+    app.search_indexer.enqueue([message_id])
     return message_id
 
 
@@ -663,6 +662,8 @@ async def update_webhook_message(webhook_id, webhook_token, message_id):
         """,
             message_id,
         )
+        app.message_cache.invalidate(message_id)
+        app.search_indexer.enqueue([message_id])
 
     message = await app.storage.get_message(message_id, user_id)
 
@@ -698,6 +699,8 @@ async def delete_webhook_message(webhook_id, webhook_token, message_id):
     """,
         message_id,
     )
+    app.message_cache.delete(message_id)
+    await app.storage.fix_last_message(channel_id, [message_id])
 
     await app.dispatcher.channel.dispatch(
         channel_id,
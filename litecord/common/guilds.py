@@ -83,6 +83,9 @@ async def remove_member(guild_id: int, member_id: int, raise_err: bool = True) -
     elif res == "DELETE 0":
         return
 
+    app.storage.member_names.remove_member(guild_id, member_id)
+    app.presence.store.leave(guild_id, member_id)
+
     await dispatch_member(
         guild_id,
         member_id,
@@ -141,6 +144,7 @@ async def create_role(guild_id, name: str, **kwargs):
         False,
         dict_get(kwargs, "mentionable", False),
     )
+    app.storage.invalidate_guild(guild_id)
 
     role = await app.storage.get_role(new_role_id, guild_id)
 
@@ -254,6 +258,8 @@ async def create_guild_channel(
         banner.icon_hash,
     )
 
+    app.storage.set_channel_route(channel_id, guild_id, ctype.value)
+
     # the rest of sql magic is dependant on the channel
     # we're creating (a text or voice or category),
     # so we use this function.
@@ -295,6 +301,7 @@ async def delete_guild(guild_id: int):
             """,
             channel_id,
         )
+        app.storage.drop_channel_route(channel_id)
 
     res = await app.db.execute(
         """
@@ -303,6 +310,9 @@ async def delete_guild(guild_id: int):
     """,
         guild_id,
     )
+    app.storage.invalidate_guild(guild_id)
+    app.storage.member_names.drop_guild(guild_id)
+    app.presence.store.drop_guild(guild_id)
     if res == "DELETE 0":
         raise NotFound(10004)
 
@@ -401,6 +411,7 @@ async def add_member(
         user_id,
         guild_id,
     )
+    await app.storage.add_member_name(guild_id, user_id)
 
     await create_guild_settings(guild_id, user_id)
 
@@ -436,6 +447,7 @@ async def add_member(
     )
 
     # pubsub changes for new member
+    app.presence.store.join(guild_id, user_id)
     await app.lazy_guild.new_member(guild_id, user_id)
 
     # TODO how to remove repetition between this and websocket's subscribe_all?
@@ -549,3 +561,5 @@ async def process_overwrites(guild_id: int, channel_id: int, overwrites: list) -
     for user_id in user_ids:
         perms = await get_permissions(user_id, channel_id)
         await _dispatch_action(guild_id, channel_id, user_id, perms)
+
+    await app.lazy_guild.chan_update(channel_id)
@@ -176,6 +176,8 @@ async def msg_add_attachment(
         img_width,
         img_height,
     )
+    app.message_cache.invalidate(message_id)
+    app.search_indexer.enqueue([message_id])
 
     ext = filename.split(".")[-1]
     with open(f"attachments/{attachment_id}.{ext}", "wb") as attach_file:
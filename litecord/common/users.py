@@ -255,6 +255,7 @@ async def delete_user(user_id, *, mass_update: bool = True):
     await _del_from_table(db, "group_dm_members", user_id)
 
     await _del_from_table(db, "members", user_id)
+    app.storage.member_names.remove_user(user_id)
     await _del_from_table(db, "member_roles", user_id)
     await _del_from_table(db, "channel_overwrites", user_id)
 
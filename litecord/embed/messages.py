@@ -79,6 +79,8 @@ async def msg_update_embeds(payload, new_embeds):
         new_embeds,
         message_id,
     )
+    app.message_cache.invalidate(message_id)
+    app.search_indexer.enqueue([message_id])
 
     update_payload = {
         "id": str(message_id),
@@ -237,7 +237,6 @@ class StateManager:
         self, channel_id: int, user_id: int
     ) -> List[GatewayState]:
         """Get a list of gateway states for a user that can receive events on a certain channel."""
-        # TODO optimize this with an in-memory store
         guild_id = await app.storage.guild_from_channel(channel_id)
 
         if guild_id:
@@ -682,7 +682,8 @@ class GatewayWebsocket:
                 }
             ],
         )
-        await self.app.presence.dispatch_pres(self.state.user_id, self.state.presence)
+        # other users see the presence of all sessions merged together
+        await self.app.presence.update_pres(self.state.user_id)
 
     async def _custom_status_expire_check(self):
         if not self.state:
@@ -1084,10 +1085,14 @@ class GatewayWebsocket:
         Fetches the members and presences of a guild and dispatches a
         GUILD_SYNC event with that info.
         """
-        members = await self.storage.get_members(guild_id)
+        members, _, is_large = await self.storage.get_sync_members(
+            guild_id, self.state.large, self.state.user_id
+        )
 
         log.debug(f"Syncing guild {guild_id} with {len(members)} members")
-        presences = await self.presence.guild_presences(members, guild_id)
+        presences = await self.presence.guild_presences(
+            members, guild_id, offline=not is_large
+        )
 
         await self.dispatch_raw(
             "GUILD_SYNC",
@@ -1314,20 +1319,14 @@ class GatewayWebsocket:
     async def _check_conns(self, user_id):
         """Check if there are any existing connections.
 
-        If there aren't, dispatch a presence for offline.
+        Dispatches the merged presence of the connections left,
+        which is offline if there aren't any.
         """
         if not user_id:
             return
 
-        # TODO: account for sharding. this only checks to dispatch an offline
-        # when all the shards have come fully offline, which is inefficient.
-
-        # TODO why is this inneficient?
-        states = self.app.state_manager.user_states(user_id)
-        if not any(s.ws for s in states):
-            await self.app.presence.dispatch_pres(
-                user_id, BasePresence(status="offline")
-            )
+        # with no sessions left, the merged presence is offline
+        await self.app.presence.update_pres(user_id)
 
     async def run(self):
         """Wrap :meth:`listen_messages` inside
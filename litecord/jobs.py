@@ -18,7 +18,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import asyncio
-from typing import Any
+from typing import Any, Set
 
 from logbook import Logger
 
@@ -44,7 +44,7 @@ class JobManager:
     def __init__(self, *, loop=None, context_func=None):
         self.loop = loop or asyncio.get_event_loop()
         self.context_function = context_func or EmptyContext
-        self.jobs = []
+        self.jobs: Set[asyncio.Task] = set()
 
     async def _wrapper(self, coro):
         """Wrapper coroutine for other coroutines. This adds a simple
@@ -63,7 +63,11 @@ class JobManager:
                 return await coro
 
         task = self.loop.create_task(self._wrapper(_ctx_wrapper_bg()))
-        self.jobs.append(task)
+
+        # finished jobs are forgotten, as short-lived jobs
+        # are spawned all the time
+        self.jobs.add(task)
+        task.add_done_callback(self.jobs.discard)
         return task
 
     def close(self):
@@ -72,5 +76,5 @@ class JobManager:
         It is the job's responsibility to handle the given CancelledError
         and release any acquired resources.
         """
-        for job in self.jobs:
+        for job in list(self.jobs):
             job.cancel()
@@ -0,0 +1,189 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _GuildNames:
+    """Lowercased usernames and nicknames of every member of a guild,
+    kept sorted so that prefix queries are a bisect away."""
+
+    __slots__ = ("keys", "names")
+
+    def __init__(self):
+        # (lowercased name, user id), sorted
+        self.keys: List[Tuple[str, int]] = []
+
+        # user id -> (username, nickname)
+        self.names: Dict[int, Tuple[str, Optional[str]]] = {}
+
+    def _key_names(self, user_id: int) -> List[str]:
+        username, nick = self.names[user_id]
+        names = [username.lower()]
+        if nick and nick.lower() != names[0]:
+            names.append(nick.lower())
+        return names
+
+    def set(self, user_id: int, username: str, nick: Optional[str]) -> None:
+        self.remove(user_id)
+        self.names[user_id] = (username, nick)
+        for name in self._key_names(user_id):
+            insort(self.keys, (name, user_id))
+
+    def remove(self, user_id: int) -> None:
+        if user_id not in self.names:
+            return
+
+        for name in self._key_names(user_id):
+            idx = bisect_left(self.keys, (name, user_id))
+            if idx < len(self.keys) and self.keys[idx] == (name, user_id):
+                del self.keys[idx]
+
+        self.names.pop(user_id)
+
+    def prefix(self, query: str, limit: int) -> List[int]:
+        """Get the IDs of members whose username or nickname
+        starts with the given query, in name order."""
+        query = query.lower()
+        user_ids: Dict[int, None] = {}
+
+        idx = bisect_left(self.keys, (query,))
+        while idx < len(self.keys) and len(user_ids) < limit:
+            name, user_id = self.keys[idx]
+            if not name.startswith(query):
+                break
+            user_ids[user_id] = None
+            idx += 1
+
+        return list(user_ids)
+
+
+class MemberNameIndex:
+    """In-memory name indexes of the most recently queried guilds.
+
+    Indexes are built by Storage.query_members and must be kept current
+    by every change to a member (join, leave, nickname) or to a username.
+    Guilds are evicted in least-recently-used order past ``max_guilds``.
+    """
+
+    def __init__(self, max_guilds: int = 1000):
+        self.max_guilds = max_guilds
+        self._guilds: "OrderedDict[int, _GuildNames]" = OrderedDict()
+
+        # guild id -> whether the guild changed while its index was built
+        self._building: Dict[int, bool] = {}
+
+    def query(self, guild_id: int, query: str, limit: int) -> Optional[List[int]]:
+        """Get the IDs of members whose name starts with ``query``.
+
+        Returns None if the guild isn't indexed.
+        """
+        try:
+            index = self._guilds[guild_id]
+        except KeyError:
+            return None
+
+        self._guilds.move_to_end(guild_id)
+        return index.prefix(query, limit)
+
+    def tracks(self, guild_id: int) -> bool:
+        """Whether a guild is indexed or being indexed."""
+        return guild_id in self._guilds or guild_id in self._building
+
+    def start_build(self, guild_id: int) -> bool:
+        """Mark a guild as being indexed.
+
+        Returns False if it is already indexed or being indexed.
+        """
+        if self.tracks(guild_id):
+            return False
+
+        self._building[guild_id] = False
+        return True
+
+    def finish_build(
+        self,
+        guild_id: int,
+        members: Iterable[Tuple[int, str, Optional[str]]],
+    ) -> None:
+        """Install the index of a guild out of (user id, username, nickname)
+        tuples, unless the guild changed while they were being fetched."""
+        if self._building.pop(guild_id, True):
+            return
+
+        index = _GuildNames()
+        for user_id, username, nick in members:
+            index.names[user_id] = (username, nick)
+            index.keys.extend((name, user_id) for name in index._key_names(user_id))
+        index.keys.sort()
+
+        self._guilds[guild_id] = index
+        while len(self._guilds) > self.max_guilds:
+            self._guilds.popitem(last=False)
+
+    def cancel_build(self, guild_id: int) -> None:
+        self._building.pop(guild_id, None)
+
+    def _changed(self, guild_id: int) -> Optional[_GuildNames]:
+        if guild_id in self._building:
+            self._building[guild_id] = True
+        return self._guilds.get(guild_id)
+
+    def add_member(self, guild_id: int, user_id: int, username: str) -> None:
+        index = self._changed(guild_id)
+        if index is not None:
+            index.set(user_id, username, None)
+
+    def remove_member(self, guild_id: int, user_id: int) -> None:
+        index = self._changed(guild_id)
+        if index is not None:
+            index.remove(user_id)
+
+    def set_nick(self, guild_id: int, user_id: int, nick: Optional[str]) -> None:
+        index = self._changed(guild_id)
+        if index is not None and user_id in index.names:
+            index.set(user_id, index.names[user_id][0], nick)
+
+    def set_username(self, user_id: int, username: str) -> None:
+        for guild_id in self._building:
+            self._building[guild_id] = True
+
+        for index in self._guilds.values():
+            if user_id in index.names:
+                index.set(user_id, username, index.names[user_id][1])
+
+    def remove_user(self, user_id: int) -> None:
+        """Remove a user from every guild, after they were deleted."""
+        for guild_id in self._building:
+            self._building[guild_id] = True
+
+        for index in self._guilds.values():
+            index.remove(user_id)
+
+    def drop_guild(self, guild_id: int) -> None:
+        self._changed(guild_id)
+        self._guilds.pop(guild_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "guilds": len(self._guilds),
+            "names": sum(len(index.keys) for index in self._guilds.values()),
+        }
@@ -0,0 +1,291 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Callable
+
+from logbook import Logger
+
+log = Logger(__name__)
+
+#: Marks a cached message row that must be fetched again before use.
+STALE = None
+
+
+class _ChannelMessages:
+    """Cached message rows of a single channel.
+
+    All messages in the channel with an ID bigger than or equal to
+    ``floor`` are guaranteed to be in ``rows``. A ``floor`` of None means
+    the cache doesn't know about the latest messages of the channel.
+
+    New messages keep that true by going through MessageCache.created,
+    which Storage.bump_last_message calls for every created message.
+    """
+
+    __slots__ = ("rows", "floor")
+
+    def __init__(self):
+        self.rows: Dict[int, Optional[dict]] = {}
+        self.floor: Optional[int] = None
+
+
+class MessageCache:
+    """Bounded cache of recent message rows (as given by
+    Storage.fetch_message_rows), per channel.
+
+    Only user-independent rows are kept, so that every user and every
+    hydration mode can be served out of the same entries. Channels are
+    evicted in least-recently-used order once the global limit is hit.
+
+    Rows fetched from the database are put inside a :meth:`fill` block.
+    Writes to a message (or channel) made while a fill is in flight bump
+    its write sequence, and the fill's rows for it are then dropped
+    instead of caching what the database held before the write.
+    """
+
+    def __init__(self, channel_size: int = 100, max_messages: int = 50000):
+        self.channel_size = channel_size
+        self.max_messages = max_messages
+
+        self._channels: "OrderedDict[int, _ChannelMessages]" = OrderedDict()
+        self._message_channel: Dict[int, int] = {}
+
+        #: sequence of the last write to each message and channel, only
+        #  kept while fills are in flight
+        self._seq = 0
+        self._fills = 0
+        self._written: Dict[int, int] = {}
+        self._written_channels: Dict[int, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def _channel(self, channel_id: int, create: bool = False):
+        chan = self._channels.get(channel_id)
+        if chan is None and create:
+            chan = self._channels[channel_id] = _ChannelMessages()
+
+        if chan is not None:
+            self._channels.move_to_end(channel_id)
+
+        return chan
+
+    def _trim(self, channel_id: int, chan: _ChannelMessages):
+        while len(chan.rows) > self.channel_size:
+            message_id = min(chan.rows)
+            chan.rows.pop(message_id)
+            self._message_channel.pop(message_id, None)
+
+            if chan.floor is not None and message_id >= chan.floor:
+                chan.floor = message_id + 1
+
+        while len(self._message_channel) > self.max_messages and self._channels:
+            evicted_id, evicted = self._channels.popitem(last=False)
+            for message_id in evicted.rows:
+                self._message_channel.pop(message_id, None)
+
+            log.debug(
+                "evicted {} messages from channel {}", len(evicted.rows), evicted_id
+            )
+
+    def _mark(self, message_id: Optional[int] = None, channel_id: Optional[int] = None):
+        """Record a write, so that in-flight fills don't cache old rows."""
+        self._seq += 1
+        if not self._fills:
+            return
+
+        if message_id is not None:
+            self._written[message_id] = self._seq
+        if channel_id is not None:
+            self._written_channels[channel_id] = self._seq
+
+    def _written_since(self, since: int, channel_id: int, message_id: int) -> bool:
+        return (
+            self._written.get(message_id, 0) > since
+            or self._written_channels.get(channel_id, 0) > since
+        )
+
+    @contextmanager
+    def fill(self) -> Iterator[int]:
+        """Wrap fetching rows to put in the cache.
+
+        Gives the write sequence to pass to put and put_latest.
+        """
+        self._fills += 1
+        try:
+            yield self._seq
+        finally:
+            self._fills -= 1
+            if not self._fills:
+                self._written.clear()
+                self._written_channels.clear()
+
+    def put(self, row: dict, since: Optional[int] = None):
+        """Insert or replace a single message row.
+
+        With ``since``, the row is skipped if the message
+        was written to after the fill started.
+        """
+        channel_id = int(row["channel_id"])
+        message_id = int(row["id"])
+        if since is not None and self._written_since(since, channel_id, message_id):
+            return
+
+        chan = self._channel(channel_id, create=True)
+        chan.rows[message_id] = dict(row)
+        self._message_channel[message_id] = channel_id
+        self._trim(channel_id, chan)
+
+    def put_latest(
+        self, channel_id: int, rows: List[dict], limit: int, since: Optional[int] = None
+    ):
+        """Insert the result of fetching the ``limit`` latest messages
+        of a channel, in any order.
+
+        With ``since``, nothing is inserted if the channel or any of the
+        messages was written to after the fill started.
+        """
+        if since is not None and (
+            self._written_channels.get(channel_id, 0) > since
+            or any(self._written.get(int(row["id"]), 0) > since for row in rows)
+        ):
+            return
+
+        chan = self._channel(channel_id, create=True)
+
+        for row in rows:
+            message_id = int(row["id"])
+            chan.rows[message_id] = dict(row)
+            self._message_channel[message_id] = channel_id
+
+        if len(rows) < limit:
+            # we have every single message in the channel
+            chan.floor = 0
+        elif rows:
+            chan.floor = min(int(row["id"]) for row in rows)
+
+        self._trim(channel_id, chan)
+
+    def get(self, message_id: int) -> Optional[dict]:
+        """Get a copy of a cached message row."""
+        channel_id = self._message_channel.get(message_id)
+        chan = self._channel(channel_id) if channel_id is not None else None
+        row = chan.rows.get(message_id) if chan is not None else None
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return dict(row)
+
+    def latest_ids(self, channel_id: int, limit: int) -> Optional[List[int]]:
+        """Get the IDs of the ``limit`` latest messages in a channel,
+        newest first, or None if they aren't all known."""
+        chan = self._channel(channel_id)
+        if chan is None or chan.floor is None:
+            self.misses += 1
+            return None
+
+        ids = sorted((mid for mid in chan.rows if mid >= chan.floor), reverse=True)
+        if len(ids) < limit and chan.floor != 0:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return ids[:limit]
+
+    def get_many(self, message_ids: List[int]) -> Dict[int, dict]:
+        """Get copies of the given cached message rows, skipping
+        the ones that are stale or not cached."""
+        res = {}
+        for message_id in message_ids:
+            channel_id = self._message_channel.get(message_id)
+            if channel_id is None:
+                continue
+
+            row = self._channels[channel_id].rows.get(message_id)
+            if row is not None:
+                res[message_id] = dict(row)
+
+        return res
+
+    def created(self, channel_id: int, message_id: int):
+        """Register a newly created message.
+
+        If the latest messages of its channel are cached, the message is
+        added as stale, so that it is fetched on next use.
+        """
+        self._mark(channel_id=channel_id)
+
+        chan = self._channels.get(channel_id)
+        if chan is None or chan.floor is None:
+            return
+
+        chan.rows[message_id] = STALE
+        self._message_channel[message_id] = channel_id
+        self._trim(channel_id, chan)
+
+    def update(self, message_id: int, func: Callable[[dict], None]):
+        """Update a cached message row in place, if it is cached."""
+        self._mark(message_id)
+        channel_id = self._message_channel.get(message_id)
+        if channel_id is None:
+            return
+
+        row = self._channels[channel_id].rows.get(message_id)
+        if row is not None:
+            func(row)
+
+    def invalidate(self, message_id: int):
+        """Mark a message as changed. It will be fetched again on next use."""
+        self._mark(message_id)
+        channel_id = self._message_channel.get(message_id)
+        if channel_id is not None:
+            self._channels[channel_id].rows[message_id] = STALE
+
+    def delete(self, message_id: int):
+        """Remove a deleted message from the cache."""
+        self._mark(message_id)
+        channel_id = self._message_channel.pop(message_id, None)
+        if channel_id is not None:
+            self._channels[channel_id].rows.pop(message_id, None)
+
+    def delete_channel(self, channel_id: int):
+        """Remove all messages of a channel from the cache."""
+        self._mark(channel_id=channel_id)
+        chan = self._channels.pop(channel_id, None)
+        if chan is None:
+            return
+
+        for message_id in chan.rows:
+            self._message_channel.pop(message_id, None)
+
+    def stats(self) -> dict:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "channels": len(self._channels),
+            "messages": len(self._message_channel),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0,
+        }
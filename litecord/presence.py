@@ -17,7 +17,9 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
-from typing import List, Dict, Any, Iterable, Optional, TYPE_CHECKING
+import asyncio
+from typing import List, Dict, Any, Iterable, Optional, Set, TYPE_CHECKING
+from collections import defaultdict
 from random import choice
 from dataclasses import dataclass
 
@@ -107,6 +109,80 @@ def _merge_state_presences(shards: list) -> BasePresence:
     return best
 
 
+class PresenceStore:
+    """Aggregated presence of every user.
+
+    Updated every time a presence is dispatched, so it always holds
+    what other users were told. Also keeps the online members of
+    each guild, so guild presences only go through online members.
+    """
+
+    def __init__(self):
+        #: aggregated presence of every user that isn't offline
+        self.presences: Dict[int, BasePresence] = {}
+
+        #: user IDs of the online members of each guild
+        self.guild_online: Dict[int, Set[int]] = defaultdict(set)
+
+        #: guild IDs each online user is in
+        self.user_guilds: Dict[int, Set[int]] = {}
+
+    def get(self, user_id: int) -> BasePresence:
+        """Get the presence of a user."""
+        return self.presences.get(user_id) or BasePresence(status="offline")
+
+    def online_members(self, guild_id: int) -> Set[int]:
+        """Get the user IDs of the online members of a guild."""
+        return self.guild_online.get(guild_id, set())
+
+    def set(self, user_id: int, presence: BasePresence, guild_ids: Iterable[int]):
+        """Set the presence of a user, given the guilds they are in."""
+        new_guilds = set(guild_ids) if presence.status != "offline" else set()
+        old_guilds = self.user_guilds.pop(user_id, set())
+
+        for guild_id in old_guilds - new_guilds:
+            self.leave(guild_id, user_id)
+
+        if not new_guilds and presence.status == "offline":
+            self.presences.pop(user_id, None)
+            return
+
+        self.presences[user_id] = presence
+        self.user_guilds[user_id] = new_guilds
+        for guild_id in new_guilds - old_guilds:
+            self.guild_online[guild_id].add(user_id)
+
+    def join(self, guild_id: int, user_id: int):
+        """Count a new member of a guild as online, if they are."""
+        if user_id in self.presences:
+            self.guild_online[guild_id].add(user_id)
+            self.user_guilds[user_id].add(guild_id)
+
+    def leave(self, guild_id: int, user_id: int):
+        """Stop counting a member as online in a guild."""
+        online = self.guild_online.get(guild_id)
+        if online is not None:
+            online.discard(user_id)
+            if not online:
+                self.guild_online.pop(guild_id)
+
+        guild_ids = self.user_guilds.get(user_id)
+        if guild_ids is not None:
+            guild_ids.discard(guild_id)
+
+    def drop_guild(self, guild_id: int):
+        """Forget about a deleted guild."""
+        for user_id in self.guild_online.pop(guild_id, ()):
+            self.user_guilds[user_id].discard(guild_id)
+
+    def stats(self) -> dict:
+        return {
+            "online_users": len(self.presences),
+            "guilds": len(self.guild_online),
+            "online_members": sum(map(len, self.guild_online.values())),
+        }
+
+
 async def _pres(user_id: int, presence: BasePresence) -> dict:
     """Take a given base presence and convert it to a full friend presence."""
     return {**presence.partial_dict, **{"user": await app.storage.get_user(user_id)}}
@@ -117,28 +193,50 @@ class PresenceManager:
 
     Has common functions to deal with fetching or updating presences, including
     side-effects (events).
+
+    Session presence changes are debounced per user: changes within
+    the same PRESENCE_DEBOUNCE_WINDOW seconds are dispatched once, with
+    the presence the user's sessions have by the end of the window.
     """
 
     def __init__(self, app):
         self.storage = app.storage
         self.user_storage = app.user_storage
         self.state_manager = app.state_manager
+        self.store = PresenceStore()
+
+        #: users with a presence dispatch waiting for the debounce window
+        self._pending: Set[int] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        #: changes merged into a pending dispatch
+        self.coalesced = 0
+
+        #: dispatches skipped as the merged presence did not change
+        self.dropped = 0
+
+        #: debounced dispatches that went out
+        self.dispatched = 0
 
     async def guild_presences(
-        self, members: dict, guild_id: int
+        self, members: dict, guild_id: int, *, offline: bool = True
     ) -> List[Dict[Any, str]]:
-        """Fetch all presences in a guild."""
-        # this works via fetching all connected GatewayState on a guild
-        # then fetching its respective member and merging that info with
-        # the state's set presence.
-        states = self.state_manager.guild_states([int(m["user"]["id"]) for m in members.values()], guild_id)
-        presences = []
+        """Fetch all presences in a guild.
+
+        With ``offline`` set to False, only the presences of online
+        members are given, without going through every member.
+        """
+        if offline:
+            member_ids: Iterable[int] = members.keys()
+        else:
+            member_ids = self.store.online_members(guild_id) & members.keys()
 
-        for state in states:
-            member = members[state.user_id]
+        presences = []
+        for member_id in member_ids:
+            member = members[member_id]
             presences.append(
                 {
-                    **(state.presence or BasePresence(status="offline")).partial_dict,
+                    **self.store.get(member_id).partial_dict,
                     **{
                         "user": member["user"],
                         "roles": member["roles"],
@@ -150,11 +248,10 @@ class PresenceManager:
         return presences
 
     async def dispatch_guild_pres(
-        self, guild_id: int, user_id: int, presence: BasePresence
+        self, guild_id: int, user: dict, roles: List[str], presence: BasePresence
     ):
         """Dispatch a Presence update to an entire guild."""
-
-        member = await self.storage.get_member(guild_id, user_id)
+        member = {"user": user, "roles": roles}
 
         lists = app.lazy_guild.get_gml_guild(guild_id)
 
@@ -166,10 +263,6 @@ class PresenceManager:
             session_ids = await member_list.pres_update(
                 int(member["user"]["id"]),
                 {
-                    "avatar": member["avatar"],
-                    "banner": member["banner"],
-                    "bio": member["bio"],
-                    "pronouns": member["pronouns"],
                     "roles": member["roles"],
                     "status": presence.status,
                     "game": presence.game,
@@ -245,47 +338,96 @@ class PresenceManager:
 
         Also dispatches the presence to all the users' friends
         """
-        guild_ids = await self.user_storage.get_user_guilds(user_id)
-        for guild_id in guild_ids:
-            await self.dispatch_guild_pres(guild_id, user_id, presence)
+        guild_roles = await self.user_storage.get_user_guild_roles(user_id)
+        self.store.set(user_id, presence, guild_roles.keys())
+
+        user = await self.storage.get_user(user_id)
+        for guild_id, roles in guild_roles.items():
+            await self.dispatch_guild_pres(guild_id, user, roles, presence)
 
         await self.dispatch_friends_pres(user_id, presence)
 
-    def fetch_self_presence(self, user_id: int) -> BasePresence:
-        """Fetch a presence for a specifc user.
+    async def update_pres(self, user_id: int) -> None:
+        """Dispatch the merged presence of a user's sessions
+        once the debounce window ends."""
+        window = app.config.get("PRESENCE_DEBOUNCE_WINDOW", 0.25)
+        if window <= 0:
+            await self._flush_pres(user_id)
+            return
+
+        if user_id in self._pending:
+            self.coalesced += 1
+            return
+
+        # a single job flushes every user pending in the window,
+        # instead of one job per user
+        self._pending.add(user_id)
+        if self._flush_task is None:
+            self._flush_task = app.sched.spawn(self._debounce_pres(window))
+
+    async def _debounce_pres(self, window: float):
+        await asyncio.sleep(window)
+        pending, self._pending = self._pending, set()
+        self._flush_task = None
+
+        for user_id in pending:
+            try:
+                await self._flush_pres(user_id)
+            except Exception:
+                log.exception("failed to dispatch presence of user {}", user_id)
 
-        This is basically the same as the friend function, so let's just call that
-        """
-        return self.fetch_friend_presence(user_id)
+    async def _flush_pres(self, user_id: int):
+        presence = self.session_presence(user_id)
+        if presence == self.store.get(user_id):
+            self.dropped += 1
+            return
 
-    def fetch_friend_presence(self, friend_id: int) -> BasePresence:
-        """Fetch a presence for a friend.
+        self.dispatched += 1
+        await self.dispatch_pres(user_id, presence)
 
-        This is a different algorithm than guild presence.
-        """
-        friend_states = self.state_manager.user_states(friend_id)
+    def stats(self) -> dict:
+        return {
+            **self.store.stats(),
+            "pending": len(self._pending),
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "dispatched": self.dispatched,
+        }
 
-        if not friend_states:
+    def session_presence(self, user_id: int) -> BasePresence:
+        """Merge the presences of the connected sessions of a user."""
+        states = [state for state in self.state_manager.user_states(user_id) if state]
+        if not states:
             return BasePresence(status="offline")
 
         # filter the best shards:
         #  - all with id 0 (are the first shards in the collection) or
         #  - all shards with count = 1 (single shards)
-        good_shards = list(
-            filter(
-                lambda state: state.current_shard == 0 or state.shard_count == 1,
-                friend_states,
-            )
-        )
+        good_shards = [
+            state
+            for state in states
+            if state.current_shard == 0 or state.shard_count == 1
+        ]
 
         if good_shards:
             return _merge_state_presences(good_shards)
 
         # if there aren't any shards with id 0
         # AND none that are single, just go with a random one.
-        shard = choice([s for s in friend_states if s.presence])
+        shard = choice([s for s in states if s.presence] or states)
         return shard.presence or BasePresence(status="offline")
 
+    def fetch_self_presence(self, user_id: int) -> BasePresence:
+        """Fetch a presence for a specifc user.
+
+        This is basically the same as the friend function, so let's just call that
+        """
+        return self.fetch_friend_presence(user_id)
+
+    def fetch_friend_presence(self, friend_id: int) -> BasePresence:
+        """Fetch a presence for a friend."""
+        return self.store.get(friend_id)
+
     async def friend_presences(self, friends: Iterable[dict]) -> List[Presence]:
         """Fetch presences for a group of users.
 
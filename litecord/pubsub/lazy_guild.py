@@ -27,9 +27,11 @@ lazy guilds:
 """
 
 import asyncio
-from collections import defaultdict
+import sys
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict
 from typing import Any, List, Dict, Union, Optional, Iterable, Iterator, Tuple, Set, TYPE_CHECKING
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field
 from logbook import Logger
 
 from litecord.permissions import (
@@ -42,7 +44,7 @@ from litecord.permissions import (
 from litecord.utils import index_by_func
 from litecord.utils import mmh3
 from litecord.gateway.state import GatewayState
-from litecord.presence import Presence
+from litecord.presence import BasePresence, Presence
 
 if TYPE_CHECKING:
     from litecord.typing_hax import app, request
@@ -56,6 +58,14 @@ GroupID = Union[int, str]
 # TODO: move this constant out of the lazy_guild module
 MAX_ROLES = 250
 
+#: Size of the item buckets subscriptions are indexed by. Clients
+#: subscribe to ranges of 100 items ([0, 99], [100, 199], ...).
+RANGE_BUCKET = 100
+
+#: Ranges spanning more buckets than this are checked on every update
+#: instead of being indexed.
+MAX_RANGE_BUCKETS = 10
+
 import string
 
 # initialize member list order table by loading it up
@@ -71,6 +81,17 @@ for index, pair in enumerate(
     LETTER_AS_NUMBER[pair[0]] = len(string.digits) + index
     LETTER_AS_NUMBER[pair[1]] = len(string.digits) + index + 1
 
+_letter_as_number = LETTER_AS_NUMBER.get
+
+
+def name_sort_key(name: str) -> bytes:
+    """Get the member list sort key of a display name.
+
+    Each letter becomes a single byte, so keys compare as fast
+    (and take as much memory) as short strings.
+    """
+    return bytes([_letter_as_number(letter, 0) for letter in name])
+
 
 @dataclass
 class GroupInfo:
@@ -82,6 +103,72 @@ class GroupInfo:
     permissions: Permissions
 
 
+class ListMember:
+    """A member inside a member list.
+
+    Keeps only what goes in the member's list item, instead of
+    full member and presence dicts.
+    """
+
+    __slots__ = (
+        "user",
+        "nick",
+        "joined_at",
+        "deaf",
+        "mute",
+        "avatar",
+        "banner",
+        "bio",
+        "pronouns",
+        "roles",
+        "status",
+        "game",
+        "activities",
+    )
+
+    def __init__(self, member: dict, presence: Presence, roles: Tuple[str, ...]):
+        self.user: dict = member["user"]
+        self.nick: Optional[str] = member.get("nick")
+        self.joined_at: Optional[str] = member.get("joined_at")
+        self.deaf: bool = member.get("deaf", False)
+        self.mute: bool = member.get("mute", False)
+        self.avatar: Optional[str] = member.get("avatar")
+        self.banner: Optional[str] = member.get("banner")
+        self.bio: str = member.get("bio") or ""
+        self.pronouns: str = member.get("pronouns") or ""
+        self.roles = roles
+        self.status: str = presence["status"]
+        self.game = presence.get("game")
+        self.activities = presence.get("activities") or None
+
+    @property
+    def item(self) -> dict:
+        """Get the list item of the member."""
+        return {
+            "user": self.user,
+            "nick": self.nick,
+            "roles": list(self.roles),
+            "joined_at": self.joined_at,
+            "deaf": self.deaf,
+            "mute": self.mute,
+            "avatar": self.avatar,
+            "banner": self.banner,
+            "bio": self.bio,
+            "pronouns": self.pronouns,
+            "presence": {
+                "user": {"id": str(self.user["id"])},
+                "status": self.status,
+                "game": self.game,
+                "activities": self.activities or [],
+            },
+        }
+
+
+#: Approximate bytes a member takes in the list structures besides
+#: its entry (dict slots, group list pointer, sort key tuple).
+MEMBER_OVERHEAD = 320
+
+
 @dataclass
 class MemberList:
     """Total information on the guild's member list.
@@ -95,33 +182,51 @@ class MemberList:
         Dictionary holding a list of member IDs
         for each group.
     members:
-        Dictionary holding member information for
+        Dictionary holding a :class:`ListMember` for
         each member in the list.
-    presences:
-        Dictionary holding presence data for each
-        member.
     overwrites:
         Holds the channel overwrite information
         for the list (a list is tied to a single
         channel, and since only roles with Read Messages
         can be in the list, we need to store that information)
+    keys:
+        Dictionary holding, for each group, the sort key
+        of every member in data (in the same order).
+    member_groups:
+        Dictionary holding the group of each member in the list.
+    sort_keys:
+        Dictionary holding the sort key each member
+        was placed in its group with.
+    role_tuples:
+        Interned role ID tuples, so that members with the same
+        roles share a single tuple.
     """
 
     groups: List[GroupInfo] = field(default_factory=list)
     data: Dict[GroupID, List[int]] = field(default_factory=dict)
-    presences: Dict[int, Presence] = field(default_factory=dict)
-    members: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    members: Dict[int, ListMember] = field(default_factory=dict)
     overwrites: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    keys: Dict[GroupID, List[Any]] = field(default_factory=dict)
+    member_groups: Dict[int, GroupID] = field(default_factory=dict)
+    sort_keys: Dict[int, Any] = field(default_factory=dict)
+    role_tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = field(
+        default_factory=dict, repr=False
+    )
+
+    #: item index of every non-empty group (prefix sums of the group
+    #: sizes), along with the group and its member IDs.
+    _offsets: Optional[List[Tuple[int, GroupInfo, List[int]]]] = field(
+        default=None, init=False, repr=False
+    )
+    _starts: List[int] = field(default_factory=list, init=False, repr=False)
+    _group_starts: Dict[GroupID, int] = field(
+        default_factory=dict, init=False, repr=False
+    )
 
     def __bool__(self):
         """Return if the current member list is fully initialized."""
-        # asdict comes from dataclasses
-        list_dict = asdict(self)
-
         # ignore the bool status of overwrites
-        return all(
-            bool(list_dict[k]) for k in ("groups", "data", "presences", "members")
-        )
+        return bool(self.groups and self.data and self.members)
 
     def __iter__(self):
         """Iterate over all groups in the correct order.
@@ -172,6 +277,158 @@ class MemberList:
         # this isn't actively used.
         return {g.gid: g for g in self.groups}
 
+    def intern_roles(self, roles: Iterable[Union[str, int]]) -> Tuple[str, ...]:
+        """Get the shared tuple for a set of role IDs."""
+        key = tuple(sorted(map(str, roles)))
+        return self.role_tuples.setdefault(key, key)
+
+    def member_size(self, member_id: int) -> int:
+        """Approximate how many bytes a member takes in the list."""
+        entry = self.members.get(member_id)
+        if entry is None:
+            return 0
+
+        return (
+            MEMBER_OVERHEAD
+            + sys.getsizeof(entry)
+            + sys.getsizeof(entry.user)
+            + sys.getsizeof(self.sort_keys.get(member_id, b""))
+        )
+
+    @property
+    def memory(self) -> int:
+        """Approximate how many bytes the list takes."""
+        return sum(map(self.member_size, self.members)) + sum(
+            map(sys.getsizeof, self.role_tuples)
+        )
+
+    def invalidate(self):
+        """Drop the group offsets after the groups, their order
+        or their sizes changed."""
+        self._offsets = None
+
+    def reset_groups(self):
+        """Allocate an empty list for every group."""
+        self.data = {group.gid: [] for group in self.groups}
+        self.keys = {group.gid: [] for group in self.groups}
+        self.member_groups = {}
+        self.sort_keys = {}
+        self._offsets = None
+
+    def new_group(self, group_id: GroupID):
+        """Allocate an empty list for a new group."""
+        self.data[group_id] = []
+        self.keys[group_id] = []
+        self._offsets = None
+
+    def pop_group(self, group_id: GroupID) -> List[int]:
+        """Remove a group, returning the members that were in it."""
+        member_ids = self.data.pop(group_id)
+        self.keys.pop(group_id, None)
+        for member_id in member_ids:
+            self.member_groups.pop(member_id, None)
+            self.sort_keys.pop(member_id, None)
+
+        self._offsets = None
+        return member_ids
+
+    def add(self, group_id: GroupID, member_id: int, sort_key: Any):
+        """Add a member to the end of a group.
+
+        The group must be sorted afterwards, use insert to add a single
+        member to an already sorted group.
+        """
+        self.data[group_id].append(member_id)
+        self.keys[group_id].append(sort_key)
+        self.member_groups[member_id] = group_id
+        self.sort_keys[member_id] = sort_key
+        self._offsets = None
+
+    def insert(self, group_id: GroupID, member_id: int, sort_key: Any):
+        """Insert a member at its sorted position in a group."""
+        keys = self.keys[group_id]
+        rel_index = bisect_left(keys, sort_key)
+        keys.insert(rel_index, sort_key)
+        self.data[group_id].insert(rel_index, member_id)
+        self.member_groups[member_id] = group_id
+        self.sort_keys[member_id] = sort_key
+        self._offsets = None
+
+    def remove(self, group_id: GroupID, member_id: int):
+        """Remove a member from a group."""
+        rel_index = self.relative_index(member_id)
+        if rel_index is None or self.member_groups[member_id] != group_id:
+            raise ValueError(f"{member_id} is not in group {group_id}")
+
+        del self.data[group_id][rel_index]
+        del self.keys[group_id][rel_index]
+        self.member_groups.pop(member_id)
+        self.sort_keys.pop(member_id)
+        self._offsets = None
+
+    def sort(self):
+        """Sort every group by the members' sort keys."""
+        for group_id, member_ids in self.data.items():
+            pairs = sorted(zip(self.keys[group_id], member_ids))
+            self.keys[group_id] = [sort_key for sort_key, _ in pairs]
+            member_ids[:] = [member_id for _, member_id in pairs]
+
+    def relative_index(self, member_id: int) -> Optional[int]:
+        """Get the index of a member inside its group."""
+        try:
+            group_id = self.member_groups[member_id]
+        except KeyError:
+            return None
+
+        member_ids = self.data[group_id]
+        rel_index = bisect_left(self.keys[group_id], self.sort_keys[member_id])
+
+        # the group isn't sorted yet
+        if rel_index >= len(member_ids) or member_ids[rel_index] != member_id:
+            return member_ids.index(member_id)
+
+        return rel_index
+
+    def item_index(self, member_id: int) -> Optional[int]:
+        """Get the item index of a member."""
+        rel_index = self.relative_index(member_id)
+        if rel_index is None:
+            return None
+
+        if self._offsets is None:
+            self._build_offsets()
+
+        # +1 is for the group item
+        return self._group_starts[self.member_groups[member_id]] + 1 + rel_index
+
+    def _build_offsets(self):
+        offsets = []
+        index = 0
+        for group, member_ids in self:
+            if not member_ids:
+                continue
+
+            offsets.append((index, group, member_ids))
+            index += 1 + len(member_ids)
+
+        self._offsets = offsets
+        self._starts = [start for start, _, _ in offsets]
+        self._group_starts = {group.gid: start for start, group, _ in offsets}
+
+    @property
+    def offsets(self) -> List[Tuple[int, GroupInfo, List[int]]]:
+        """Get the item index of every non-empty group,
+        with the group and its member IDs."""
+        if self._offsets is None:
+            self._build_offsets()
+        return self._offsets
+
+    def group_at(self, item_index: int) -> int:
+        """Get the position (inside offsets) of the group an item is in."""
+        if self._offsets is None:
+            self._build_offsets()
+        return bisect_right(self._starts, item_index) - 1
+
     def is_empty(self, group_id: GroupID) -> bool:
         """Return if a group is empty."""
         return len(self.data[group_id]) == 0
@@ -231,20 +488,50 @@ async def everyone_allow(gml) -> bool:
     return bool(everyone_perms.bits.read_messages)
 
 
-def merge(member: dict, presence: Presence) -> dict:
-    """Merge a member dictionary and a presence dictionary
-    into an item."""
-    return {
-        **member,
-        **{
-            "presence": {
-                "user": {"id": str(member["user"]["id"])},
-                "status": presence["status"],
-                "game": presence["game"],
-                "activities": (presence.get("activities") or []),
-            }
-        },
-    }
+def overwrites_hash(overwrites: Dict[int, Dict[str, Any]]) -> str:
+    """Hash the read permissions given by a channel's overwrites.
+
+    Channels with the same hash show the same members in the same groups,
+    so they can share a member list.
+    """
+    # list of strings holding the hash input
+    ovs_i = []
+
+    for actor_id, overwrite in overwrites.items():
+        allow, deny = (
+            Permissions(overwrite["allow"]),
+            Permissions(overwrite["deny"]),
+        )
+
+        if allow.bits.read_messages:
+            ovs_i.append(f"allow:{actor_id}")
+        elif deny.bits.read_messages:
+            ovs_i.append(f"deny:{actor_id}")
+
+    hash_in = ",".join(sorted(ovs_i))
+    return str(mmh3(hash_in))
+
+
+def _covers(new: Operation, old: Operation) -> bool:
+    """Return if sending ``new`` makes ``old`` useless, given that no
+    INSERT or DELETE happened in between."""
+    if old.list_op == "UPDATE":
+        index = old.params["index"]
+    elif old.list_op == "SYNC":
+        start, end = old.params["range"]
+        if new.list_op != "SYNC":
+            return False
+
+        new_start, new_end = new.params["range"]
+        return new_start <= start and end <= new_end
+    else:
+        return False
+
+    if new.list_op == "UPDATE":
+        return new.params["index"] == index
+
+    new_start, new_end = new.params["range"]
+    return new_start <= index <= new_end
 
 
 class GuildMemberList:
@@ -272,16 +559,35 @@ class GuildMemberList:
         for example, can still rely on PRESENCE_UPDATEs.
     """
 
-    def __init__(self, guild_id: int, channel_id: int):
+    def __init__(self, guild_id: int, channel_id: int, list_key: Tuple[int, str]):
         self.guild_id = guild_id
         self.channel_id = channel_id
 
+        #: the (guild id, read overwrites hash) pair this list is kept under,
+        #  shared by every channel in channel_ids.
+        self.list_key = list_key
+        self.channel_ids: Set[int] = {channel_id}
+
         self.list = MemberList()
 
+        #: approximate size of the list in bytes, see MemberList.memory
+        self.memory = 0
+
         #: store the states that are subscribed to the list.
         #  type is {session_id: set[tuple]}
         self.state: Dict[str, Set[Tuple[int, int]]] = defaultdict(set)
 
+        #: item bucket -> session IDs with a range overlapping the bucket
+        self._range_index: Dict[int, Set[str]] = defaultdict(set)
+
+        #: session IDs with a range too wide to be indexed
+        self._wide_subs: Set[str] = set()
+
+        #: operations waiting for the coalescing window to end
+        #  type is {session_id: [Operation, ...]}
+        self._pending_ops: Dict[str, List[Operation]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
         self._list_lock = asyncio.Lock()
 
     @property
@@ -316,26 +622,12 @@ class GuildMemberList:
         if not self.list:
             return str(self.channel_id)
 
-        # list of strings holding the hash input
-        ovs_i = []
-
-        for actor_id, overwrite in self.list.overwrites.items():
-            allow, deny = (
-                Permissions(overwrite["allow"]),
-                Permissions(overwrite["deny"]),
-            )
-
-            if allow.bits.read_messages:
-                ovs_i.append(f"allow:{actor_id}")
-            elif deny.bits.read_messages:
-                ovs_i.append(f"deny:{actor_id}")
-
-        hash_in = ",".join(ovs_i)
-        return str(mmh3(hash_in))
+        return overwrites_hash(self.list.overwrites)
 
     def _set_empty_list(self):
         """Set the member list as being empty."""
-        self.list = MemberList(None, None, None, None)
+        self.list = MemberList()
+        self.memory = 0
 
     async def _init_check(self):
         """Check if the member list is initialized before
@@ -432,6 +724,7 @@ class GuildMemberList:
             GroupInfo("online", "online", MAX_ROLES + 1, EMPTY_PERMISSIONS),
             GroupInfo("offline", "offline", MAX_ROLES + 2, EMPTY_PERMISSIONS),
         ]
+        self.list.invalidate()
 
     async def _get_group_for_member(
         self, member_id: int, roles: List[Union[str, int]], status: str
@@ -458,14 +751,13 @@ class GuildMemberList:
 
         return group_id
 
-    async def _list_fill_groups(self, members: List[dict]):
+    async def _list_fill_groups(self, members: Iterable[ListMember]):
         """Fill in groups with the member ids."""
         for member in members:
-            member_id = int(member["user"]["id"])
-            presence = self.list.presences[member_id]
+            member_id = int(member.user["id"])
 
             group_id = await self._get_group_for_member(
-                member_id, presence["roles"], presence["status"]
+                member_id, member.roles, member.status
             )
 
             # skip members that don't have any group assigned.
@@ -474,7 +766,7 @@ class GuildMemberList:
                 continue
 
             self.list.members[member_id] = member
-            self.list.data[group_id].append(member_id)
+            self.list.add(group_id, member_id, self._sort_key(member_id))
 
     def _display_name(self, member_id: int) -> Optional[str]:
         """Get the display name for a given member.
@@ -487,46 +779,64 @@ class GuildMemberList:
         except KeyError:
             return
 
-        username = member["user"]["username"]
-        nickname = member["nick"]
+        username = member.user["username"]
+        nickname = member.nick
 
         return nickname or username
 
-    def _display_name_as_sort_key(self, member_id: int) -> str:
+    def _display_name_as_sort_key(self, member_id: int) -> bytes:
         display_name = self._display_name(member_id)
         if not display_name:
-            return ""
-        return [LETTER_AS_NUMBER.get(letter, 0) for letter in display_name]
+            return b""
+        return name_sort_key(display_name)
+
+    def _sort_key(self, member_id: int) -> Tuple[bytes, int]:
+        """Get the key a member is sorted by inside its group.
+
+        The member ID breaks ties, so that every member
+        can be found back in its group by bisecting.
+
+        Keys are computed when the member is placed in the list and kept
+        in MemberList.sort_keys, they only change with the display name.
+        """
+        return self._display_name_as_sort_key(member_id), member_id
 
     async def _sort_groups(self):
         # numbers, lowercase letters, uppercase letters
         # 0 1 2 3 4 5 6 7 8 9, a, A, b, B, c, C, d, D...
-
-        # list.sort is used as it sorts it all in-place
-        for member_ids in self.list.data.values():
-            member_ids.sort(key=self._display_name_as_sort_key)
+        self.list.sort()
 
     async def __init_member_list(self):
         """Generate the main member list with groups."""
         members = await self.storage.get_members(self.guild_id)
 
-        presences = await self.presence.guild_presences(members, self.guild_id)
-
-        # set presences in the list
-        self.list.presences = {int(p["user"]["id"]): p for p in presences}
+        # only online members have a presence to fetch
+        presences = await self.presence.guild_presences(
+            members, self.guild_id, offline=False
+        )
+        presences = {int(p["user"]["id"]): p for p in presences}
+        offline = BasePresence(status="offline").partial_dict
 
         await self._set_groups()
 
         log.debug("init: {} members, {} groups", len(members), len(self.list.groups))
 
         # allocate a list per group
-        self.list.data = {group.gid: [] for group in self.list.groups}
+        self.list.reset_groups()
 
-        await self._list_fill_groups(members.values())
+        await self._list_fill_groups(
+            ListMember(
+                member,
+                presences.get(member_id, offline),
+                self.list.intern_roles(member["roles"]),
+            )
+            for member_id, member in members.items()
+        )
 
         # second pass: sort each group's members
         # by the display name
         await self._sort_groups()
+        self.memory = self.list.memory
 
     async def _init_member_list(self):
         try:
@@ -541,39 +851,83 @@ class GuildMemberList:
         if not member:
             return
 
-        presence = self.list.presences[member_id]
-        return merge(member, presence)
+        return member.item
+
+    def get_items(self, start: int, end: int) -> list:
+        """Get the items in the [start, end) range of the list.
+
+        Only the items inside the range are generated, by jumping
+        straight to the group holding the start of the range.
+        """
+        if not self.list or end <= start:
+            return []
+
+        first_group = max(self.list.group_at(start), 0)
+        res = []
+
+        # groups without anyone are not part of the offsets,
+        # as we do not send information on them
+        for group_start, group, member_ids in self.list.offsets[first_group:]:
+            if group_start >= end:
+                break
+
+            if group_start >= start:
+                res.append({"group": {"id": str(group.gid), "count": len(member_ids)}})
+
+            rel_start = max(start - group_start - 1, 0)
+            rel_end = min(end - group_start - 1, len(member_ids))
+            for member_id in member_ids[rel_start:rel_end]:
+                member = self._get_member_as_item(member_id)
+                if member is not None:
+                    res.append({"member": member})
+
+        return res
+
+    def get_item(self, item_index: int) -> Optional[dict]:
+        """Get a single item of the list."""
+        items = self.get_items(item_index, item_index + 1)
+        return items[0] if items else None
 
     @property
     def items(self) -> list:
         """Main items list."""
+        if not self.list or not self.list.offsets:
+            return []
 
-        # TODO: maybe make this stored in the list
-        # so we don't need to keep regenning?
+        group_start, _, member_ids = self.list.offsets[-1]
+        return self.get_items(0, group_start + 1 + len(member_ids))
 
-        if not self.list:
-            return []
+    def _add_range(self, session_id: str, start: int, end: int):
+        """Subscribe a session to a range of the list."""
+        self.state[session_id].add((start, end))
 
-        res = []
+        first, last = start // RANGE_BUCKET, end // RANGE_BUCKET
+        if last - first >= MAX_RANGE_BUCKETS:
+            self._wide_subs.add(session_id)
+            return
 
-        # NOTE: maybe use map()?
-        for group, member_ids in self.list:
+        for bucket in range(first, last + 1):
+            self._range_index[bucket].add(session_id)
 
-            # do not send information on groups
-            # that don't have anyone
-            if not member_ids:
-                continue
+    def _drop_session(self, session_id: str):
+        """Remove a session and all of its ranges from the list."""
+        ranges = self.state.pop(session_id, ())
+        self._pending_ops.pop(session_id, None)
+        self._wide_subs.discard(session_id)
 
-            res.append({"group": {"id": str(group.gid), "count": len(member_ids)}})
+        for start, end in ranges:
+            first, last = start // RANGE_BUCKET, end // RANGE_BUCKET
+            if last - first >= MAX_RANGE_BUCKETS:
+                continue
 
-            for member_id in member_ids:
-                member = self._get_member_as_item(member_id)
-                if not member:
-                    member_ids.remove(member_id)
+            for bucket in range(first, last + 1):
+                sessions = self._range_index.get(bucket)
+                if sessions is None:
                     continue
-                res.append({"member": member})
 
-        return res
+                sessions.discard(session_id)
+                if not sessions:
+                    self._range_index.pop(bucket)
 
     def unsub(self, session_id: str):
         """Unsubscribe a shard from the member list
@@ -581,10 +935,7 @@ class GuildMemberList:
         Subscription for the member list is handled via the
         :meth:`GuildMemberList.shard_query` method.
         """
-        try:
-            self.state.pop(session_id)
-        except KeyError:
-            pass
+        self._drop_session(session_id)
 
         # once we reach 0 subscribers,
         # we drop the current member list we have (for memory)
@@ -594,6 +945,15 @@ class GuildMemberList:
         if not self.state:
             self._set_empty_list()
 
+    def is_idle(self) -> bool:
+        """Return if no live session is subscribed to the list,
+        dropping the sessions that went away."""
+        for session_id in list(self.state):
+            if self._get_state(session_id) is None:
+                self._drop_session(session_id)
+
+        return not self.state
+
     def _get_state(self, session_id: str) -> Optional[GatewayState]:
         """Get the state for a session id.
 
@@ -604,13 +964,8 @@ class GuildMemberList:
         except KeyError:
             return None
 
-    async def _dispatch_sess(
-        self, session_ids: Iterable[str], operations: List[Operation]
-    ):
-        """Dispatch a GUILD_MEMBER_LIST_UPDATE to the
-        given session ids."""
-
-        # construct the payload to dispatch
+    def _payload(self, operations: List[Operation]) -> dict:
+        """Make a GUILD_MEMBER_LIST_UPDATE payload out of operations."""
         groups = list(self.list.groups_complete)
         member_count = len(self.list.members)
         offline_count = 0
@@ -618,7 +973,7 @@ class GuildMemberList:
             if group.gid == "offline":
                 offline_count = count
 
-        payload = {
+        return {
             "id": self.list_id,
             "guild_id": str(self.guild_id),
             "groups": [
@@ -629,6 +984,15 @@ class GuildMemberList:
             "online_count": member_count - offline_count,
         }
 
+    async def _dispatch_sess(
+        self, session_ids: Iterable[str], operations: List[Operation]
+    ):
+        """Dispatch a GUILD_MEMBER_LIST_UPDATE to the
+        given session ids."""
+
+        # construct the payload to dispatch
+        payload = self._payload(operations)
+
         states = map(self._get_state, session_ids)
         dispatched = []
 
@@ -641,6 +1005,98 @@ class GuildMemberList:
 
         return dispatched
 
+    async def _queue_sess(
+        self, session_ids: Iterable[str], operations: List[Operation]
+    ) -> List[str]:
+        """Queue operations for the given session ids.
+
+        Operations are held for LAZY_GUILD_COALESCE_WINDOW seconds, so that
+        bursts of changes to the list go out as a single
+        GUILD_MEMBER_LIST_UPDATE per session.
+        """
+        window = app.config.get("LAZY_GUILD_COALESCE_WINDOW", 0.1)
+        if window <= 0:
+            return await self._dispatch_sess(session_ids, operations)
+
+        queued = []
+        for session_id in session_ids:
+            if self._get_state(session_id) is None:
+                continue
+
+            self._pending_ops.setdefault(session_id, []).extend(operations)
+            queued.append(session_id)
+
+        if self._pending_ops and self._flush_task is None:
+            self._flush_task = app.sched.spawn(self._flush_later(window))
+
+        return queued
+
+    async def _flush_later(self, window: float):
+        await asyncio.sleep(window)
+        self._flush_task = None
+        await self._flush()
+
+    def _coalesce(self, session_id: str, operations: List[Operation]):
+        """Merge the queued operations of a session.
+
+        UPDATEs of an item replace the previous UPDATE of the same item,
+        and a SYNC replaces the UPDATEs and SYNCs inside its range, as long
+        as no INSERT or DELETE moved items in between. Past
+        LAZY_GUILD_COALESCE_MAX_OPS operations, the session's ranges
+        from the first changed item onwards are SYNCed instead.
+        """
+        merged: List[Operation] = []
+        # index in merged where the last INSERT or DELETE is
+        barrier = 0
+
+        for operation in operations:
+            if operation.list_op in ("INSERT", "DELETE"):
+                merged.append(operation)
+                barrier = len(merged)
+                continue
+
+            merged[barrier:] = [
+                op for op in merged[barrier:] if not _covers(operation, op)
+            ]
+            merged.append(operation)
+
+        if len(merged) <= app.config.get("LAZY_GUILD_COALESCE_MAX_OPS", 20):
+            return merged
+
+        first_index = min(
+            (
+                op.params["index"] if "index" in op.params else op.params["range"][0]
+                for op in merged
+            ),
+            default=0,
+        )
+        return [
+            Operation(
+                "SYNC",
+                {"range": [start, end], "items": self.get_items(start, end)},
+            )
+            for start, end in sorted(self.state.get(session_id, ()))
+            if end >= first_index
+        ]
+
+    async def _flush(self):
+        """Send every queued operation."""
+        pending, self._pending_ops = self._pending_ops, {}
+        if not pending:
+            return
+
+        # groups and counts are the same for every session
+        base = self._payload([])
+
+        for session_id, operations in pending.items():
+            state = self._get_state(session_id)
+            operations = self._coalesce(session_id, operations)
+            if state is None or not operations:
+                continue
+
+            payload = {**base, "ops": [op.to_dict for op in operations]}
+            await state.dispatch("GUILD_MEMBER_LIST_UPDATE", payload)
+
     async def _resync(self, session_ids: List[str], item_index: int) -> List[str]:
         """Send a SYNC event to all states that are subscribed to an item.
 
@@ -657,27 +1113,33 @@ class GuildMemberList:
             # find the list range that the group was on
             # so we resync only the given range, instead
             # of the whole list state.
-            ranges = self.state[session_id]
-
-            try:
-                # get the only range where the group is in
-                role_range = next(
-                    (r_min, r_max)
-                    for r_min, r_max in ranges
-                    if r_min <= item_index <= r_max
-                )
-            except StopIteration:
+            role_range = self._get_range(item_index, session_id)
+
+            if role_range is None:
                 log.debug(
                     "ignoring sess_id={}, no range for item {}, {}",
                     session_id,
                     item_index,
-                    ranges,
+                    self.state.get(session_id),
                 )
                 continue
 
-            # do resync-ing in the background
             result.append(session_id)
-            app.sched.spawn(self.shard_query(session_id, [role_range]))
+            if app.config.get("LAZY_GUILD_COALESCE_WINDOW", 0.1) <= 0:
+                # do resync-ing in the background
+                app.sched.spawn(self.shard_query(session_id, [role_range]))
+                continue
+
+            start, end = role_range
+            await self._queue_sess(
+                [session_id],
+                [
+                    Operation(
+                        "SYNC",
+                        {"range": [start, end], "items": self.get_items(start, end)},
+                    )
+                ],
+            )
 
         return result
 
@@ -722,7 +1184,9 @@ class GuildMemberList:
 
         await self._init_check()
 
-        ops = []
+        # operations still waiting to be sent go first,
+        # so they don't land on top of the fresh SYNCs
+        ops = self._pending_ops.pop(session_id, [])
 
         for start, end in ranges:
             itemcount = end - start
@@ -731,11 +1195,12 @@ class GuildMemberList:
             if itemcount < 0:
                 continue
 
-            self.state[session_id].add((start, end))
+            self._add_range(session_id, start, end)
 
             ops.append(
                 Operation(
-                    "SYNC", {"range": [start, end], "items": self.items[start:end]}
+                    "SYNC",
+                    {"range": [start, end], "items": self.get_items(start, end)},
                 )
             )
 
@@ -744,23 +1209,7 @@ class GuildMemberList:
 
     def _get_item_index(self, user_id: Union[str, int]) -> Optional[int]:
         """Get the item index a user is on."""
-        # NOTE: this is inefficient
-        user_id = int(user_id)
-        index = 1
-
-        for _g, member_ids in self.list.iter_non_empty:
-            try:
-                relative_index = member_ids.index(user_id)
-                index += relative_index
-
-                return index
-            except ValueError:
-                pass
-
-            # +1 is for the group item
-            index += 1 + len(member_ids)
-
-        return None
+        return self.list.item_index(int(user_id))
 
     def _get_group_item_index(self, group_id: GroupID) -> Optional[int]:
         """Get the item index a group is on."""
@@ -774,23 +1223,27 @@ class GuildMemberList:
 
         return None
 
+    def _get_range(self, item_index: int, session_id: str) -> Optional[Tuple[int, int]]:
+        """Get the range of a state that includes the given item index."""
+        for range_start, range_end in self.state.get(session_id, ()):
+            if range_start <= item_index <= range_end:
+                return range_start, range_end
+
+        return None
+
     def _is_subbed(self, item_index, session_id: str) -> bool:
         """Return if a state's ranges include the given
         item index."""
+        return self._get_range(item_index, session_id) is not None
 
-        ranges = self.state[session_id]
-
-        for range_start, range_end in ranges:
-            if range_start <= item_index <= range_end:
-                return True
-
-        return False
-
-    def _get_subs(self, item_index: int) -> Iterable[str]:
+    def _get_subs(self, item_index: int) -> List[str]:
         """Get the list of subscribed states to a given item."""
-        return filter(
-            lambda sess_id: self._is_subbed(item_index, sess_id), self.state.keys()
-        )
+        candidates = self._range_index.get(item_index // RANGE_BUCKET, set())
+        return [
+            session_id
+            for session_id in candidates | self._wide_subs
+            if self._is_subbed(item_index, session_id)
+        ]
 
     async def _pres_update_simple(self, user_id: int):
         """Handler for simple presence updates.
@@ -805,12 +1258,12 @@ class GuildMemberList:
             log.warning("lazy guild got invalid pres update uid={}", user_id)
             return []
 
-        item = self.items[item_index]
+        item = self.get_item(item_index)
         session_ids = self._get_subs(item_index)
 
         # simple update means we just give an UPDATE
         # operation
-        return await self._dispatch_sess(
+        return await self._queue_sess(
             session_ids, [Operation("UPDATE", {"index": item_index, "item": item})]
         )
 
@@ -849,10 +1302,8 @@ class GuildMemberList:
         ops.append(Operation("DELETE", {"index": old_user_index}))
 
         # do the necessary changes
-        self.list.data[old_group].remove(user_id)
-        self.list.data[new_group].append(user_id)
-
-        await self._sort_groups()
+        self.list.remove(old_group, user_id)
+        self.list.insert(new_group, user_id, self._sort_key(user_id))
 
         new_user_index = self._get_item_index(user_id)
         assert new_user_index is not None
@@ -864,7 +1315,7 @@ class GuildMemberList:
                     "index": new_user_index,
                     # TODO: maybe construct the new item manually
                     # instead of resorting to items list?
-                    "item": self.items[new_user_index],
+                    "item": self.get_item(new_user_index),
                 },
             )
         )
@@ -921,7 +1372,7 @@ class GuildMemberList:
 
         old_user_index = self._get_item_index(user_id)
         assert old_user_index is not None
-        self.list.data[old_group].remove(user_id)
+        self.list.remove(old_group, user_id)
         session_ids_old = list(self._get_subs(old_user_index))
         return await self._resync(session_ids_old, old_user_index)
 
@@ -941,21 +1392,18 @@ class GuildMemberList:
             log.warning("lazy: did not find pres for new uid {}", user_id)
             return
 
-        # insert to pres dict
-        self.list.presences[user_id] = pres
-        self.list.members[user_id] = member
+        entry = ListMember(member, pres, self.list.intern_roles(member["roles"]))
+        self.list.members[user_id] = entry
+        self.memory += self.list.member_size(user_id)
 
         # find a group for the newcomer
-        group_id = await self._get_group_for_member(
-            user_id, member["roles"], pres["status"]
-        )
+        group_id = await self._get_group_for_member(user_id, entry.roles, entry.status)
 
         if group_id is None:
             log.warning("lazy: not adding uid {}, no group", user_id)
             return
 
-        self.list.data[group_id].append(user_id)
-        await self._sort_groups()
+        self.list.insert(group_id, user_id, self._sort_key(user_id))
 
         user_index = self._get_item_index(user_id)
 
@@ -981,7 +1429,7 @@ class GuildMemberList:
 
             # if unknown state, remove from the subscriber list
             if state is None:
-                self.state.pop(session_id)
+                self._drop_session(session_id)
                 continue
 
             # if we aren't talking about the state the user
@@ -991,7 +1439,7 @@ class GuildMemberList:
 
             # state.user_id == user_id being removed,
             # so we remove it.
-            self.state.pop(session_id)
+            self._drop_session(session_id)
 
         old_len = len(state_keys)
         removed = old_len - len(self.state)
@@ -1000,27 +1448,21 @@ class GuildMemberList:
 
         # then clean anything on the internal member list
         # about the member being removed.
-        try:
-            pres = self.list.presences.pop(user_id)
-        except KeyError:
-            log.warning("lazy: unknown pres uid {}", user_id)
-            return
+        self.memory -= self.list.member_size(user_id)
 
         try:
-            member = self.list.members.pop(user_id)
+            self.list.members.pop(user_id)
         except KeyError:
             log.warning("lazy: unknown member uid {}", user_id)
             return
 
-        group_id = await self._get_group_for_member(
-            user_id, member["roles"], pres["status"]
-        )
+        group_id = self.list.member_groups.get(user_id)
 
-        if not group_id:
+        if group_id is None:
             log.warning("lazy: unknown group uid {}", user_id)
             return
 
-        self.list.data[group_id].remove(user_id)
+        self.list.remove(group_id, user_id)
 
         if old_idx is None:
             log.warning("lazy: unknown old idx uid {}", user_id)
@@ -1038,12 +1480,26 @@ class GuildMemberList:
             log.warning("lazy: ignoring unknown uid {}", user_id)
             return
 
+        old_idx = self._get_item_index(user_id)
+
         # update user information inside self.list.members
-        self.list.members[user_id]["user"] = await self.storage.get_user(user_id)
+        self.list.members[user_id].user = await self.storage.get_user(user_id)
+
+        # a new username can move the member inside its group
+        group_id = self.list.member_groups.get(user_id)
+        sort_key = self._sort_key(user_id)
+        if group_id is not None and sort_key != self.list.sort_keys[user_id]:
+            self.list.remove(group_id, user_id)
+            self.list.insert(group_id, user_id, sort_key)
 
         # redispatch
         user_idx = self._get_item_index(user_id)
-        return await self._resync_by_item(user_idx)
+        if user_idx == old_idx:
+            return await self._resync_by_item(user_idx)
+
+        return await self._resync_by_item(old_idx) + await self._resync_by_item(
+            user_idx
+        )
 
     async def pres_update(self, user_id: int, partial_presence: Presence):
         """Update a presence inside the member list.
@@ -1068,36 +1524,26 @@ class GuildMemberList:
         """
         await self._init_check()
 
-        old_group = None
-        old_presence = self.list.presences[user_id]
+        member = self.list.members.get(user_id)
         has_nick = "nick" in partial_presence
 
-        for group, member_ids in self.list:
-            try:
-                old_index = member_ids.index(user_id)
-            except ValueError:
-                log.debug("skipping group {}", group)
-                continue
-
-            log.debug("found index for uid={}: gid={}", user_id, group.gid)
-
-            old_group = group.gid
-            break
+        old_group = self.list.member_groups.get(user_id)
+        old_index = self.list.relative_index(user_id)
 
         # if we didn't find any old group for
         # the member, then that means the member
         # wasn't in the list in the first place
 
-        if not old_group:
+        if member is None or old_group is None or old_index is None:
             log.warning("pres update with unknown old group uid={}", user_id)
             return []
 
-        avatar = partial_presence.get("avatar", old_presence.get("avatar"))
-        banner = partial_presence.get("banner", old_presence.get("banner"))
-        bio = partial_presence.get("bio", old_presence.get("bio") or "")
-        pronouns = partial_presence.get("pronouns", old_presence.get("pronouns") or "")
-        roles = partial_presence.get("roles", old_presence["roles"])
-        status = partial_presence.get("status", old_presence["status"])
+        avatar = partial_presence.get("avatar", member.avatar)
+        banner = partial_presence.get("banner", member.banner)
+        bio = partial_presence.get("bio", member.bio)
+        pronouns = partial_presence.get("pronouns", member.pronouns)
+        roles = self.list.intern_roles(partial_presence.get("roles", member.roles))
+        status = partial_presence.get("status", member.status)
 
         # calculate a possible new group
         new_group = await self._get_group_for_member(user_id, roles, status)
@@ -1112,18 +1558,22 @@ class GuildMemberList:
 
         # update our presence with the given partial presence
         # since in both cases we'd update it anyways
-        self.list.presences[user_id].update(partial_presence)
+        member.status = status
+        if "game" in partial_presence:
+            member.game = partial_presence["game"]
+        if "activities" in partial_presence:
+            member.activities = partial_presence["activities"] or None
 
         # TODO: refactor presence semantics. what will partial_presence
         # actually have? this is a hack to make nicks work.
         if has_nick:
-            self.list.members[user_id]["nick"] = partial_presence["nick"]
+            member.nick = partial_presence["nick"]
 
-        self.list.members[user_id]["avatar"] = avatar
-        self.list.members[user_id]["banner"] = banner
-        self.list.members[user_id]["bio"] = bio
-        self.list.members[user_id]["pronouns"] = pronouns
-        self.list.members[user_id]["roles"] = roles
+        member.avatar = avatar
+        member.banner = banner
+        member.bio = bio or ""
+        member.pronouns = pronouns or ""
+        member.roles = roles
 
         # if we're going to the same group AND there are no
         # nickname changes, treat this as a simple update
@@ -1181,7 +1631,7 @@ class GuildMemberList:
 
         # NOTE: maybe that assumption changes
         # when bots come along.
-        self.list.data[new_group.gid] = []
+        self.list.new_group(new_group.gid)
 
     def _get_role_as_group_idx(self, role_id: int) -> Optional[int]:
         """Get a group index representing the given role id.
@@ -1263,6 +1713,7 @@ class GuildMemberList:
         )
 
         self.list.groups = new_groups
+        self.list.invalidate()
         new_index = self._get_group_item_index(role_id)
 
         return await self._resync(old_sessions, old_index) + await self._resync_by_item(
@@ -1356,6 +1807,7 @@ class GuildMemberList:
 
         if groups_index is not None:
             del self.list.groups[groups_index]
+            self.list.invalidate()
         else:
             log.warning("list unstable: {} not on group list", role_id)
 
@@ -1363,7 +1815,7 @@ class GuildMemberList:
         try:
             # we need to reassign those orphan presences
             # into a new group
-            member_ids = self.list.data.pop(role_id)
+            member_ids = self.list.pop_group(role_id)
 
             # by calling the same functions we'd be calling
             # when generating the guild, we can reassign
@@ -1373,10 +1825,9 @@ class GuildMemberList:
             members = [self.list.members[mid] for mid in member_ids]
             if deleted:
                 for member in members:
-                    try:
-                        member["roles"].remove(str(role_id))
-                    except ValueError:
-                        pass
+                    member.roles = self.list.intern_roles(
+                        rid for rid in member.roles if rid != str(role_id)
+                    )
             await self._list_fill_groups(members)
             await self._sort_groups()
         except KeyError:
@@ -1444,74 +1895,210 @@ class GuildMemberList:
         self.channel_id = 0
         self._set_empty_list()
         self.state = {}
+        self._range_index.clear()
+        self._wide_subs.clear()
+
+        self._pending_ops = {}
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
 
 
 class LazyGuildManager:
-    """Main class holding the member lists for lazy guilds."""
+    """Main class holding the member lists for lazy guilds.
+
+    Channels whose overwrites give the same read permissions share
+    a single :class:`GuildMemberList`.
+
+    Lists are kept in least recently used order, and idle lists are
+    evicted once all lists go over LAZY_GUILD_MEMORY_BUDGET bytes.
+    """
 
     def __init__(self):
         # {chan_id: gml, ...}
         self.state: Dict[int, GuildMemberList] = {}
 
+        # {(guild_id, overwrites hash): gml, ...}, least recently used first
+        self.lists: "OrderedDict[Tuple[int, str], GuildMemberList]" = OrderedDict()
+
+        #: how many lists were evicted to stay under the memory budget
+        self.evictions = 0
+
         #: store which guilds have their
         #  respective GMLs
         # {guild_id: [chan_id, ...], ...}
         self.guild_map: Dict[int, List[int]] = defaultdict(list)
 
+    async def _list_key(self, guild_id: int, channel_id: int) -> Tuple[int, str]:
+        """Get the key of the member list a channel should use."""
+        if channel_id == guild_id:
+            return guild_id, "everyone"
+
+        overwrites = await app.storage.chan_overwrites(channel_id, safe=False)
+        return guild_id, overwrites_hash({ov["id"]: ov for ov in overwrites})
+
     async def get_gml(self, channel_id: int) -> GuildMemberList:
         """Get a guild list for a channel ID,
         generating it if it doesn't exist."""
         try:
-            return self.state[channel_id]
+            gml = self.state[channel_id]
         except KeyError:
-            guild_id = await app.storage.guild_from_channel(channel_id)
+            pass
+        else:
+            self.lists.move_to_end(gml.list_key)
+            return gml
 
-            # if we don't find a guild, we just
-            # set it the same as the channel.
-            if not guild_id:
-                guild_id = channel_id
+        guild_id = await app.storage.guild_from_channel(channel_id)
 
-            gml = GuildMemberList(guild_id, channel_id)
-            self.state[channel_id] = gml
-            self.guild_map[guild_id].append(channel_id)
-            return gml
+        # if we don't find a guild, we just
+        # set it the same as the channel.
+        if not guild_id:
+            guild_id = channel_id
+
+        list_key = await self._list_key(guild_id, channel_id)
+
+        # someone else might have set it up while we were fetching
+        if channel_id in self.state:
+            return self.state[channel_id]
+
+        gml = self.lists.get(list_key)
+        if gml is None:
+            self.evict()
+            gml = GuildMemberList(guild_id, channel_id, list_key)
+            self.lists[list_key] = gml
+        else:
+            self.lists.move_to_end(list_key)
+            gml.channel_ids.add(channel_id)
+
+        self.state[channel_id] = gml
+        self.guild_map[guild_id].append(channel_id)
+        return gml
 
     def get_gml_guild(self, guild_id: int) -> List[GuildMemberList]:
         """Get all member lists for a given guild."""
-        res: List[GuildMemberList] = []
+        res: Dict[Tuple[int, str], GuildMemberList] = {}
 
         channel_ids: List[int] = self.guild_map[guild_id]
-        for channel_id in channel_ids:
+        for channel_id in list(channel_ids):
             guild_list: Optional[GuildMemberList] = self.state.get(channel_id)
             if guild_list is None:
                 self.guild_map[guild_id].remove(channel_id)
                 continue
 
-            res.append(guild_list)
+            res[guild_list.list_key] = guild_list
 
-        return res
+        return list(res.values())
+
+    def _detach(self, channel_id: int):
+        """Stop a channel from using its member list, closing
+        the list if no other channel uses it."""
+        gml = self.state.pop(channel_id)
+
+        try:
+            self.guild_map[gml.guild_id].remove(channel_id)
+        except ValueError:
+            pass
+
+        gml.channel_ids.discard(channel_id)
+        if gml.channel_ids:
+            # the list keeps working through one of its other channels
+            if gml.channel_id == channel_id:
+                gml.channel_id = next(iter(gml.channel_ids))
+            return
+
+        self.lists.pop(gml.list_key, None)
+        gml.close()
 
     async def unsub(self, chan_id, session_id):
         """Unsubscribe a session from the list."""
         gml = await self.get_gml(chan_id)
         gml.unsub(session_id)
+        self.evict()
+
+    @property
+    def memory(self) -> int:
+        """Approximate how many bytes all member lists take."""
+        return sum(gml.memory for gml in self.lists.values())
+
+    def evict(self):
+        """Close idle member lists, least recently used first,
+        until all lists fit in the memory budget."""
+        budget = app.config.get("LAZY_GUILD_MEMORY_BUDGET", 256 * 1024 * 1024)
+        total = self.memory
+        if total <= budget:
+            return
+
+        for gml in list(self.lists.values()):
+            if total <= budget:
+                break
+
+            if not gml.memory or not gml.is_idle():
+                continue
+
+            log.info(
+                "evicting idle GML gid={} list={}, {} bytes",
+                gml.guild_id,
+                gml.list_key[1],
+                gml.memory,
+            )
+            total -= gml.memory
+            self.evictions += 1
+
+            for channel_id in list(gml.channel_ids):
+                self._detach(channel_id)
+
+    def stats(self) -> dict:
+        return {
+            "lists": len(self.lists),
+            "channels": len(self.state),
+            "memory": self.memory,
+            "budget": app.config.get("LAZY_GUILD_MEMORY_BUDGET", 256 * 1024 * 1024),
+            "evictions": self.evictions,
+            "per_list": [
+                {
+                    "guild_id": str(gml.guild_id),
+                    "list_id": gml.list_key[1],
+                    "channels": len(gml.channel_ids),
+                    "members": len(gml.list.members),
+                    "subscribers": len(gml.state),
+                    "memory": gml.memory,
+                }
+                for gml in sorted(
+                    self.lists.values(), key=lambda gml: gml.memory, reverse=True
+                )
+            ],
+        }
 
     def remove_channel(self, channel_id: int):
         """Remove a channel from the manager."""
-        try:
-            gml = self.state.pop(channel_id)
+        if channel_id in self.state:
+            self._detach(channel_id)
 
-            # remove it from guild map as well
-            guild_id = gml.guild_id
-            self.guild_map[guild_id].remove(channel_id)
+    async def chan_update(self, channel_id: int):
+        """Signal a channel update to a member list.
 
-            gml.close()
-        except (KeyError, ValueError):
-            pass
+        If the channel's read overwrites changed, it is moved
+        to the member list of its new overwrites. The subscribers of the
+        old list are subscribed to the new one with the same ranges, as
+        any of them could be looking at the channel.
+        """
+        gml = self.state.get(channel_id)
+        if gml is None:
+            return
+
+        list_key = await self._list_key(gml.guild_id, channel_id)
+        if list_key != gml.list_key and channel_id in self.state:
+            subscribers = {
+                session_id: sorted(ranges) for session_id, ranges in gml.state.items()
+            }
+
+            self._detach(channel_id)
+            gml = await self.get_gml(channel_id)
+
+            for session_id, ranges in subscribers.items():
+                if gml._get_state(session_id) is not None:
+                    await gml.shard_query(session_id, ranges)
 
-    async def chan_update(self, channel_id: int):
-        """Signal a channel update to a member list."""
-        gml = await self.get_gml(channel_id)
         await gml.chan_update()
 
     async def _call_all_lists(self, guild_id, method_str: str, *args, **kwargs):
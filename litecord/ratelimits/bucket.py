@@ -24,6 +24,8 @@ main litecord ratelimiting code
     which in turn is a work on top of discord.py's ratelimiting.
 """
 import time
+from collections import OrderedDict
+from typing import Any, Optional
 
 
 class RatelimitBucket:
@@ -78,6 +80,16 @@ class RatelimitBucket:
         if self._tokens == 0:
             self._window = current
 
+    @property
+    def remaining(self) -> int:
+        """How many requests can be made in the current window."""
+        return self._tokens
+
+    @property
+    def reset_at(self) -> float:
+        """Timestamp of when the current window ends."""
+        return self._window + self.second
+
     def reset(self):
         """Reset current ratelimit to default state."""
         self._tokens = self.requests
@@ -100,10 +112,15 @@ class RatelimitBucket:
 
 
 class Ratelimit:
-    """Manages buckets."""
+    """Manages buckets.
+
+    Buckets are kept in the order they were last accessed in. All of
+    them share the same window, so the expired ones are always at the
+    front and get dropped without scanning the whole cache.
+    """
 
     def __init__(self, tokens, second, keys=None):
-        self._cache = {}
+        self._cache: "OrderedDict[Any, RatelimitBucket]" = OrderedDict()
         if keys is None:
             keys = tuple()
         self.keys = keys
@@ -112,23 +129,30 @@ class Ratelimit:
     def __repr__(self):
         return f"<Ratelimit cooldown={self._cooldown}>"
 
-    def _verify_cache(self):
-        current = time.time()
-        dead_keys = [k for k, v in self._cache.items() if current > v._last + v.second]
+    def sweep(self, current: Optional[float] = None):
+        """Drop buckets that were not used for a whole window."""
+        current = current or time.time()
+
+        while self._cache:
+            key, bucket = next(iter(self._cache.items()))
+            if current <= bucket._last + bucket.second:
+                break
 
-        for k in dead_keys:
-            del self._cache[k]
+            del self._cache[key]
 
     def get_bucket(self, key) -> RatelimitBucket:
         if not self._cooldown:
             return None
 
-        self._verify_cache()
+        self.sweep()
 
-        if key not in self._cache:
+        bucket = self._cache.get(key)
+        if bucket is None:
             bucket = self._cooldown.copy()
             self._cache[key] = bucket
         else:
-            bucket = self._cache[key]
+            self._cache.move_to_end(key)
 
+        # the bucket is about to be used, keep it until its window ends
+        bucket._last = time.time()
         return bucket
@@ -0,0 +1,287 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""
+GCRA (generic cell rate algorithm) ratelimiting.
+
+    Every key only needs its theoretical arrival time (TAT): the time at
+    which its bucket would be full again. Those are kept in a fixed-size
+    open addressing table of (key hash, TAT) slots, either in a local
+    buffer or in shared memory so that every worker enforces the same
+    limits.
+"""
+
+import fcntl
+import hashlib
+import os
+import struct
+import tempfile
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+from logbook import Logger
+
+log = Logger(__name__)
+
+#: a slot holds the 64-bit hash of a key (0 for an empty slot) and its TAT
+SLOT = struct.Struct("=Qd")
+
+#: how many slots are looked at before giving up on a key
+MAX_PROBES = 32
+
+
+def key_hash(key: str) -> int:
+    """Hash a key the same way in every process."""
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def make_backend(kind: Optional[str], name: str, slots: int):
+    """Create the backend RATELIMIT_BACKEND asks for, None for
+    the in-process token buckets."""
+    if kind in (None, "bucket"):
+        return None
+
+    if kind == "gcra":
+        return LocalBackend(slots)
+
+    if kind == "shared":
+        return SharedMemoryBackend(name, slots)
+
+    raise ValueError(f"unknown ratelimit backend {kind!r}")
+
+
+class GCRATable:
+    """Open addressing hash table of key hashes to TATs.
+
+    Slots are never emptied, a slot whose TAT has passed is free to be
+    taken by another key, since a TAT in the past is the same as no TAT.
+    """
+
+    def __init__(self, buf, slots: int):
+        self.buf = buf
+        self.slots = slots
+
+        #: keys that were let through because the table was full
+        self.overflows = 0
+
+    def _find(self, hashed: int, now: float) -> Tuple[Optional[int], float]:
+        """Get the slot of a key (or the slot to put it in) and its TAT."""
+        free = None
+        start = hashed % self.slots
+
+        for probe in range(MAX_PROBES):
+            index = (start + probe) % self.slots
+            slot_hash, tat = SLOT.unpack_from(self.buf, index * SLOT.size)
+
+            if slot_hash == hashed:
+                return index, tat
+
+            if slot_hash == 0:
+                return (index if free is None else free), 0.0
+
+            if free is None and tat <= now:
+                free = index
+
+        return free, 0.0
+
+    def peek(self, hashed: int, now: float) -> float:
+        """Get the TAT of a key."""
+        _, tat = self._find(hashed, now)
+        return tat
+
+    def update(
+        self, hashed: int, emission: float, period: float, now: float
+    ) -> Tuple[bool, float]:
+        """Let a request through if the key allows it.
+
+        Returns if the request is allowed, and the TAT of the key.
+        """
+        index, tat = self._find(hashed, now)
+
+        new_tat = max(tat, now) + emission
+        if new_tat - period > now:
+            return False, tat
+
+        if index is None:
+            self.overflows += 1
+            return True, new_tat
+
+        SLOT.pack_into(self.buf, index * SLOT.size, hashed, new_tat)
+        return True, new_tat
+
+    def usage(self, now: float) -> int:
+        """Count the slots holding a TAT that has not passed."""
+        return sum(
+            1
+            for slot_hash, tat in SLOT.iter_unpack(self.buf[: self.slots * SLOT.size])
+            if slot_hash and tat > now
+        )
+
+
+class LocalBackend:
+    """GCRA table for a single process."""
+
+    def __init__(self, slots: int = 1 << 18):
+        self.table = GCRATable(bytearray(slots * SLOT.size), slots)
+
+    def peek(self, hashed: int, now: float) -> float:
+        return self.table.peek(hashed, now)
+
+    def update(
+        self, hashed: int, emission: float, period: float, now: float
+    ) -> Tuple[bool, float]:
+        return self.table.update(hashed, emission, period, now)
+
+    def close(self):
+        pass
+
+
+class SharedMemoryBackend:
+    """GCRA table in shared memory, used by every worker on the machine.
+
+    The first worker creates the shared memory block, the others attach
+    to it. Updates are serialized with a lock file.
+    """
+
+    def __init__(self, name: str = "litecord_ratelimits", slots: int = 1 << 18):
+        size = slots * SLOT.size
+
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            self.shm = shared_memory.SharedMemory(name)
+
+        # the block outlives any single worker, don't let the
+        # resource tracker unlink it when this one exits
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        # the block may be bigger than asked for (rounded to pages)
+        slots = min(slots, self.shm.size // SLOT.size)
+        self.table = GCRATable(self.shm.buf, slots)
+        self._lock = os.open(
+            os.path.join(tempfile.gettempdir(), f"{name}.lock"),
+            os.O_RDWR | os.O_CREAT,
+            0o600,
+        )
+
+    def peek(self, hashed: int, now: float) -> float:
+        return self.table.peek(hashed, now)
+
+    def update(
+        self, hashed: int, emission: float, period: float, now: float
+    ) -> Tuple[bool, float]:
+        fcntl.lockf(self._lock, fcntl.LOCK_EX)
+        try:
+            return self.table.update(hashed, emission, period, now)
+        finally:
+            fcntl.lockf(self._lock, fcntl.LOCK_UN)
+
+    def close(self):
+        """Detach from the shared memory block, leaving it to the
+        other workers."""
+        self.table.buf = None
+        self.shm.close()
+        os.close(self._lock)
+
+
+class GCRABucket:
+    """A key of a :class:`GCRARatelimit`.
+
+    Has the same interface as :class:`RatelimitBucket`.
+    """
+
+    __slots__ = ("ratelimit", "key", "_tat")
+
+    def __init__(self, ratelimit: "GCRARatelimit", key: int, tat: float):
+        self.ratelimit = ratelimit
+        #: hash of the key, see key_hash
+        self.key = key
+        self._tat = tat
+
+    @property
+    def requests(self) -> int:
+        return self.ratelimit.requests
+
+    @property
+    def second(self) -> float:
+        return self.ratelimit.second
+
+    def update_rate_limit(self) -> Optional[float]:
+        """Use a request, returning how long to wait if ratelimited."""
+        ratelimit = self.ratelimit
+        if not ratelimit.requests:
+            return float(ratelimit.second)
+
+        now = time.time()
+        allowed, self._tat = ratelimit.backend.update(
+            self.key, ratelimit.emission, ratelimit.second, now
+        )
+
+        if allowed:
+            return None
+
+        return self._tat + ratelimit.emission - ratelimit.second - now
+
+    @property
+    def remaining(self) -> int:
+        """How many requests can be made right now."""
+        if not self.requests:
+            return 0
+
+        used = max(self._tat - time.time(), 0)
+        return max(int((self.second - used) / self.ratelimit.emission), 0)
+
+    @property
+    def reset_at(self) -> float:
+        """Timestamp of when all requests are available again."""
+        return max(self._tat, time.time())
+
+    def __repr__(self):
+        return f"<GCRABucket key={self.key:x} tat={self._tat}>"
+
+
+class GCRARatelimit:
+    """Ratelimit of ``tokens`` requests every ``second`` seconds,
+    enforced with GCRA on a shared backend.
+
+    Has the same interface as :class:`Ratelimit`.
+    """
+
+    def __init__(self, name: str, tokens, second, backend, keys=None):
+        self.name = name
+        self.requests = tokens
+        self.second = second
+        self.keys = keys or tuple()
+        self.backend = backend
+
+        #: time between two requests at the sustained rate
+        self.emission = second / tokens if tokens else float(second)
+
+    def __repr__(self):
+        return f"<GCRARatelimit name={self.name} {self.requests}/{self.second}s>"
+
+    def get_bucket(self, key) -> GCRABucket:
+        hashed = key_hash(f"{self.name}:{key}")
+        return GCRABucket(self, hashed, self.backend.peek(hashed, time.time()))
+
+    def sweep(self, current: Optional[float] = None):
+        """Expired keys take no memory besides their slot,
+        which is reused as soon as it expires."""
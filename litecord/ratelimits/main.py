@@ -17,7 +17,12 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import asyncio
+import time
+from typing import Union
+
 from litecord.ratelimits.bucket import Ratelimit
+from litecord.ratelimits.gcra import GCRARatelimit
 
 """
 REST:
@@ -56,15 +61,33 @@ RATELIMITS = {
 
 
 class RatelimitManager:
-    """Manager for the bucket managers"""
+    """Manager for the bucket managers
+
+    With a GCRA backend (see litecord.ratelimits.gcra), every ratelimit
+    is enforced through it instead of in-process token buckets.
+    """
 
-    def __init__(self, testing_flag=False):
+    def __init__(self, testing_flag=False, backend=None):
         self._ratelimiters = {}
         self._test = testing_flag
-        self.global_bucket = Ratelimit(50, 1)
+        self.backend = backend
+        self.global_bucket = self._gcra("global", Ratelimit(50, 1))
         self._fill_rtl()
 
+    def _gcra(self, name: str, rtl: Ratelimit) -> Union[Ratelimit, GCRARatelimit]:
+        """Move a ratelimit to the GCRA backend, if there is one."""
+        if self.backend is None:
+            return rtl
+
+        cooldown = rtl._cooldown
+        return GCRARatelimit(
+            name, cooldown.requests, cooldown.second, self.backend, rtl.keys
+        )
+
     def _fill_rtl(self):
+        # ratelimits shared between paths keep sharing their keys
+        converted = {}
+
         for path, rtl in RATELIMITS.items():
             # overwrite rtl with a 10/1 for _ws.connect
             # if we're in testing mode.
@@ -73,8 +96,35 @@ class RatelimitManager:
             # we only need to change that one for now.
             rtl = Ratelimit(10, 1) if self._test and path == "_ws.connect" else rtl
 
-            self._ratelimiters[path] = rtl
+            if id(rtl) not in converted:
+                converted[id(rtl)] = self._gcra(path, rtl)
+
+            self._ratelimiters[path] = converted[id(rtl)]
 
-    def get_ratelimit(self, key: str) -> Ratelimit:
+    def get_ratelimit(self, key: str) -> Union[Ratelimit, GCRARatelimit]:
         """Get the :class:`Ratelimit` instance for a given path."""
         return self._ratelimiters.get(key, self.global_bucket)
+
+    def sweep(self):
+        """Drop expired buckets of every ratelimit, including
+        the ones that are not getting any requests."""
+        for ratelimit in {*self._ratelimiters.values(), self.global_bucket}:
+            ratelimit.sweep()
+
+    def stats(self) -> dict:
+        if self.backend is None:
+            return {"backend": "bucket"}
+
+        table = self.backend.table
+        return {
+            "backend": type(self.backend).__name__,
+            "slots": table.slots,
+            "used": table.usage(time.time()),
+            "overflows": table.overflows,
+        }
+
+    async def sweep_job(self, interval: float = 60):
+        """Sweep expired buckets every interval."""
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
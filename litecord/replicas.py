@@ -0,0 +1,152 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+from asyncpg import Pool
+from logbook import Logger
+
+log = Logger(__name__)
+
+#: Seconds between two replica lag checks.
+LAG_CHECK_INTERVAL = 1
+
+LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+    )
+END
+"""
+
+#: Errors that make a replica unusable until its next lag check.
+CONNECTION_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.CannotConnectNowError,
+)
+
+#: Set when the current request may read from a replica. Reads made
+#: outside of a request, like the ones filling gateway caches, always
+#: go to the primary.
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+
+
+class ReplicaRouter:
+    """Route reads between the primary pool and read replicas.
+
+    A replica is only used while its measured replication lag is under
+    ``max_lag`` seconds. Only reads made while handling a request are
+    routed to replicas. Requests that write, and requests made by a user
+    that wrote in the last ``max_lag`` seconds, read from the primary so
+    they always see their own writes.
+    """
+
+    def __init__(self, primary: Pool, replicas: List[Pool], max_lag: float = 5):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag
+
+        # replica index -> lag in seconds, None if it can't be used
+        self.lag: Dict[int, Optional[float]] = dict.fromkeys(range(len(replicas)))
+        self._next = 0
+
+        # user id -> time.monotonic() until which it reads from the primary
+        self._sticky: Dict[int, float] = {}
+
+    def route_request(self, method: str, user_id: Optional[int]):
+        """Decide where the reads of the current request go."""
+        if not self.replicas:
+            return
+
+        now = time.monotonic()
+        if method not in ("GET", "HEAD", "OPTIONS"):
+            if user_id is not None:
+                self._sticky[user_id] = now + self.max_lag
+            return
+
+        deadline = self._sticky.get(user_id) if user_id is not None else None
+        if deadline is not None:
+            if deadline > now:
+                return
+
+            self._sticky.pop(user_id, None)
+
+        _use_replica.set(True)
+
+    def read_pool(self) -> Pool:
+        """Get a pool to read from, preferring healthy replicas."""
+        if not self.replicas or not _use_replica.get():
+            return self.primary
+
+        for _ in range(len(self.replicas)):
+            idx = self._next
+            self._next = (self._next + 1) % len(self.replicas)
+
+            lag = self.lag[idx]
+            if lag is not None and lag <= self.max_lag:
+                return self.replicas[idx]
+
+        return self.primary
+
+    def mark_failed(self, pool: Pool):
+        """Stop reading from a replica until its next lag check."""
+        for idx, replica in enumerate(self.replicas):
+            if replica is pool:
+                log.warning("replica {} failed, falling back to primary", idx)
+                self.lag[idx] = None
+
+    async def check_lag(self):
+        """Measure the replication lag of every replica."""
+        for idx, replica in enumerate(self.replicas):
+            try:
+                self.lag[idx] = float(await replica.fetchval(LAG_QUERY))
+            except Exception:
+                log.exception("failed to check lag of replica {}", idx)
+                self.lag[idx] = None
+
+        now = time.monotonic()
+        for user_id, deadline in list(self._sticky.items()):
+            if deadline <= now:
+                self._sticky.pop(user_id, None)
+
+    async def lag_job(self):
+        """Keep checking replica lag in the background."""
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(LAG_CHECK_INTERVAL)
+
+    async def close(self):
+        for replica in self.replicas:
+            await replica.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": len(self.replicas),
+            "lag": [self.lag[idx] for idx in range(len(self.replicas))],
+            "sticky_users": len(self._sticky),
+        }
@@ -0,0 +1,304 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import asyncio
+import re
+import time
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from logbook import Logger
+
+if TYPE_CHECKING:
+    from litecord.statements import StatementRegistry
+
+log = Logger(__name__)
+
+#: Most search results counted for total_results. Counting every match
+#: of a broad query would cost as much as returning all of them.
+SEARCH_COUNT_CAP = 5000
+
+#: Content tokens of a message. This is the expression of the
+#: messages_content_tsv_idx index, so it must not change on its own.
+CONTENT_TSVECTOR = "to_tsvector('simple', COALESCE(messages.content, ''))"
+
+_ATTACHMENT = "FROM attachments WHERE attachments.message_id = messages.id"
+_EMBEDS = """jsonb_array_elements(
+    CASE WHEN jsonb_typeof(messages.embeds) = 'array'
+    THEN messages.embeds ELSE '[]'::jsonb END
+) AS embed"""
+
+#: Columns of message_search derived from a message, its attachments and pins.
+INDEX_COLUMNS = {
+    "channel_id": "messages.channel_id",
+    "guild_id": "messages.guild_id",
+    "has_link": r"COALESCE(messages.content, '') ~* 'https?://'",
+    "has_embed": "COALESCE(messages.embeds <> '[]'::jsonb, false)",
+    "has_sticker": "COALESCE(messages.sticker_ids <> '[]'::jsonb, false)",
+    "has_attachment": f"EXISTS(SELECT 1 {_ATTACHMENT})",
+    "has_image": f"""(
+        EXISTS(SELECT 1 {_ATTACHMENT} AND attachments.image)
+        OR COALESCE(messages.embeds @> '[{{"type": "image"}}]'::jsonb, false)
+    )""",
+    "has_video": rf"""(
+        EXISTS(SELECT 1 {_ATTACHMENT} AND filename ~* '\.(mp4|webm|mov)$')
+        OR COALESCE(messages.embeds @> '[{{"type": "video"}}]'::jsonb, false)
+    )""",
+    "has_sound": rf"""EXISTS(
+        SELECT 1 {_ATTACHMENT} AND filename ~* '\.(mp3|ogg|wav|flac)$'
+    )""",
+    "pinned": """EXISTS(
+        SELECT 1 FROM channel_pins WHERE channel_pins.message_id = messages.id
+    )""",
+    "mention_ids": "messages.mentions",
+    "link_hostnames": r"""ARRAY(
+        SELECT DISTINCT lower(link[1])
+        FROM regexp_matches(
+            COALESCE(messages.content, ''), 'https?://([^/\s:?#<>]+)', 'gi'
+        ) AS link
+    )""",
+    "attachment_filenames": f"ARRAY(SELECT lower(filename) {_ATTACHMENT})",
+    "attachment_extensions": rf"""ARRAY(
+        SELECT DISTINCT lower(substring(filename from '\.([^.]+)$'))
+        {_ATTACHMENT} AND filename LIKE '%.%'
+    )""",
+    "embed_types": f"""ARRAY(
+        SELECT DISTINCT lower(embed->>'type')
+        FROM {_EMBEDS}
+        WHERE embed->>'type' IS NOT NULL
+    )""",
+    "embed_providers": f"""ARRAY(
+        SELECT DISTINCT lower(embed->'provider'->>'name')
+        FROM {_EMBEDS}
+        WHERE embed->'provider'->>'name' IS NOT NULL
+    )""",
+}
+
+#: (Re)build the message_search rows of the given message IDs.
+INDEX_QUERY = f"""
+INSERT INTO message_search (message_id, {", ".join(INDEX_COLUMNS)})
+SELECT messages.id, {", ".join(INDEX_COLUMNS.values())}
+FROM messages
+WHERE messages.id = ANY($1::bigint[])
+ON CONFLICT (message_id) DO UPDATE SET
+    {", ".join(f"{column} = EXCLUDED.{column}" for column in INDEX_COLUMNS)}
+"""
+
+_HAS_COLUMNS = {
+    "link": "has_link",
+    "embed": "has_embed",
+    "sticker": "has_sticker",
+    "file": "has_attachment",
+    "image": "has_image",
+    "video": "has_video",
+    "sound": "has_sound",
+}
+
+_WORD = re.compile(r"\w+")
+
+
+def content_tsquery(content: str) -> Optional[str]:
+    """Make a tsquery out of search content, matching every word as a prefix.
+
+    Returns None if the content has no words to search for.
+    """
+    words = _WORD.findall(content.lower())
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def search_filters(j: Dict[str, Any], args: List[Any]) -> Tuple[str, bool]:
+    """Build the WHERE conditions of a message search, given the validated
+    SEARCH_CHANNEL arguments. Parameters are appended to ``args``.
+
+    Conditions refer to the messages table and message_search (as search).
+    Also returns whether any of them reads message_search, as messages that
+    weren't indexed yet can only match searches that don't.
+    """
+    uses_index = False
+
+    def param(value: Any) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    def column(name: str) -> str:
+        nonlocal uses_index
+        uses_index = True
+        return f"search.{name}"
+
+    conditions = []
+
+    if j.get("content"):
+        tsquery = content_tsquery(j["content"])
+        if tsquery is not None:
+            conditions.append(
+                f"{CONTENT_TSVECTOR} @@ to_tsquery('simple', {param(tsquery)})"
+            )
+        else:
+            content = param(j["content"])
+            conditions.append(f"messages.content ILIKE '%'||{content}||'%'")
+    if j.get("min_id"):
+        conditions.append(f"messages.id > {param(j['min_id'])}")
+    if j.get("max_id"):
+        conditions.append(f"messages.id < {param(j['max_id'])}")
+    if j.get("author_id"):
+        author_ids = param(j["author_id"])
+        conditions.append(f"messages.author_id = ANY({author_ids}::bigint[])")
+    if j.get("mentions"):
+        conditions.append(
+            f"{column('mention_ids')} && {param(j['mentions'])}::bigint[]"
+        )
+    if j.get("link_hostname"):
+        hostnames = [hostname.lower() for hostname in j["link_hostname"]]
+        conditions.append(f"{column('link_hostnames')} && {param(hostnames)}::text[]")
+    if j.get("embed_provider"):
+        providers = [provider.lower() for provider in j["embed_provider"]]
+        conditions.append(f"{column('embed_providers')} && {param(providers)}::text[]")
+    if j.get("embed_type"):
+        types = [embed_type.lower() for embed_type in j["embed_type"]]
+        conditions.append(f"{column('embed_types')} && {param(types)}::text[]")
+    if j.get("attachment_filename"):
+        patterns = [f"%{filename.lower()}%" for filename in j["attachment_filename"]]
+        conditions.append(
+            f"EXISTS(SELECT 1 FROM unnest({column('attachment_filenames')})"
+            f" AS filename WHERE filename LIKE ANY({param(patterns)}::text[]))"
+        )
+    if j.get("attachment_extension"):
+        extensions = [ext.lower().lstrip(".") for ext in j["attachment_extension"]]
+        conditions.append(
+            f"{column('attachment_extensions')} && {param(extensions)}::text[]"
+        )
+    if j["mention_everyone"] is not None:
+        everyone = param(j["mention_everyone"])
+        conditions.append(f"messages.mention_everyone = {everyone}")
+    if j["pinned"] is not None:
+        conditions.append(f"{column('pinned')} = {param(j['pinned'])}")
+
+    for has in j.get("has", []):
+        condition = column(_HAS_COLUMNS[has.lstrip("-")])
+        conditions.append(f"NOT {condition}" if has.startswith("-") else condition)
+
+    for author_type in j.get("author_type", []):
+        kind = author_type.lstrip("-")
+        if kind == "webhook":
+            condition = "messages.author_id IS NULL"
+        else:
+            condition = (
+                "EXISTS(SELECT 1 FROM users WHERE users.id = messages.author_id"
+                f" AND users.bot = {'true' if kind == 'bot' else 'false'})"
+            )
+
+        if author_type.startswith("-"):
+            condition = f"NOT {condition}"
+        conditions.append(condition)
+
+    return "".join(f" AND {condition}" for condition in conditions), uses_index
+
+
+class SearchIndexer:
+    """Keeps message_search up to date in the background.
+
+    Message writes only queue their IDs here, so building the search row
+    (link hostnames, attachment extensions, embed types, etc.) happens off
+    the send path, many messages per query.
+    """
+
+    def __init__(
+        self,
+        statements: "StatementRegistry",
+        batch_size: int = 500,
+        interval: float = 0.5,
+    ):
+        self.statements = statements
+        self.batch_size = batch_size
+        self.interval = interval
+
+        #: message ID -> when it was first queued, oldest first
+        self._pending: Dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+
+        self.indexed = 0
+        self.batches = 0
+        self.failures = 0
+
+    def enqueue(self, message_ids: Iterable[int]) -> None:
+        """Queue messages to be (re)indexed after a create or edit."""
+        now = time.monotonic()
+        for message_id in message_ids:
+            self._pending.setdefault(message_id, now)
+
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def discard(self, message_ids: Iterable[int]) -> None:
+        """Drop deleted messages from the queue.
+
+        Their message_search rows go away with the message itself.
+        """
+        for message_id in message_ids:
+            self._pending.pop(message_id, None)
+
+    def lag(self) -> float:
+        """Seconds since the oldest message still waiting was queued."""
+        if not self._pending:
+            return 0
+        oldest = next(iter(self._pending.values()))
+        return time.monotonic() - oldest
+
+    async def flush(self) -> None:
+        """Index every queued message, in batches."""
+        while self._pending:
+            batch = dict(islice(self._pending.items(), self.batch_size))
+            for message_id in batch:
+                self._pending.pop(message_id)
+
+            try:
+                await self.statements.execute("index_messages", list(batch))
+            except Exception:
+                # requeue at the front so lag keeps counting from the first try
+                self.failures += 1
+                self._pending = {**batch, **self._pending}
+                raise
+
+            self.indexed += len(batch)
+            self.batches += 1
+
+    async def index_job(self):
+        """Flush the queue every interval, or as soon as a batch is full."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("failed to index {} messages", len(self._pending))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "lag": self.lag(),
+            "indexed": self.indexed,
+            "batches": self.batches,
+            "failures": self.failures,
+        }
@@ -0,0 +1,116 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import time
+from typing import Any, Container, Dict, List, Mapping
+
+from asyncpg import Pool
+
+from litecord.replicas import CONNECTION_ERRORS, ReplicaRouter
+
+
+class Statement:
+    """A named SQL statement and its timings."""
+
+    __slots__ = ("name", "query", "replica", "calls", "total_time")
+
+    def __init__(self, name: str, query: str, replica: bool = False):
+        self.name = name
+        self.query = query
+        self.replica = replica
+        self.calls = 0
+        self.total_time = 0.0
+
+
+class StatementRegistry:
+    """Registry of named, parameterized SQL statements.
+
+    Every statement keeps the same query text for its whole lifetime,
+    so asyncpg prepares it once on each pooled connection and reuses
+    the plan afterwards, instead of seeing a new query for every
+    interpolated value.
+
+    Statements registered with ``replica=True`` are reads that may be
+    served by a read replica. Reads that fill an in-memory cache must
+    stay on the primary, or the cache could keep a lagging copy.
+    """
+
+    def __init__(self, pool: Pool, replicas: ReplicaRouter):
+        self.pool = pool
+        self.replicas = replicas
+        self.statements: Dict[str, Statement] = {}
+
+    def register(self, name: str, query: str, replica: bool = False):
+        """Register a statement under a name."""
+        existing = self.statements.get(name)
+        if existing is not None and existing.query != query:
+            raise ValueError(f"statement {name!r} is already registered")
+
+        self.statements[name] = Statement(name, query, replica)
+
+    def register_many(
+        self, statements: Mapping[str, str], replica: Container[str] = ()
+    ):
+        """Register many statements, given a name to query mapping
+        and the names of the ones that can be read from a replica."""
+        for name, query in statements.items():
+            self.register(name, query, name in replica)
+
+    async def _run(self, method: str, name: str, args) -> Any:
+        stmt = self.statements[name]
+        pool = self.replicas.read_pool() if stmt.replica else self.pool
+
+        start = time.perf_counter()
+        try:
+            if pool is self.pool:
+                return await getattr(pool, method)(stmt.query, *args)
+
+            try:
+                return await getattr(pool, method)(stmt.query, *args)
+            except CONNECTION_ERRORS:
+                self.replicas.mark_failed(pool)
+                return await getattr(self.pool, method)(stmt.query, *args)
+        finally:
+            stmt.calls += 1
+            stmt.total_time += time.perf_counter() - start
+
+    async def fetch(self, name: str, *args) -> List[Any]:
+        return await self._run("fetch", name, args)
+
+    async def fetchrow(self, name: str, *args) -> Any:
+        return await self._run("fetchrow", name, args)
+
+    async def fetchval(self, name: str, *args) -> Any:
+        return await self._run("fetchval", name, args)
+
+    async def execute(self, name: str, *args) -> str:
+        return await self._run("execute", name, args)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Call counts and timings (in milliseconds) of every statement
+        that was used at least once."""
+        return {
+            stmt.name: {
+                "calls": stmt.calls,
+                "total_ms": round(stmt.total_time * 1000, 3),
+                "mean_ms": round(stmt.total_time * 1000 / stmt.calls, 3),
+            }
+            for stmt in self.statements.values()
+            if stmt.calls
+        }
@@ -18,7 +18,22 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional, TypedDict, cast, Iterable, TYPE_CHECKING
+import copy
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import (
+    List,
+    Dict,
+    Any,
+    Optional,
+    TypedDict,
+    cast,
+    Iterable,
+    AsyncIterator,
+    Tuple,
+    TYPE_CHECKING,
+)
 from xml.etree.ElementInclude import include
 
 import aiohttp
@@ -27,7 +42,7 @@ from datetime import datetime, timedelta, date
 from logbook import Logger
 import json
 
-from litecord.enums import ChannelType, MessageFlags, NSFWLevel
+from litecord.enums import ChannelType, MessageFlags, NSFWLevel, GUILD_CHANS
 from litecord.common.messages import PLAN_ID_TO_TYPE
 from litecord.blueprints.channel.reactions import (
     EmojiType,
@@ -37,8 +52,9 @@ from litecord.blueprints.channel.reactions import (
 )
 
 from litecord.types import timestamp_
-from litecord.json import pg_set_json
 from litecord.presence import PresenceManager
+from litecord.search import INDEX_QUERY
+from litecord.member_index import MemberNameIndex
 
 if TYPE_CHECKING:
     from litecord.typing_hax import LitecordApp
@@ -68,6 +84,277 @@ def bool_(val):
     return maybe(int, val)
 
 
+#: Public user columns, shared by every query that builds a user payload.
+USER_FIELDS = [
+    "username",
+    "discriminator",
+    "avatar",
+    "banner",
+    "flags",
+    "bot",
+    "system",
+    "premium_since",
+    "bio",
+    "accent_color",
+    "pronouns",
+    "avatar_decoration",
+    "theme_colors",
+]
+
+#: Member columns joined with their user columns (prefixed with user_)
+#: and the member's role IDs, without the @everyone role.
+MEMBER_SELECT = f"""
+SELECT members.user_id, members.nickname AS nick, members.joined_at,
+       members.deafened AS deaf, members.muted AS mute, members.avatar,
+       members.banner, members.bio, members.pronouns,
+       users.id::text AS user_id_text,
+       {", ".join(f"users.{field} AS user_{field}" for field in USER_FIELDS)},
+       ARRAY(
+           SELECT member_roles.role_id::text
+           FROM member_roles
+           WHERE member_roles.guild_id = members.guild_id
+             AND member_roles.user_id = members.user_id
+             AND member_roles.role_id <> members.guild_id
+       ) AS roles
+FROM members
+JOIN users ON users.id = members.user_id
+"""
+
+
+MESSAGE_FIELDS = """
+id, channel_id::text, guild_id, author_id, content,
+created_at AS timestamp, edited_at AS edited_timestamp,
+tts, mention_everyone, nonce, message_type, embeds, flags,
+message_reference, sticker_ids, mentions, mention_roles,
+(SELECT message_id FROM channel_pins WHERE message_id = messages.id) AS pinned,
+ARRAY(SELECT ROW(id::text, message_id, channel_id, filename, filesize, image, height, width)
+    FROM attachments
+    WHERE message_id = messages.id)
+AS attachments,
+ARRAY(SELECT ROW(user_id, emoji_type, emoji_id, emoji_text)
+    FROM message_reactions
+    WHERE message_id = messages.id
+    ORDER BY react_ts
+) AS reactions
+"""
+
+
+GUILD_FIELDS = """
+id::text, owner_id::text, name, icon, splash,
+region, afk_channel_id::text, afk_timeout,
+verification_level, default_message_notifications, nsfw_level,
+explicit_content_filter, mfa_level,
+embed_enabled, embed_channel_id::text,
+widget_enabled, widget_channel_id::text,
+system_channel_id::text, rules_channel_id::text, public_updates_channel_id::text,
+features, banner, description, preferred_locale, discovery_splash,
+premium_progress_bar_enabled
+"""
+
+# single guild payloads never carried the legacy embed fields
+_SINGLE_GUILD_FIELDS = """
+id::text, owner_id::text, name, icon, splash,
+region, afk_channel_id::text, afk_timeout,
+verification_level, default_message_notifications, nsfw_level,
+explicit_content_filter, mfa_level,
+widget_enabled, widget_channel_id::text,
+system_channel_id::text, rules_channel_id::text, public_updates_channel_id::text,
+features, banner, description, preferred_locale, discovery_splash,
+premium_progress_bar_enabled
+"""
+
+_SECURE_USER_FIELDS = ["email", "verified", "mfa_enabled", "date_of_birth", "phone"]
+
+# characters with a meaning in LIKE patterns
+_LIKE_SPECIAL = re.compile(r"[\\%_]")
+
+
+def _user_select(secure: bool) -> str:
+    fields = ["id::text", *USER_FIELDS]
+    if secure:
+        fields.extend(_SECURE_USER_FIELDS)
+    return f"SELECT {','.join(fields)} FROM users"
+
+
+def _channel_messages_statement(before: Any, after: Any, order: str) -> str:
+    """Get the name of a channel message page statement."""
+    bound = "_before" if before else "_after" if after else ""
+    return f"channel_messages{bound}_{order.lower()}"
+
+
+def _channel_messages_query(before: bool, after: bool, order: str) -> str:
+    return f"""
+        SELECT {MESSAGE_FIELDS}
+        FROM messages
+        WHERE channel_id = $1 {"AND id < $3" if before else ""}
+              {"AND id > $3" if after else ""}
+        ORDER BY id {order}
+        LIMIT $2
+    """
+
+
+#: Statements run by Storage, see litecord.statements.
+STATEMENTS = {
+    "user": f"{_user_select(False)} WHERE users.id = $1",
+    "user_secure": f"{_user_select(True)} WHERE users.id = $1",
+    "users": f"{_user_select(False)} WHERE id = ANY($1::bigint[])",
+    "users_secure": f"{_user_select(True)} WHERE id = ANY($1::bigint[])",
+    "guild": f"SELECT {_SINGLE_GUILD_FIELDS} FROM guilds WHERE guilds.id = $1",
+    "guilds": f"SELECT {GUILD_FIELDS} FROM guilds WHERE id = ANY($1::bigint[])",
+    "guild_features": "SELECT features FROM guilds WHERE id = $1",
+    "vanity_invite": "SELECT code FROM vanity_invites WHERE guild_id = $1",
+    "member": f"""
+        {MEMBER_SELECT}
+        WHERE members.guild_id = $1 AND members.user_id = $2
+    """,
+    "member_multi": f"""
+        {MEMBER_SELECT}
+        WHERE members.guild_id = $1 AND members.user_id = ANY($2::bigint[])
+    """,
+    "members": f"""
+        {MEMBER_SELECT}
+        WHERE members.guild_id = $1
+    """,
+    "member_count": "SELECT COUNT(*) FROM members WHERE guild_id = $1",
+    "member_page": f"""
+        {MEMBER_SELECT}
+        WHERE members.guild_id = $1 AND members.user_id > $2
+        ORDER BY members.user_id
+        LIMIT $3
+    """,
+    "query_members": """
+        SELECT members.user_id
+        FROM members
+        JOIN users ON members.user_id = users.id
+        WHERE members.guild_id = $1
+          AND (lower(users.username) LIKE $2 OR lower(members.nickname) LIKE $2)
+        LIMIT $3
+    """,
+    "member_names": """
+        SELECT members.user_id, users.username, members.nickname
+        FROM members
+        JOIN users ON members.user_id = users.id
+        WHERE members.guild_id = $1
+    """,
+    "role": """
+        SELECT id::text, name, color, hoist, position,
+               permissions::text, managed, mentionable
+        FROM roles
+        WHERE id = $1
+        LIMIT 1
+    """,
+    "guild_role": """
+        SELECT id::text, name, color, hoist, position,
+               permissions::text, managed, mentionable
+        FROM roles
+        WHERE id = $1 AND guild_id = $2
+        LIMIT 1
+    """,
+    "guild_roles": """
+        SELECT id::text, name, color, hoist, position,
+               permissions::text, managed, mentionable
+        FROM roles
+        WHERE guild_id = $1
+        ORDER BY position ASC
+    """,
+    "channel_routes": """
+        SELECT channels.id, guild_channels.guild_id, channels.channel_type
+        FROM channels
+        LEFT JOIN guild_channels ON guild_channels.id = channels.id
+        WHERE channels.id = ANY($1::bigint[])
+    """,
+    "chan_last_message": "SELECT last_message_id FROM channels WHERE id = $1",
+    "bump_last_message": """
+        UPDATE channels
+        SET last_message_id = GREATEST(last_message_id, $2)
+        WHERE id = $1
+    """,
+    "chan_overwrites": """
+        SELECT target_type, target_role, target_user, allow::text, deny::text
+        FROM channel_overwrites
+        WHERE channel_id = $1
+    """,
+    "chan_overwrites_raw": """
+        SELECT target_type, target_role, target_user, allow, deny
+        FROM channel_overwrites
+        WHERE channel_id = $1
+    """,
+    "index_messages": INDEX_QUERY,
+    "message_rows": f"""
+        SELECT {MESSAGE_FIELDS}
+        FROM messages
+        WHERE id = ANY($1::bigint[])
+    """,
+    **{
+        _channel_messages_statement(before, after, order): _channel_messages_query(
+            before, after, order
+        )
+        for before, after in ((False, False), (True, False), (False, True))
+        for order in ("ASC", "DESC")
+    },
+}
+
+
+#: Statements that may read from a replica while handling a request.
+#: Everything that fills the guild snapshots, channel routes or the
+#: message cache is left out.
+REPLICA_STATEMENTS = {
+    "user",
+    "user_secure",
+    "users",
+    "users_secure",
+    "guild",
+    "guilds",
+    "member",
+    "member_multi",
+    "members",
+    "member_count",
+    "member_page",
+    "query_members",
+    "role",
+    "guild_role",
+    "chan_last_message",
+    "chan_overwrites",
+    "chan_overwrites_raw",
+    *(
+        _channel_messages_statement(before, after, order)
+        for before, after in ((True, False), (False, True))
+        for order in ("ASC", "DESC")
+    ),
+}
+
+
+def _is_crosspost(row: dict) -> bool:
+    return row["flags"] & MessageFlags.is_crosspost == MessageFlags.is_crosspost
+
+
+@dataclass
+class MessageBatch:
+    """Objects related to a batch of message rows, keyed by ID."""
+
+    guilds: Dict[int, Optional[int]] = field(default_factory=dict)
+    users: Dict[int, dict] = field(default_factory=dict)
+    members: Dict[Tuple[int, int], dict] = field(default_factory=dict)
+    webhooks: Dict[int, dict] = field(default_factory=dict)
+    reference_rows: List[dict] = field(default_factory=list)
+    references: Dict[int, dict] = field(default_factory=dict)
+    crosspost_attachments: Dict[int, list] = field(default_factory=dict)
+    stickers: Dict[int, dict] = field(default_factory=dict)
+
+    def guild_id(self, row: dict) -> Optional[int]:
+        """Get the guild ID of a message row."""
+        guild_id = row["guild_id"]
+        if guild_id:
+            return int(guild_id)
+        return self.guilds.get(int(row["channel_id"]))
+
+    def user(self, user_id: int) -> Optional[dict]:
+        """Get a copy of a user payload, safe to be modified
+        by a single message."""
+        user = self.users.get(user_id)
+        return dict(user) if user is not None else None
+
+
 class EmojiStats(TypedDict):
     count: int
     me: bool
@@ -82,28 +369,40 @@ class Storage:
     def __init__(self, app: LitecordApp):
         self.app = app
         self.db = app.db
+        self.statements = app.statements
+        self.statements.register_many(STATEMENTS, REPLICA_STATEMENTS)
         self.stickers: Dict[int, dict] = {}
 
+        # channel id -> (guild id, channel type)
+        self._channel_routes: Dict[int, Tuple[Optional[int], int]] = {}
+
+        # guild id -> roles, emojis, vanity code and features of the guild,
+        # least recently used first
+        self._guild_snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._guild_snapshot_max = app.config.get("GUILD_SNAPSHOT_MAX_GUILDS", 5000)
+
+        # guild id -> invalidation count, only kept while snapshots are built
+        self._guild_snapshot_epochs: Dict[int, int] = {}
+        self._guild_snapshot_builds = 0
+
+        self.member_names = MemberNameIndex(
+            app.config.get("MEMBER_NAME_INDEX_MAX_GUILDS", 1000)
+        )
+
     async def fetchrow_with_json(self, query: str, *args) -> Any:
         """Fetch a single row with JSON/JSONB support."""
-        # the pool by itself doesn't have
-        # set_type_codec, so we must set it manually
-        # by acquiring the connection
-        async with self.db.acquire() as con:
-            await pg_set_json(con)
-            return await con.fetchrow(query, *args)
+        # the JSON codecs are set once on every pooled connection
+        # (see pg_set_json), setting them again would drop the
+        # connection's prepared statements.
+        return await self.db.fetchrow(query, *args)
 
     async def fetch_with_json(self, query: str, *args) -> List[Any]:
         """Fetch many rows with JSON/JSONB support."""
-        async with self.db.acquire() as con:
-            await pg_set_json(con)
-            return await con.fetch(query, *args)
+        return await self.db.fetch(query, *args)
 
     async def execute_with_json(self, query: str, *args) -> str:
         """Execute a SQL statement with JSON/JSONB support."""
-        async with self.db.acquire() as con:
-            await pg_set_json(con)
-            return await con.execute(query, *args)
+        return await self.db.execute(query, *args)
 
     async def parse_user(self, duser: dict, secure: bool) -> dict:
         duser["premium"] = duser.pop("premium_since") is not None
@@ -151,36 +450,8 @@ class Storage:
     async def get_user(self, user_id, secure: bool = False) -> Optional[Dict[str, Any]]:
         """Get a single user payload."""
         user_id = int(user_id)
-
-        fields = [
-            "id::text",
-            "username",
-            "discriminator",
-            "avatar",
-            "banner",
-            "flags",
-            "bot",
-            "system",
-            "premium_since",
-            "bio",
-            "accent_color",
-            "pronouns",
-            "avatar_decoration",
-            "theme_colors",
-        ]
-
-        if secure:
-            fields.extend(
-                ["email", "verified", "mfa_enabled", "date_of_birth", "phone"]
-            )
-
-        user_row = await self.db.fetchrow(
-            f"""
-        SELECT {','.join(fields)}
-        FROM users
-        WHERE users.id = $1
-        """,
-            user_id,
+        user_row = await self.statements.fetchrow(
+            "user_secure" if secure else "user", user_id
         )
 
         if not user_row:
@@ -197,36 +468,23 @@ class Storage:
         args: Optional[List[Any]] = None,
     ) -> List[dict]:
         """Get many user payloads."""
-        fields = [
-            "id::text",
-            "username",
-            "discriminator",
-            "avatar",
-            "banner",
-            "flags",
-            "bot",
-            "system",
-            "premium_since",
-            "bio",
-            "accent_color",
-            "pronouns",
-            "avatar_decoration",
-            "theme_colors",
-        ]
-
-        if secure:
-            fields.extend(
-                ["email", "verified", "mfa_enabled", "date_of_birth", "phone"]
+        if not extra_clause and args is None:
+            users_rows = await self.statements.fetch(
+                "users_secure" if secure else "users", user_ids or []
+            )
+        else:
+            fields = ["id::text", *USER_FIELDS]
+            if secure:
+                fields.extend(_SECURE_USER_FIELDS)
+
+            users_rows = await self.db.fetch(
+                f"""
+                SELECT {','.join(fields)} {extra_clause}
+                FROM users
+                {where_clause}
+                """,
+                *(args or [user_ids if user_ids else []]),
             )
-
-        users_rows = await self.db.fetch(
-            f"""
-            SELECT {','.join(fields)} {extra_clause}
-            FROM users
-            {where_clause}
-            """,
-            *(args or [user_ids if user_ids else []]),
-        )
 
         return await asyncio.gather(
             *(self.parse_user(dict(user_row), secure) for user_row in users_rows)
@@ -247,25 +505,60 @@ class Storage:
             discriminator,
         )
 
+    async def guild_snapshot(self, guild_id: int) -> Dict[str, Any]:
+        """Get the roles, emojis, vanity code and features of a guild.
+
+        The snapshot is shared between callers and must not be mutated,
+        use invalidate_guild after changing any of those.
+        """
+        try:
+            snapshot = self._guild_snapshots[guild_id]
+        except KeyError:
+            pass
+        else:
+            self._guild_snapshots.move_to_end(guild_id)
+            return snapshot
+
+        epoch = self._guild_snapshot_epochs.get(guild_id, 0)
+        self._guild_snapshot_builds += 1
+        try:
+            snapshot = {
+                "roles": await self.get_role_data(guild_id),
+                "emojis": await self.get_guild_emojis(guild_id),
+                "vanity_url_code": await self.vanity_invite(guild_id),
+                "features": await self.statements.fetchval("guild_features", guild_id),
+            }
+
+            # the guild changed while we were building it, this copy might be stale
+            if self._guild_snapshot_epochs.get(guild_id, 0) == epoch:
+                self._guild_snapshots[guild_id] = snapshot
+                while len(self._guild_snapshots) > self._guild_snapshot_max:
+                    self._guild_snapshots.popitem(last=False)
+        finally:
+            self._guild_snapshot_builds -= 1
+            if not self._guild_snapshot_builds:
+                self._guild_snapshot_epochs.clear()
+
+        return snapshot
+
+    def invalidate_guild(self, guild_id: int):
+        """Drop the cached snapshot of a guild after
+        its roles, emojis, vanity code or features change,
+        or after the guild is deleted."""
+        self._guild_snapshots.pop(guild_id, None)
+        if self._guild_snapshot_builds:
+            self._guild_snapshot_epochs[guild_id] = (
+                self._guild_snapshot_epochs.get(guild_id, 0) + 1
+            )
+
     async def guild_features(self, guild_id: int) -> Optional[List[str]]:
         """Get a list of guild features for the given guild."""
-        return await self.db.fetchval(
-            """
-        SELECT features FROM guilds
-        WHERE id = $1
-        """,
-            guild_id,
-        )
+        features = (await self.guild_snapshot(guild_id))["features"]
+        return list(features) if features is not None else None
 
     async def vanity_invite(self, guild_id: int) -> Optional[str]:
         """Get the vanity invite for a guild."""
-        return await self.db.fetchval(
-            """
-        SELECT code FROM vanity_invites
-        WHERE guild_id = $1
-        """,
-            guild_id,
-        )
+        return await self.statements.fetchval("vanity_invite", guild_id)
 
     async def parse_guild(
         self,
@@ -284,10 +577,11 @@ class Storage:
         if user_id:
             drow["owner"] = drow["owner_id"] == str(user_id)
 
+        snapshot = await self.guild_snapshot(guild_id)
         drow["features"] = drow["features"] or []
-        drow["roles"] = await self.get_role_data(guild_id)
-        drow["emojis"] = await self.get_guild_emojis(guild_id)
-        drow["vanity_url_code"] = await self.vanity_invite(guild_id)
+        drow["roles"] = copy.deepcopy(snapshot["roles"])
+        drow["emojis"] = copy.deepcopy(snapshot["emojis"])
+        drow["vanity_url_code"] = snapshot["vanity_url_code"]
         drow["nsfw"] = drow["nsfw_level"] in (
             NSFWLevel.RESTRICTED.value,
             NSFWLevel.EXPLICIT.value,
@@ -320,20 +614,7 @@ class Storage:
         if unavailable:
             return {"id": str(guild_id), "unavailable": True}
 
-        row = await self.db.fetchrow(
-            """
-        SELECT id::text, owner_id::text, name, icon, splash,
-               region, afk_channel_id::text, afk_timeout,
-               verification_level, default_message_notifications, nsfw_level,
-               explicit_content_filter, mfa_level,
-               widget_enabled, widget_channel_id::text,
-               system_channel_id::text, rules_channel_id::text, public_updates_channel_id::text, features,
-               banner, description, preferred_locale, discovery_splash, premium_progress_bar_enabled
-        FROM guilds
-        WHERE guilds.id = $1
-        """,
-            guild_id,
-        )
+        row = await self.statements.fetchrow("guild", guild_id)
         if not row:
             return
 
@@ -350,21 +631,17 @@ class Storage:
         large: Optional[int] = None,
     ) -> List[dict]:
         """Get many guild payloads."""
-        rows = await self.db.fetch(
-            f"""
-            SELECT id::text, owner_id::text, name, icon, splash,
-                   region, afk_channel_id::text, afk_timeout,
-                   verification_level, default_message_notifications, nsfw_level,
-                   explicit_content_filter, mfa_level,
-                   embed_enabled, embed_channel_id::text,
-                   widget_enabled, widget_channel_id::text,
-                   system_channel_id::text, rules_channel_id::text, public_updates_channel_id::text, features,
-                   banner, description, preferred_locale, discovery_splash, premium_progress_bar_enabled {extra_clause}
-            FROM guilds
-            {where_clause}
-            """,
-            *(args or [guild_ids if guild_ids else []]),
-        )
+        if not extra_clause and args is None:
+            rows = await self.statements.fetch("guilds", guild_ids or [])
+        else:
+            rows = await self.db.fetch(
+                f"""
+                SELECT {GUILD_FIELDS} {extra_clause}
+                FROM guilds
+                {where_clause}
+                """,
+                *(args or [guild_ids if guild_ids else []]),
+            )
 
         return await asyncio.gather(
             *(self.parse_guild(dict(row), user_id, full, large) for row in rows)
@@ -376,161 +653,164 @@ class Storage:
             """
         SELECT role_id
         FROM member_roles
-        WHERE guild_id = $1 AND user_id = $2
+        WHERE guild_id = $1 AND user_id = $2 AND role_id <> $1
         """,
             guild_id,
             member_id,
         )
 
-        roles = [r["role_id"] for r in roles]
+        return [r["role_id"] for r in roles]
 
-        try:
-            roles.remove(guild_id)
-        except ValueError:
-            # if the @everyone role isn't in, we add it
-            # to member_roles automatically (it won't
-            # be shown on the API, though).
-            await self.db.execute(
-                """
-            INSERT INTO member_roles (user_id, guild_id, role_id)
-            VALUES ($1, $2, $3)
-            """,
-                member_id,
-                guild_id,
-                guild_id,
-            )
+    async def _member_from_row(self, row, with_user: bool = True) -> Dict[str, Any]:
+        """Create a member payload out of a row fetched with MEMBER_SELECT."""
+        drow = dict(row)
+        user_id = drow.pop("user_id")
+
+        duser = {"id": drow.pop("user_id_text")}
+        for user_field in USER_FIELDS:
+            duser[user_field] = drow.pop(f"user_{user_field}")
+
+        drow["joined_at"] = timestamp_(drow["joined_at"])
+        if with_user:
+            drow["user"] = await self.parse_user(duser, False)
+        else:
+            drow["user_id"] = str(user_id)
 
-        return roles
+        return drow
 
     async def get_member(
         self, guild_id, member_id, with_user: bool = True
     ) -> Optional[Dict[str, Any]]:
-        row = await self.db.fetchrow(
-            """
-        SELECT user_id, nickname AS nick, joined_at,
-               deafened AS deaf, muted AS mute, avatar, banner, bio, pronouns,
-               ARRAY(SELECT role_id::text FROM member_roles WHERE guild_id = $1 AND user_id = $2) AS roles
-        FROM members
-        WHERE guild_id = $1 and user_id = $2
-        """,
-            guild_id,
-            member_id,
-        )
+        row = await self.statements.fetchrow("member", guild_id, member_id)
 
         if row is None:
             return None
 
-        drow = dict(row)
-
-        try:
-            drow["roles"].remove(str(guild_id))
-        except ValueError:
-            # We do a little DB repair
-            await self.db.execute(
-                """
-            INSERT INTO member_roles (user_id, guild_id, role_id)
-            VALUES ($1, $2, $3)
-            """,
-                member_id,
-                guild_id,
-                guild_id,
-            )
-
-        drow["joined_at"] = timestamp_(row["joined_at"])
-        if with_user:
-            drow["user"] = await self.get_user(member_id)
-            drow.pop("user_id")
-        else:
-            drow["user_id"] = str(drow["user_id"])
-
-        return drow
+        return await self._member_from_row(row, with_user)
 
     async def get_member_multi(
-        self, guild_id: int, user_ids: List[int]
+        self, guild_id: int, user_ids: List[int], with_user: bool = True
     ) -> List[Dict[str, Any]]:
-        """Get member information about multiple users in a guild."""
-        members = []
+        """Get member information about multiple users in a guild.
 
-        for user_id in user_ids:
-            member = await self.get_member(guild_id, user_id)
-            if not member:
-                continue
+        Members are returned in the order of the given user IDs,
+        skipping users that aren't members.
+        """
+        user_ids = [uid for uid in user_ids if isinstance(uid, int)]
+        if not user_ids:
+            return []
 
-            members.append(member)
+        rows = await self.statements.fetch("member_multi", guild_id, user_ids)
 
-        return members
+        members = {}
+        for row in rows:
+            members[row["user_id"]] = await self._member_from_row(row, with_user)
+
+        return [members[uid] for uid in dict.fromkeys(user_ids) if uid in members]
 
     async def get_members(
         self, guild_id: int, with_user: bool = True
     ) -> Dict[int, Dict[str, Any]]:
         """Get member information on a guild."""
-        members_basic = await self.db.fetch(
-            """
-        SELECT user_id, nickname AS nick, joined_at,
-               deafened AS deaf, muted AS mute, avatar, banner, bio, pronouns,
-               ARRAY(SELECT role_id::text FROM member_roles WHERE guild_id = $1 AND user_id = members.user_id) AS roles
-        FROM members
-        WHERE guild_id = $1
-        """,
-            guild_id,
-        )
+        rows = await self.statements.fetch("members", guild_id)
 
         members = {}
-        for row in members_basic:
-            drow = dict(row)
-            user_id = drow.pop("user_id")
+        for row in rows:
+            members[row["user_id"]] = await self._member_from_row(row, with_user)
 
-            try:
-                drow["roles"].remove(str(guild_id))
-            except ValueError:
-                # We do a little DB repair
-                await self.db.execute(
-                    """
-                INSERT INTO member_roles (user_id, guild_id, role_id)
-                VALUES ($1, $2, $3)
-                """,
-                    user_id,
-                    guild_id,
+        return members
+
+    async def get_member_page(
+        self, guild_id: int, limit: int, after: int = 0, with_user: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Get up to ``limit`` members of a guild whose user IDs
+        come after ``after``, ordered by user ID."""
+        rows = await self.statements.fetch("member_page", guild_id, after, limit)
+        return [await self._member_from_row(row, with_user) for row in rows]
+
+    async def iter_members(
+        self, guild_id: int, with_user: bool = True, prefetch: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over the members of a guild with a server-side cursor.
+
+        Use this instead of get_members() on very large guilds, as only
+        ``prefetch`` rows are held in memory at a time.
+        """
+        async with self.db.acquire() as con:
+            async with con.transaction():
+                async for row in con.cursor(
+                    f"{STATEMENTS['members']} ORDER BY members.user_id",
                     guild_id,
-                )
+                    prefetch=prefetch,
+                ):
+                    yield await self._member_from_row(row, with_user)
 
-            drow["joined_at"] = timestamp_(row["joined_at"])
-            if with_user:
-                drow["user"] = await self.get_user(user_id)
-            else:
-                drow["user_id"] = str(user_id)
-            members[user_id] = drow
+    async def query_members(self, guild_id: int, query: str, limit: int):
+        """Find members whose username or nickname starts with the given query.
+
+        Guilds without an in-memory name index are queried from the database
+        while their index is built in the background.
+        """
+        mids = self.member_names.query(guild_id, query, limit)
+        if mids is None:
+            if self.member_names.start_build(guild_id):
+                self.app.sched.spawn(self._build_member_names(guild_id))
+
+            pattern = _LIKE_SPECIAL.sub(r"\\\g<0>", query.lower()) + "%"
+            rows = await self.statements.fetch(
+                "query_members", guild_id, pattern, limit
+            )
+            mids = [r["user_id"] for r in rows]
 
+        members = await self.get_member_multi(guild_id, mids)
         return members
 
-    async def query_members(self, guild_id: int, query: str, limit: int):
-        """Find members with usernames matching the given query."""
-        mids = await self.db.fetch(
-            f"""
-        SELECT user_id
-        FROM members
-        JOIN users ON members.user_id = users.id
-        WHERE members.guild_id = $1
-          AND users.username ILIKE '%'||$2
-        LIMIT {limit}
-        """,
-            guild_id,
-            query,
+    async def _build_member_names(self, guild_id: int):
+        try:
+            rows = await self.statements.fetch("member_names", guild_id)
+        except Exception:
+            self.member_names.cancel_build(guild_id)
+            raise
+
+        self.member_names.finish_build(
+            guild_id, ((r["user_id"], r["username"], r["nickname"]) for r in rows)
         )
 
-        mids = [r["user_id"] for r in mids]
-        members = await self.get_member_multi(guild_id, mids)
-        return members
+    async def add_member_name(self, guild_id: int, user_id: int):
+        """Add a member who just joined to the name index of their guild."""
+        if self.member_names.tracks(guild_id):
+            user = await self.get_user(user_id)
+            assert user is not None
+            self.member_names.add_member(guild_id, user_id, user["username"])
 
     async def chan_last_message(self, channel_id: int) -> Optional[int]:
         """Get the last message ID in a channel."""
-        return await self.db.fetchval(
+        return await self.statements.fetchval("chan_last_message", channel_id)
+
+    async def bump_last_message(self, channel_id: int, message_id: int):
+        """Set the last message ID of a channel after a message is created.
+
+        Every code path creating a message must call this, it also keeps
+        the message cache aware of the new message.
+        """
+        self.app.message_cache.created(channel_id, message_id)
+        await self.statements.execute("bump_last_message", channel_id, message_id)
+
+    async def fix_last_message(self, channel_id: int, message_ids: List[int]):
+        """Recalculate the last message ID of a channel, if it was
+        one of the given (just deleted) message IDs."""
+        await self.db.execute(
             """
-        SELECT MAX(id)
-        FROM messages
-        WHERE channel_id = $1
+        UPDATE channels
+        SET last_message_id = (
+            SELECT MAX(id)
+            FROM messages
+            WHERE channel_id = $1
+        )
+        WHERE id = $1 AND last_message_id = ANY($2::bigint[])
         """,
             channel_id,
+            message_ids,
         )
 
     async def chan_last_message_str(self, channel_id: int) -> Optional[str]:
@@ -549,6 +829,7 @@ class Storage:
         """
         channel_type = row["type"]
         chan_type = ChannelType(channel_type)
+        last_message_id = row.pop("last_message_id", None)
 
         if chan_type in (ChannelType.GUILD_TEXT, ChannelType.GUILD_NEWS):
             ext_row = await self.db.fetchrow(
@@ -561,9 +842,7 @@ class Storage:
             )
 
             drow = dict(ext_row)
-
-            last_msg = await self.chan_last_message_str(row["id"])
-            drow["last_message_id"] = last_msg
+            drow["last_message_id"] = str_(last_message_id)
 
             return {**row, **drow}
         elif chan_type == ChannelType.GUILD_VOICE:
@@ -580,27 +859,70 @@ class Storage:
         else:
             return row
 
+    async def channel_routes(
+        self, channel_ids: Iterable[int]
+    ) -> Dict[int, Tuple[Optional[int], int]]:
+        """Get the guild ID (None on DMs and Group DMs) and type of many channels.
+
+        A channel never moves between guilds, so routes are kept in memory
+        after their first lookup. Unknown channels are left out.
+        """
+        res = {}
+        missing = []
+        for channel_id in channel_ids:
+            route = self._channel_routes.get(channel_id)
+            if route is None:
+                missing.append(channel_id)
+            else:
+                res[channel_id] = route
+
+        if not missing:
+            return res
+
+        rows = await self.statements.fetch("channel_routes", missing)
+
+        for row in rows:
+            route = res[row["id"]] = (row["guild_id"], row["channel_type"])
+
+            # guild channels are inserted on channels before guild_channels,
+            # don't keep a route that is still missing its guild
+            if route[0] is None and ChannelType(route[1]) in GUILD_CHANS:
+                continue
+
+            self._channel_routes[row["id"]] = route
+
+        return res
+
+    async def channel_route(
+        self, channel_id: int
+    ) -> Optional[Tuple[Optional[int], int]]:
+        """Get the guild ID (None on DMs and Group DMs) and type of a channel."""
+        try:
+            return self._channel_routes[channel_id]
+        except KeyError:
+            return (await self.channel_routes([channel_id])).get(channel_id)
+
+    def set_channel_route(
+        self, channel_id: int, guild_id: Optional[int], channel_type: int
+    ):
+        """Set the route of a channel after creating it."""
+        self._channel_routes[channel_id] = (guild_id, int(channel_type))
+
+    def drop_channel_route(self, channel_id: int):
+        """Remove the route of a channel after deleting it,
+        or after changing its type."""
+        self._channel_routes.pop(channel_id, None)
+
     async def get_chan_type(self, channel_id: int) -> Optional[int]:
         """Get the channel type integer, given channel ID."""
-        return await self.db.fetchval(
-            """
-        SELECT channel_type
-        FROM channels
-        WHERE channels.id = $1
-        """,
-            channel_id,
-        )
+        route = await self.channel_route(channel_id)
+        return route[1] if route else None
 
     async def chan_overwrites(
         self, channel_id: int, safe: bool = True
     ) -> List[Dict[str, Any]]:
-        overwrite_rows = await self.db.fetch(
-            f"""
-        SELECT target_type, target_role, target_user, allow{'::text' if safe else ''}, deny{'::text' if safe else ''}
-        FROM channel_overwrites
-        WHERE channel_id = $1
-        """,
-            channel_id,
+        overwrite_rows = await self.statements.fetch(
+            "chan_overwrites" if safe else "chan_overwrites_raw", channel_id
         )
 
         def _overwrite_convert(row):
@@ -657,10 +979,18 @@ class Storage:
 
     async def get_channel(self, channel_id: int, **kwargs) -> Optional[Dict[str, Any]]:
         """Fetch a single channel's information."""
-        chan_type = await self.get_chan_type(channel_id)
-        if chan_type is None:
+        chan_row = await self.db.fetchrow(
+            """
+        SELECT channel_type, last_message_id
+        FROM channels
+        WHERE channels.id = $1
+        """,
+            channel_id,
+        )
+        if chan_row is None:
             return None
 
+        chan_type = chan_row["channel_type"]
         ctype = ChannelType(chan_type)
 
         if ctype in (
@@ -680,6 +1010,7 @@ class Storage:
 
             dbase = dict(base)
             dbase["type"] = chan_type
+            dbase["last_message_id"] = chan_row["last_message_id"]
 
             res = await self._channels_extra(dbase)
             res["permission_overwrites"] = await self.chan_overwrites(channel_id)
@@ -700,7 +1031,7 @@ class Storage:
             drow = dict(dm_row)
             drow["type"] = chan_type
 
-            drow["last_message_id"] = await self.chan_last_message_str(channel_id)
+            drow["last_message_id"] = str_(chan_row["last_message_id"])
 
             # dms have just two recipients.
             drow["recipients"] = [
@@ -728,7 +1059,7 @@ class Storage:
 
             user_id: Optional[int] = kwargs.get("user_id")
             drow["recipients"] = await self._gdm_recipients(channel_id, user_id)
-            drow["last_message_id"] = await self.chan_last_message_str(channel_id)
+            drow["last_message_id"] = str_(chan_row["last_message_id"])
             return drow
 
         raise RuntimeError(
@@ -752,8 +1083,11 @@ class Storage:
         """Get channel list information on a guild"""
         channel_basics = await self.db.fetch(
             """
-        SELECT id, guild_id::text, parent_id::text, name, position, nsfw
+        SELECT guild_channels.id, guild_id::text, parent_id::text, name,
+               position, nsfw, channels.channel_type AS type,
+               channels.last_message_id
         FROM guild_channels
+        JOIN channels ON channels.id = guild_channels.id
         WHERE guild_id = $1
         """,
             guild_id,
@@ -762,18 +1096,7 @@ class Storage:
         channels = []
 
         for row in channel_basics:
-            ctype = await self.db.fetchval(
-                """
-            SELECT channel_type FROM channels
-            WHERE id = $1
-            """,
-                row["id"],
-            )
-
-            drow = dict(row)
-            drow["type"] = ctype
-
-            res = await self._channels_extra(drow)
+            res = await self._channels_extra(dict(row))
             res["permission_overwrites"] = await self.chan_overwrites(row["id"])
             res["id"] = str(res["id"])
             if res["parent_id"]:
@@ -786,23 +1109,10 @@ class Storage:
         self, role_id: int, guild_id: Optional[int] = None
     ) -> Optional[Dict[str, Any]]:
         """get a single role's information."""
-
-        guild_field = "AND guild_id = $2" if guild_id else ""
-
-        args = [role_id]
         if guild_id:
-            args.append(guild_id)
-
-        row = await self.db.fetchrow(
-            f"""
-        SELECT id::text, name, color, hoist, position,
-               permissions::text, managed, mentionable
-        FROM roles
-        WHERE id = $1 {guild_field}
-        LIMIT 1
-        """,
-            *args,
-        )
+            row = await self.statements.fetchrow("guild_role", role_id, guild_id)
+        else:
+            row = await self.statements.fetchrow("role", role_id)
 
         if not row:
             return None
@@ -813,16 +1123,7 @@ class Storage:
 
     async def get_role_data(self, guild_id: int) -> List[Dict[str, Any]]:
         """Get role list information on a guild."""
-        roledata = await self.db.fetch(
-            """
-        SELECT id::text, name, color, hoist, position,
-               permissions::text, managed, mentionable
-        FROM roles
-        WHERE guild_id = $1
-        ORDER BY position ASC
-        """,
-            guild_id,
-        )
+        roledata = await self.statements.fetch("guild_roles", guild_id)
 
         return list(map(dict, roledata))
 
@@ -848,19 +1149,53 @@ class Storage:
 
         return res
 
+    async def get_member_count(self, guild_id: int) -> int:
+        """Get how many members a guild has."""
+        return await self.statements.fetchval("member_count", guild_id)
+
+    async def get_sync_members(
+        self, guild_id: int, large: Optional[int] = None, user_id: Optional[int] = None
+    ) -> Tuple[Dict[int, Dict[str, Any]], int, bool]:
+        """Get the members to send along with a guild.
+
+        Guilds with more than ``large`` members only get their online
+        members (and the given user), the others are left to lazy
+        member lists and Request Guild Members.
+
+        Returns the members, the member count and if the guild is large.
+        """
+        if large:
+            member_count = await self.get_member_count(guild_id)
+            if member_count > large:
+                assert self.presence is not None
+                member_ids = set(self.presence.store.online_members(guild_id))
+                if user_id:
+                    member_ids.add(user_id)
+
+                members = await self.get_member_multi(guild_id, list(member_ids))
+                return (
+                    {int(member["user"]["id"]): member for member in members},
+                    member_count,
+                    True,
+                )
+
+        members = await self.get_members(guild_id)
+        return members, len(members), False
+
     async def get_guild_extra(
         self, guild_id: int, user_id: Optional[int] = None, large: Optional[int] = None
     ) -> Dict:
         """Get extra information about a guild."""
         res = {}
 
-        members = await self.get_members(guild_id)
+        members, member_count, is_large = await self.get_sync_members(
+            guild_id, large, user_id
+        )
         channels = await self.get_channel_data(guild_id)
-        member_count = len(members)
 
         assert self.presence is not None
         if large:
-            res["large"] = member_count > large
+            res["large"] = is_large
 
         if user_id:
             self_member = members.get(user_id)
@@ -873,7 +1208,9 @@ class Storage:
                 "member_count": member_count,
                 "members": list(members.values()),
                 "channels": channels,
-                "presences": await self.presence.guild_presences(members, guild_id),
+                "presences": await self.presence.guild_presences(
+                    members, guild_id, offline=not is_large
+                ),
                 "voice_states": await self.guild_voice_states(guild_id),
                 "lazy": True,
             },
@@ -942,9 +1279,111 @@ class Storage:
 
         return res
 
-    async def _inject_author(self, res: dict, _get_user):
-        """Inject a pseudo-user object when the message is
-        made by a webhook."""
+    async def _message_batch(
+        self, rows: List[dict], include_member: bool
+    ) -> MessageBatch:
+        """Fetch everything needed to assemble the given message rows.
+
+        Every kind of related object (channel guilds, users, members,
+        webhook info, referenced messages, crosspost attachments and stickers)
+        is fetched with a single query for the entire set of rows.
+        """
+        batch = MessageBatch()
+
+        reference_ids = set()
+        crosspost_ids = set()
+        for row in rows:
+            reference = row["message_reference"]
+            if not reference:
+                continue
+
+            if _is_crosspost(row):
+                crosspost_ids.add(int(reference["message_id"]))
+            elif include_member:
+                reference_ids.add(int(reference["message_id"]))
+
+        if reference_ids:
+            batch.reference_rows = await self.fetch_message_rows(
+                args=(list(reference_ids),)
+            )
+
+        all_rows = rows + batch.reference_rows
+
+        channel_ids = {
+            int(row["channel_id"]) for row in all_rows if not row["guild_id"]
+        }
+        if channel_ids:
+            routes = await self.channel_routes(channel_ids)
+            batch.guilds = {
+                channel_id: guild_id for channel_id, (guild_id, _) in routes.items()
+            }
+
+        user_ids = set()
+        guild_user_ids: Dict[int, set] = {}
+        webhook_message_ids = []
+        sticker_ids = set()
+        for row in all_rows:
+            row_user_ids = set(row["mentions"] or [])
+            if row["author_id"] is None:
+                webhook_message_ids.append(int(row["id"]))
+            else:
+                row_user_ids.add(row["author_id"])
+
+            user_ids |= row_user_ids
+            guild_id = batch.guild_id(row)
+            if include_member and guild_id:
+                guild_user_ids.setdefault(guild_id, set()).update(row_user_ids)
+
+            sticker_ids.update(row["sticker_ids"] or [])
+
+        if user_ids:
+            users = await self.get_users(list(user_ids))
+            batch.users = {int(user["id"]): user for user in users}
+
+        for guild_id, member_ids in guild_user_ids.items():
+            members = await self.get_member_multi(
+                guild_id, list(member_ids), with_user=False
+            )
+            for member in members:
+                batch.members[(guild_id, int(member["user_id"]))] = member
+
+        if webhook_message_ids:
+            webhook_rows = await self.db.fetch(
+                """
+            SELECT message_id, webhook_id, name, avatar
+            FROM message_webhook_info
+            WHERE message_id = ANY($1::bigint[])
+            """,
+                webhook_message_ids,
+            )
+            batch.webhooks = {r["message_id"]: dict(r) for r in webhook_rows}
+
+        if crosspost_ids:
+            attachment_rows = await self.db.fetch(
+                """
+            SELECT message_id,
+                ROW(id::text, message_id, channel_id, filename, filesize, image, height, width)
+                AS attachment
+            FROM attachments
+            WHERE message_id = ANY($1::bigint[])
+            """,
+                list(crosspost_ids),
+            )
+            for arow in attachment_rows:
+                batch.crosspost_attachments.setdefault(arow["message_id"], []).append(
+                    arow["attachment"]
+                )
+
+        for sticker_id in sticker_ids:
+            sticker = await self.get_default_sticker(sticker_id)
+            if sticker:
+                batch.stickers[sticker_id] = sticker
+
+        return batch
+
+    def _inject_author(self, res: dict, batch: "MessageBatch", guild_id):
+        """Inject the author of a message, or a pseudo-user object
+        when the message is made by a webhook."""
         author_id = res["author_id"]
 
         # if author_id is None, we fetch webhook info
@@ -954,14 +1393,7 @@ class Storage:
             # is copied from the webhook table, or inserted by the webhook
             # itself. this causes a complete disconnect from the messages
             # table into the webhooks table.
-            wb_info = await self.db.fetchrow(
-                """
-            SELECT webhook_id, name, avatar
-            FROM message_webhook_info
-            WHERE message_id = $1
-            """,
-                int(res["id"]),
-            )
+            wb_info = batch.webhooks.get(int(res["id"]))
 
             if not wb_info:
                 log.warning("Webhook info not found for msg {}", res["id"])
@@ -983,21 +1415,20 @@ class Storage:
             }
             res["webhook_id"] = str(wb_info["webhook_id"])
         else:
-            res["author"] = author = await _get_user(int(author_id))
-            member = author.pop("member", None)
+            res["author"] = batch.user(author_id)
+            member = batch.members.get((guild_id, author_id))
             if member:
                 res["member"] = member
 
-    async def parse_message(
+    def parse_message(
         self,
         res: dict,
         user_id: Optional[int],
         include_member: bool,
-        user_cache: Optional[dict] = None,
+        batch: "MessageBatch",
     ) -> dict:
-        """Parse a message object."""
-        user_cache = user_cache or {}
-
+        """Parse a message object, out of its row and the related
+        objects fetched for its batch."""
         res["id"] = str(res["id"])
         res["timestamp"] = timestamp_(res["timestamp"])
         res["edited_timestamp"] = timestamp_(res["edited_timestamp"])
@@ -1008,37 +1439,28 @@ class Storage:
             [str(r) for r in res["mention_roles"]] if res["mention_roles"] else []
         )
 
-        guild_id = res["guild_id"]
-        is_crosspost = (
-            res["flags"] & MessageFlags.is_crosspost == MessageFlags.is_crosspost
-        )
+        guild_id = batch.guild_id(res)
+        is_crosspost = _is_crosspost(res)
         attachments = list(res["attachments"]) if res["attachments"] else []
         reactions = list(res["reactions"]) if res["reactions"] else []
 
-        if not guild_id:
-            guild_id = await self.guild_from_channel(int(res["channel_id"]))
         res["guild_id"] = str(guild_id) if guild_id else None
 
         if res.get("message_reference") and not is_crosspost and include_member:
-            message = await self.get_message(
-                int(res["message_reference"]["message_id"]), user_id, include_member
+            res["referenced_message"] = batch.references.get(
+                int(res["message_reference"]["message_id"])
             )
-            res["referenced_message"] = message
 
-        async def _get_user(user_id):
-            try:
-                user = user_cache[user_id]
-            except KeyError:
-                user = await self.get_user(user_id)
-                if include_member and user and guild_id:
-                    member = await self.get_member(guild_id, user_id, False)
-                    if member:
-                        user["member"] = member
-                user_cache[user_id] = user
+        def _get_user(mention_id: int) -> Optional[dict]:
+            user = batch.user(mention_id)
+            if user is not None and include_member and guild_id:
+                member = batch.members.get((guild_id, mention_id))
+                if member:
+                    user["member"] = member
             return user
 
-        await self._inject_author(res, _get_user)
-        mentions = await asyncio.gather(*(_get_user(m) for m in res["mentions"]))
+        self._inject_author(res, batch, guild_id)
+        mentions = (_get_user(m) for m in res["mentions"])
         res["mentions"] = [mention for mention in mentions if mention]
 
         emoji = []
@@ -1068,15 +1490,9 @@ class Storage:
 
         # If we're a crosspost, we need to inject the original attachments
         if is_crosspost and res.get("message_reference"):
-            attachments = await self.db.fetch(
-                """
-            SELECT ROW(id::text, message_id, channel_id, filename, filesize, image, height, width)
-            FROM attachments
-            WHERE message_id = $1
-                """,
-                int(res["message_reference"]["message_id"]),
+            attachments = batch.crosspost_attachments.get(
+                int(res["message_reference"]["message_id"]), []
             )
-            attachments = [dict(a) for a in attachments] if attachments else []
 
         a_res = []
         for attachment in attachments:
@@ -1117,11 +1533,9 @@ class Storage:
 
         sticker_ids = res.pop("sticker_ids")
         if sticker_ids:
-            stickers = []
-            for id in sticker_ids:
-                sticker = await self.get_default_sticker(id)
-                if sticker:
-                    stickers.append(sticker)
+            stickers = [
+                batch.stickers[id] for id in sticker_ids if id in batch.stickers
+            ]
 
             res["stickers"] = stickers
             res["sticker_items"] = [
@@ -1145,6 +1559,66 @@ class Storage:
 
         return res
 
+    async def hydrate_messages(
+        self,
+        rows: List[dict],
+        user_id: Optional[int] = None,
+        include_member: bool = False,
+    ) -> List[dict]:
+        """Turn message rows (from fetch_message_rows) into message payloads.
+
+        Pass every row of a page at once, so that related objects
+        are fetched once for the whole page instead of once per message.
+        """
+        if not rows:
+            return []
+
+        batch = await self._message_batch(rows, include_member)
+        for ref_row in batch.reference_rows:
+            ref = self.parse_message(ref_row, user_id, include_member, batch)
+            batch.references[int(ref["id"])] = ref
+
+        return [self.parse_message(row, user_id, include_member, batch) for row in rows]
+
+    async def fetch_message_rows(
+        self,
+        extra_clause: str = "",
+        where_clause: str = "WHERE id = ANY($1::bigint[])",
+        args: Iterable[Any] = (),
+    ) -> List[dict]:
+        """Fetch raw message rows, to be given to hydrate_messages()."""
+        if not extra_clause and where_clause == "WHERE id = ANY($1::bigint[])":
+            rows = await self.statements.fetch("message_rows", *args)
+        else:
+            rows = await self.fetch_with_json(
+                f"""
+                SELECT {MESSAGE_FIELDS} {extra_clause}
+                FROM messages
+                {where_clause}
+                """,
+                *args,
+            )
+
+        return [dict(row) for row in rows]
+
+    async def channel_message_rows(
+        self,
+        channel_id: int,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        order: str = "DESC",
+    ) -> List[dict]:
+        """Fetch a page of raw message rows in a channel."""
+        args = [channel_id, limit]
+        if before:
+            args.append(before)
+        elif after:
+            args.append(after)
+
+        name = _channel_messages_statement(before, after, order)
+        return [dict(row) for row in await self.statements.fetch(name, *args)]
+
     async def get_message(
         self,
         message_id: int,
@@ -1152,29 +1626,43 @@ class Storage:
         include_member: bool = False,
     ) -> Optional[dict]:
         """Get a single message's payload."""
-        message = await self.fetchrow_with_json(
-            f"""
-            SELECT id, channel_id::text, guild_id, author_id, content,
-                created_at AS timestamp, edited_at AS edited_timestamp,
-                tts, mention_everyone, nonce, message_type, embeds, flags,
-                message_reference, sticker_ids, mentions, mention_roles,
-                (SELECT message_id FROM channel_pins WHERE message_id = messages.id) AS pinned,
-                ARRAY(SELECT ROW(id::text, message_id, channel_id, filename, filesize, image, height, width)
-                    FROM attachments
-                    WHERE message_id = messages.id)
-                AS attachments,
-                ARRAY(SELECT ROW(user_id, emoji_type, emoji_id, emoji_text)
-                    FROM message_reactions
-                    WHERE message_id = messages.id
-                    ORDER BY react_ts
-                ) AS reactions
-            FROM messages
-            WHERE id = $1
-            """,
-            message_id,
-        )
-        if message:
-            return await self.parse_message(dict(message), user_id, include_member)
+        cache = self.app.message_cache
+        row = cache.get(message_id)
+        if row is None:
+            with cache.fill() as since:
+                rows = await self.fetch_message_rows(args=([message_id],))
+                if not rows:
+                    return None
+
+                row = rows[0]
+                cache.put(row, since)
+
+        messages = await self.hydrate_messages([row], user_id, include_member)
+        return messages[0]
+
+    async def latest_message_rows(self, channel_id: int, limit: int) -> List[dict]:
+        """Fetch the rows of the latest messages in a channel, newest first.
+
+        Served from the message cache when it holds enough of the channel.
+        """
+        cache = self.app.message_cache
+        message_ids = cache.latest_ids(channel_id, limit)
+
+        if message_ids is None:
+            with cache.fill() as since:
+                rows = await self.channel_message_rows(channel_id, limit)
+                cache.put_latest(channel_id, rows, limit, since)
+            return rows
+
+        rows = cache.get_many(message_ids)
+        stale_ids = [message_id for message_id in message_ids if message_id not in rows]
+        if stale_ids:
+            with cache.fill() as since:
+                for row in await self.fetch_message_rows(args=(stale_ids,)):
+                    cache.put(row, since)
+                    rows[row["id"]] = row
+
+        return [rows[message_id] for message_id in message_ids if message_id in rows]
 
     async def get_messages(
         self,
@@ -1186,36 +1674,12 @@ class Storage:
         args: Optional[Iterable[Any]] = None,
     ) -> List[dict]:
         """Get multiple messages' payloads."""
-        rows = await self.fetch_with_json(
-            f"""
-            SELECT id, channel_id::text, guild_id, author_id, content,
-                created_at AS timestamp, edited_at AS edited_timestamp,
-                tts, mention_everyone, nonce, message_type, embeds, flags,
-                message_reference, sticker_ids, mentions, mention_roles,
-                (SELECT message_id FROM channel_pins WHERE message_id = messages.id) AS pinned,
-                ARRAY(SELECT ROW(id::text, message_id, channel_id, filename, filesize, image, height, width)
-                    FROM attachments
-                    WHERE message_id = messages.id)
-                AS attachments,
-                ARRAY(SELECT ROW(user_id, emoji_type, emoji_id, emoji_text)
-                    FROM message_reactions
-                    WHERE message_id = messages.id
-                    ORDER BY react_ts
-                ) AS reactions
-                {extra_clause}
-            FROM messages
-            {where_clause}
-            """,
-            *(args if args else [message_ids if message_ids else []]),
-        )
-
-        user_cache = {}
-        return await asyncio.gather(
-            *(
-                self.parse_message(dict(row), user_id, include_member, user_cache)
-                for row in rows
-            )
+        rows = await self.fetch_message_rows(
+            extra_clause,
+            where_clause,
+            args if args else [message_ids if message_ids else []],
         )
+        return await self.hydrate_messages(rows, user_id, include_member)
 
     async def get_invite(self, invite_code: str) -> Optional[Dict]:
         """Fetch invite information given its code."""
@@ -1355,14 +1819,12 @@ class Storage:
 
     async def get_guild_counts(self, guild_id: int) -> dict:
         """Fetch approximate member and presence counts for a guild."""
-        members = await self.get_members(guild_id)
         assert self.presence is not None
-        pres = await self.presence.guild_presences(members, guild_id)
-        online_count = sum(1 for p in pres if p["status"] != "offline")
-
         return {
-            "approximate_presence_count": online_count,
-            "approximate_member_count": len(members),
+            "approximate_presence_count": len(
+                self.presence.store.online_members(guild_id)
+            ),
+            "approximate_member_count": await self.get_member_count(guild_id),
         }
 
     async def get_dm(self, dm_id: int, user_id: Optional[int] = None) -> Optional[Dict]:
@@ -1372,14 +1834,8 @@ class Storage:
 
     async def guild_from_channel(self, channel_id: int) -> int:
         """Get the guild id coming from a channel id."""
-        return await self.db.fetchval(
-            """
-        SELECT guild_id
-        FROM guild_channels
-        WHERE id = $1
-        """,
-            channel_id,
-        )
+        route = await self.channel_route(channel_id)
+        return route[0] if route else None
 
     async def get_dm_peer(self, channel_id: int, user_id: int) -> int:
         """Get the peer id on a dm"""
@@ -1473,13 +1929,7 @@ class Storage:
 
     async def has_feature(self, guild_id: int, feature: str) -> bool:
         """Return if a certain guild has a certain feature."""
-        features = await self.db.fetchval(
-            """
-        SELECT features FROM guilds
-        WHERE id = $1
-        """,
-            guild_id,
-        )
+        features = (await self.guild_snapshot(guild_id))["features"]
         if features is None:
             return False
         features = cast(List[str], features)
@@ -200,6 +200,8 @@ async def send_sys_message(
         raise ValueError("Invalid system message type")
 
     message_id = await handler(channel_id, *args, **kwargs)
+    await app.storage.bump_last_message(channel_id, message_id)
+    app.search_indexer.enqueue([message_id])
     message = await app.storage.get_message(message_id, include_member=True)
     await app.dispatcher.channel.dispatch(channel_id, ("MESSAGE_CREATE", message))
     return message_id
@@ -8,13 +8,19 @@ import config
 
 from .ratelimits.bucket import RatelimitBucket
 from .ratelimits.main import RatelimitManager
+from .ratelimits.gcra import make_backend
 from .gateway.state_manager import StateManager
+from .replicas import ReplicaRouter
+from .statements import StatementRegistry
 from .storage import Storage
 from .user_storage import UserStorage
 from .images import IconManager
 from .dispatcher import EventDispatcher
 from .presence import PresenceManager
 from .guild_memory_store import GuildMemoryStore
+from .message_cache import MessageCache
+from .search import SearchIndexer
+from .typing_tracker import TypingTracker
 from .pubsub.lazy_guild import LazyGuildManager
 from .voice.manager import VoiceManager
 from .jobs import JobManager
@@ -42,12 +48,17 @@ class LitecordApp(Quart):
     loop: AbstractEventLoop
     ratelimiter: RatelimitManager
     state_manager: StateManager
+    replicas: ReplicaRouter
+    statements: StatementRegistry
     storage: Storage
     user_storage: UserStorage
     icons: IconManager
     dispatcher: EventDispatcher
     presence: PresenceManager
     guild_store: GuildMemoryStore
+    message_cache: MessageCache
+    search_indexer: SearchIndexer
+    typing: TypingTracker
     lazy_guild: LazyGuildManager
     voice: VoiceManager
 
@@ -67,8 +78,16 @@ class LitecordApp(Quart):
         self.session = ClientSession()
         self.winter_factory = SnowflakeFactory()
         self.loop = get_event_loop()
-        self.ratelimiter = RatelimitManager(self.config.get("_testing", False))
+        self.ratelimiter = RatelimitManager(
+            self.config.get("_testing", False),
+            make_backend(
+                self.config.get("RATELIMIT_BACKEND"),
+                self.config.get("RATELIMIT_SHM_NAME", "litecord_ratelimits"),
+                self.config.get("RATELIMIT_SLOTS", 1 << 18),
+            ),
+        )
         self.state_manager = StateManager()
+        self.statements = StatementRegistry(self.db, self.replicas)
         self.storage = Storage(self)
         self.user_storage = UserStorage(self.storage)
         self.icons = IconManager(self)
@@ -76,6 +95,20 @@ class LitecordApp(Quart):
         self.presence = PresenceManager(self)
         self.storage.presence = self.presence
         self.guild_store = GuildMemoryStore()
+        self.message_cache = MessageCache(
+            self.config.get("MESSAGE_CACHE_CHANNEL_SIZE", 100),
+            self.config.get("MESSAGE_CACHE_MAX_MESSAGES", 50000),
+        )
+        self.search_indexer = SearchIndexer(
+            self.statements,
+            self.config.get("SEARCH_INDEX_BATCH_SIZE", 500),
+            self.config.get("SEARCH_INDEX_INTERVAL", 0.5),
+        )
+        self.typing = TypingTracker(
+            self.config.get("TYPING_TTL", 10),
+            self.config.get("TYPING_REDISPATCH_INTERVAL", 8),
+            self.config.get("TYPING_CHANNEL_RATE", 0),
+        )
         self.lazy_guild = LazyGuildManager()
         self.voice = VoiceManager(self)
     @property
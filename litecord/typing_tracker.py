@@ -0,0 +1,161 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from logbook import Logger
+
+log = Logger(__name__)
+
+
+class _Typer:
+    """A user typing in a channel."""
+
+    __slots__ = ("dispatched_at", "expires_at")
+
+    def __init__(self, dispatched_at: float, expires_at: float):
+        self.dispatched_at = dispatched_at
+        self.expires_at = expires_at
+
+
+class TypingTracker:
+    """In-memory tracker of who is typing in each channel.
+
+    Clients keep triggering typing while the user types. A repeat
+    trigger within ``redispatch`` seconds of the last TYPING_START only
+    refreshes the entry, so subscribers get one event per stretch of
+    typing instead of one per trigger. Entries expire after ``ttl``
+    seconds without a trigger, or when the user sends a message.
+
+    With ``channel_rate`` set, each channel dispatches at most that many
+    TYPING_STARTs per second. This keeps the fan-out of huge channels
+    bounded when many users type at the same time.
+    """
+
+    def __init__(
+        self, ttl: float = 10.0, redispatch: float = 8.0, channel_rate: int = 0
+    ):
+        self.ttl = ttl
+        self.redispatch = redispatch
+        self.channel_rate = channel_rate
+
+        self._channels: Dict[int, Dict[int, _Typer]] = {}
+
+        #: start of the current one second window and the number of
+        #  dispatches in it, for every rate limited channel
+        self._windows: Dict[int, Tuple[float, int]] = {}
+
+        self.dispatched = 0
+        self.refreshed = 0
+        self.capped = 0
+
+    def _allow(self, channel_id: int, now: float) -> bool:
+        if not self.channel_rate:
+            return True
+
+        window_start, count = self._windows.get(channel_id, (now, 0))
+        if now - window_start >= 1:
+            window_start, count = now, 0
+
+        if count >= self.channel_rate:
+            return False
+
+        self._windows[channel_id] = (window_start, count + 1)
+        return True
+
+    def start(self, channel_id: int, user_id: int, now: Optional[float] = None) -> bool:
+        """Register a typing trigger.
+
+        Returns if a TYPING_START should be dispatched for it.
+        """
+        now = time.monotonic() if now is None else now
+        typers = self._channels.setdefault(channel_id, {})
+        typer = typers.get(user_id)
+
+        if (
+            typer is not None
+            and typer.expires_at > now
+            and now - typer.dispatched_at < self.redispatch
+        ):
+            typer.expires_at = now + self.ttl
+            self.refreshed += 1
+            return False
+
+        if not self._allow(channel_id, now):
+            # try again on the next trigger
+            if typer is not None:
+                typer.expires_at = now + self.ttl
+            self.capped += 1
+            return False
+
+        typers[user_id] = _Typer(now, now + self.ttl)
+        self.dispatched += 1
+        return True
+
+    def stop(self, channel_id: int, user_id: int):
+        """Stop tracking a user, usually because they sent a message."""
+        typers = self._channels.get(channel_id)
+        if typers is None:
+            return
+
+        typers.pop(user_id, None)
+        if not typers:
+            self._channels.pop(channel_id)
+
+    def typing(self, channel_id: int, now: Optional[float] = None) -> List[int]:
+        """Get the IDs of the users typing in a channel."""
+        now = time.monotonic() if now is None else now
+        return [
+            user_id
+            for user_id, typer in self._channels.get(channel_id, {}).items()
+            if typer.expires_at > now
+        ]
+
+    def sweep(self, now: Optional[float] = None):
+        """Remove expired entries."""
+        now = time.monotonic() if now is None else now
+
+        for channel_id, typers in list(self._channels.items()):
+            for user_id, typer in list(typers.items()):
+                if typer.expires_at <= now:
+                    typers.pop(user_id)
+
+            if not typers:
+                self._channels.pop(channel_id)
+
+        for channel_id, (window_start, _) in list(self._windows.items()):
+            if now - window_start >= 1:
+                self._windows.pop(channel_id)
+
+    async def sweep_job(self):
+        """Sweep expired entries every ttl."""
+        while True:
+            await asyncio.sleep(self.ttl)
+            self.sweep()
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._channels),
+            "typing": sum(map(len, self._channels.values())),
+            "dispatched": self.dispatched,
+            "refreshed": self.refreshed,
+            "capped": self.capped,
+        }
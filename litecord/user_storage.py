@@ -24,6 +24,56 @@ from litecord.enums import RelationshipType
 
 log = Logger(__name__)
 
+#: Statements run by UserStorage, see litecord.statements.
+STATEMENTS = {
+    "user_dm_ids": "SELECT dm_id FROM dm_channel_state WHERE user_id = $1",
+    "user_read_state": """
+        SELECT channel_id, last_message_id, mention_count
+        FROM user_read_state
+        WHERE user_id = $1
+    """,
+    "user_guild_ids": "SELECT guild_id FROM members WHERE user_id = $1",
+    "user_guild_roles": """
+        SELECT members.guild_id, ARRAY(
+            SELECT member_roles.role_id::text
+            FROM member_roles
+            WHERE member_roles.guild_id = members.guild_id
+              AND member_roles.user_id = members.user_id
+              AND member_roles.role_id <> members.guild_id
+        ) AS roles
+        FROM members
+        WHERE members.user_id = $1
+    """,
+    "mutual_guild_ids": """
+        SELECT guild_id FROM members WHERE user_id = $1
+        INTERSECT
+        SELECT guild_id FROM members WHERE user_id = $2
+    """,
+    "are_friends": """
+        SELECT
+            (
+                SELECT EXISTS(
+                    SELECT rel_type
+                    FROM relationships
+                    WHERE user_id = $1
+                      AND peer_id = $2
+                      AND rel_type = 1
+                )
+            )
+            AND
+            (
+                SELECT EXISTS(
+                    SELECT rel_type
+                    FROM relationships
+                    WHERE user_id = $2
+                      AND peer_id = $1
+                      AND rel_type = 1
+                )
+            )
+    """,
+    "user_gdm_ids": "SELECT id FROM group_dm_members WHERE member_id = $1",
+}
+
 
 class UserStorage:
     """Storage functions related to a single user."""
@@ -31,6 +81,8 @@ class UserStorage:
     def __init__(self, storage):
         self.storage = storage
         self.db = storage.db
+        self.statements = storage.statements
+        self.statements.register_many(STATEMENTS, STATEMENTS.keys())
 
     async def fetch_notes(self, user_id: int) -> dict:
         """Fetch a users' notes"""
@@ -203,14 +255,7 @@ class UserStorage:
         This will only fetch channels the user has in their state,
         which is different than the whole list of DM channels.
         """
-        dm_ids = await self.db.fetch(
-            """
-        SELECT dm_id
-        FROM dm_channel_state
-        WHERE user_id = $1
-        """,
-            user_id,
-        )
+        dm_ids = await self.statements.fetch("user_dm_ids", user_id)
 
         dm_ids = [r["dm_id"] for r in dm_ids]
 
@@ -224,14 +269,7 @@ class UserStorage:
 
     async def get_read_state(self, user_id: int) -> List[Dict[str, Any]]:
         """Get the read state for a user."""
-        rows = await self.db.fetch(
-            """
-        SELECT channel_id, last_message_id, mention_count
-        FROM user_read_state
-        WHERE user_id = $1
-        """,
-            user_id,
-        )
+        rows = await self.statements.fetch("user_read_state", user_id)
 
         res = []
 
@@ -326,17 +364,15 @@ class UserStorage:
 
     async def get_user_guilds(self, user_id: int) -> List[int]:
         """Get all guild IDs a user is on."""
-        guild_ids = await self.db.fetch(
-            """
-        SELECT guild_id
-        FROM members
-        WHERE user_id = $1
-        """,
-            user_id,
-        )
+        guild_ids = await self.statements.fetch("user_guild_ids", user_id)
 
         return [row["guild_id"] for row in guild_ids]
 
+    async def get_user_guild_roles(self, user_id: int) -> Dict[int, List[str]]:
+        """Get the role IDs a user has on each guild they are on."""
+        rows = await self.statements.fetch("user_guild_roles", user_id)
+        return {row["guild_id"]: row["roles"] for row in rows}
+
     async def get_mutual_guilds(self, user_id: int, peer_id: int) -> List[int]:
         """Get a list of guilds two separate users
         have in common."""
@@ -350,14 +386,8 @@ class UserStorage:
 
             return await self.get_user_guilds(user_id) or [0]
 
-        mutual_guilds = await self.db.fetch(
-            """
-        SELECT guild_id FROM members WHERE user_id = $1
-        INTERSECT
-        SELECT guild_id FROM members WHERE user_id = $2
-        """,
-            user_id,
-            peer_id,
+        mutual_guilds = await self.statements.fetch(
+            "mutual_guild_ids", user_id, peer_id
         )
 
         mutual_guilds = [r["guild_id"] for r in mutual_guilds]
@@ -369,43 +399,11 @@ class UserStorage:
 
         This returns false even if there is a friend request.
         """
-        return await self.db.fetchval(
-            """
-        SELECT
-            (
-                SELECT EXISTS(
-                    SELECT rel_type
-                    FROM relationships
-                    WHERE user_id = $1
-                      AND peer_id = $2
-                      AND rel_type = 1
-                )
-            )
-            AND
-            (
-                SELECT EXISTS(
-                    SELECT rel_type
-                    FROM relationships
-                    WHERE user_id = $2
-                      AND peer_id = $1
-                      AND rel_type = 1
-                )
-            )
-        """,
-            user_id,
-            peer_id,
-        )
+        return await self.statements.fetchval("are_friends", user_id, peer_id)
 
     async def get_gdms_internal(self, user_id) -> List[int]:
         """Return a list of Group DM IDs the user is a member of."""
-        rows = await self.db.fetch(
-            """
-        SELECT id
-        FROM group_dm_members
-        WHERE member_id = $1
-        """,
-            user_id,
-        )
+        rows = await self.statements.fetch("user_gdm_ids", user_id)
 
         return [r["id"] for r in rows]
 
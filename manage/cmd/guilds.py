@@ -0,0 +1,53 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+async def repair_member_roles(ctx, _args):
+    """Give the @everyone role to all members that are missing it.
+
+    Member reads skip the @everyone role, but role member listings
+    (used for @everyone overwrites and mentions) rely on it being
+    in member_roles.
+    """
+    res = await ctx.db.execute(
+        """
+    INSERT INTO member_roles (user_id, guild_id, role_id)
+    SELECT members.user_id, members.guild_id, members.guild_id
+    FROM members
+    JOIN roles ON roles.id = members.guild_id
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM member_roles
+        WHERE member_roles.user_id = members.user_id
+          AND member_roles.guild_id = members.guild_id
+          AND member_roles.role_id = members.guild_id
+    )
+    """
+    )
+
+    print("repaired", res.split()[-1], "members")
+
+
+def setup(subparser):
+    repair_parser = subparser.add_parser(
+        "repair_member_roles",
+        help="Add missing @everyone roles to members",
+        description=repair_member_roles.__doc__,
+    )
+    repair_parser.set_defaults(func=repair_member_roles)
@@ -0,0 +1,11 @@
+ALTER TABLE channels
+    ADD COLUMN last_message_id bigint DEFAULT NULL;
+
+UPDATE channels
+    SET last_message_id = latest.id
+    FROM (
+        SELECT channel_id, MAX(id) AS id
+        FROM messages
+        GROUP BY channel_id
+    ) AS latest
+    WHERE latest.channel_id = channels.id;
@@ -0,0 +1,4 @@
+-- the primary key of members starts with user_id, so listing the members
+-- of a guild had to scan the whole table.
+CREATE INDEX IF NOT EXISTS members_guild_id_user_id_idx
+    ON members (guild_id, user_id);
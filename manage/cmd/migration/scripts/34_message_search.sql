@@ -0,0 +1,48 @@
+-- full text search on message content. searches must use the exact same
+-- expression as the index, see litecord.search.CONTENT_TSVECTOR
+CREATE INDEX IF NOT EXISTS messages_content_tsv_idx
+    ON messages USING GIN (to_tsvector('simple', COALESCE(content, '')));
+
+-- structured search filters, kept up to date when messages,
+-- their attachments, embeds or pins change.
+CREATE TABLE IF NOT EXISTS message_search (
+    message_id bigint REFERENCES messages (id) ON DELETE CASCADE PRIMARY KEY,
+    channel_id bigint,
+    guild_id bigint DEFAULT NULL,
+
+    has_link boolean NOT NULL DEFAULT false,
+    has_embed boolean NOT NULL DEFAULT false,
+    has_sticker boolean NOT NULL DEFAULT false,
+    has_attachment boolean NOT NULL DEFAULT false,
+    has_image boolean NOT NULL DEFAULT false,
+    has_video boolean NOT NULL DEFAULT false,
+    has_sound boolean NOT NULL DEFAULT false,
+    pinned boolean NOT NULL DEFAULT false,
+
+    mention_ids bigint[] NOT NULL DEFAULT array[]::bigint[],
+    link_hostnames text[] NOT NULL DEFAULT array[]::text[],
+    attachment_filenames text[] NOT NULL DEFAULT array[]::text[],
+    attachment_extensions text[] NOT NULL DEFAULT array[]::text[],
+    embed_types text[] NOT NULL DEFAULT array[]::text[],
+    embed_providers text[] NOT NULL DEFAULT array[]::text[]
+);
+
+CREATE INDEX IF NOT EXISTS message_search_channel_id_idx
+    ON message_search (channel_id, message_id);
+
+CREATE INDEX IF NOT EXISTS message_search_mention_ids_idx
+    ON message_search USING GIN (mention_ids);
+
+CREATE INDEX IF NOT EXISTS message_search_link_hostnames_idx
+    ON message_search USING GIN (link_hostnames);
+
+CREATE INDEX IF NOT EXISTS message_search_attachment_extensions_idx
+    ON message_search USING GIN (attachment_extensions);
+
+CREATE INDEX IF NOT EXISTS message_search_embed_types_idx
+    ON message_search USING GIN (embed_types);
+
+CREATE INDEX IF NOT EXISTS message_search_embed_providers_idx
+    ON message_search USING GIN (embed_providers);
+
+-- existing messages are indexed by ./manage.py search_backfill
@@ -0,0 +1,6 @@
+-- progress of the search_backfill manage command, so it can resume
+CREATE TABLE IF NOT EXISTS search_backfill_checkpoints (
+    name text PRIMARY KEY,
+    last_message_id bigint NOT NULL,
+    updated_at timestamp without time zone DEFAULT (now() at time zone 'utc')
+);
@@ -0,0 +1,7 @@
+-- prefix member name queries of guilds without an in-memory index.
+-- text_pattern_ops lets LIKE 'abc%' use the index in any collation.
+CREATE INDEX IF NOT EXISTS users_username_prefix_idx
+    ON users (lower(username) text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS members_nickname_prefix_idx
+    ON members (lower(nickname) text_pattern_ops);
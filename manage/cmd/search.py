@@ -0,0 +1,116 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from litecord.search import INDEX_QUERY
+
+CHECKPOINT = "messages"
+
+
+async def search_backfill(ctx, args):
+    """Index existing messages for search, oldest first.
+
+    Progress is saved after every chunk, so an interrupted backfill
+    picks up where it stopped when run again.
+    """
+    if args.restart:
+        await ctx.db.execute(
+            """
+        DELETE FROM search_backfill_checkpoints
+        WHERE name = $1
+        """,
+            CHECKPOINT,
+        )
+
+    last_id = await ctx.db.fetchval(
+        """
+    SELECT last_message_id
+    FROM search_backfill_checkpoints
+    WHERE name = $1
+    """,
+        CHECKPOINT,
+    )
+    last_id = last_id or 0
+
+    remaining = await ctx.db.fetchval(
+        """
+    SELECT COUNT(*)
+    FROM messages
+    WHERE id > $1
+    """,
+        last_id,
+    )
+    print("indexing", remaining, "messages after", last_id)
+
+    indexed = 0
+    while True:
+        message_ids = await ctx.db.fetch(
+            """
+        SELECT id
+        FROM messages
+        WHERE id > $1
+        ORDER BY id ASC
+        LIMIT $2
+        """,
+            last_id,
+            args.chunk_size,
+        )
+        message_ids = [row["id"] for row in message_ids]
+        if not message_ids:
+            break
+
+        async with ctx.db.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(INDEX_QUERY, message_ids)
+                await conn.execute(
+                    """
+                INSERT INTO search_backfill_checkpoints (name, last_message_id)
+                VALUES ($1, $2)
+                ON CONFLICT (name) DO UPDATE SET
+                    last_message_id = EXCLUDED.last_message_id,
+                    updated_at = (now() at time zone 'utc')
+                """,
+                    CHECKPOINT,
+                    message_ids[-1],
+                )
+
+        last_id = message_ids[-1]
+        indexed += len(message_ids)
+        print(f"indexed {indexed}/{remaining} messages (last id {last_id})")
+
+    print("done")
+
+
+def setup(subparser):
+    backfill_parser = subparser.add_parser(
+        "search_backfill",
+        help="Index existing messages for search",
+        description=search_backfill.__doc__,
+    )
+    backfill_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="How many messages to index per query",
+    )
+    backfill_parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore saved progress and index every message again",
+    )
+    backfill_parser.set_defaults(func=search_backfill)
@@ -28,7 +28,7 @@ from logbook import Logger
 
 from run import init_app_managers, init_app_db
 from manage.cmd.migration import migration
-from manage.cmd import users, invites
+from manage.cmd import users, invites, guilds, search
 
 log = Logger(__name__)
 
@@ -72,6 +72,8 @@ def init_parser():
     migration(subparser)
     users.setup(subparser)
     invites.setup(subparser)
+    guilds.setup(subparser)
+    search.setup(subparser)
 
     return parser
 
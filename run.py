@@ -99,9 +99,10 @@ from litecord.jobs import JobManager
 from litecord.voice.manager import VoiceManager
 from litecord.guild_memory_store import GuildMemoryStore
 from litecord.pubsub.lazy_guild import LazyGuildManager
+from litecord.replicas import ReplicaRouter
 
 from litecord.gateway.gateway import websocket_handler
-from litecord.json import LitecordJSONProvider
+from litecord.json import LitecordJSONProvider, pg_set_json
 
 from litecord.typing_hax import LitecordApp, request
 
@@ -211,6 +212,7 @@ async def app_before_request():
             raise BadRequest(50041)
 
     await ratelimit_handler()
+    app.replicas.route_request(request.method, getattr(request, "user_id", None))
 
 
 @app.after_request
@@ -235,7 +237,7 @@ async def app_after_request(resp: Response):
 
 
 def _set_rtl_reset(bucket: RatelimitBucket, resp: Response):
-    reset = bucket._window + bucket.second
+    reset = bucket.reset_at
     precision = request.headers.get("x-ratelimit-precision", "millisecond")
 
     if precision == "second":
@@ -256,7 +258,7 @@ async def app_set_ratelimit_headers(resp: Response):
             return resp
 
         resp.headers["X-RateLimit-Limit"] = str(bucket.requests)
-        resp.headers["X-RateLimit-Remaining"] = str(bucket._tokens)
+        resp.headers["X-RateLimit-Remaining"] = str(bucket.remaining)
         resp.headers["X-RateLimit-Global"] = str(request.bucket_global).lower()
         _set_rtl_reset(bucket, resp)
 
@@ -276,9 +278,19 @@ async def init_app_db(app_: LitecordApp):
     Also spawns the job scheduler.
     """
     log.info("db connect")
-    pool = await asyncpg.create_pool(**app.config["POSTGRES"])
+    pool = await asyncpg.create_pool(**app.config["POSTGRES"], init=pg_set_json)
     assert pool is not None
     app_.db = pool
+
+    replicas = []
+    for replica_config in app.config.get("POSTGRES_REPLICAS", []):
+        replica = await asyncpg.create_pool(**replica_config, init=pg_set_json)
+        assert replica is not None
+        replicas.append(replica)
+
+    app_.replicas = ReplicaRouter(
+        pool, replicas, app.config.get("POSTGRES_REPLICA_MAX_LAG", 5)
+    )
     app_.sched = JobManager(context_func=app.app_context)
     app.init_managers()
 
@@ -343,6 +355,12 @@ async def post_app_start(app_: LitecordApp):
     app_.sched.spawn(payment_job())
     app_.sched.spawn(api_index(app_))
     app_.sched.spawn(guild_region_check())
+    app_.sched.spawn(app_.search_indexer.index_job())
+    app_.sched.spawn(app_.typing.sweep_job())
+    app_.sched.spawn(app_.ratelimiter.sweep_job())
+
+    if app_.replicas.replicas:
+        app_.sched.spawn(app_.replicas.lag_job())
 
 
 def start_websocket(host, port, ws_handler) -> asyncio.Future:
@@ -397,7 +415,17 @@ async def app_after_serving():
 
     app.sched.close()
 
+    if app.ratelimiter.backend is not None:
+        app.ratelimiter.backend.close()
+
+    # index whatever is still queued before the pool goes away
+    try:
+        await app.search_indexer.flush()
+    except Exception:
+        log.exception("failed to flush search index")
+
     log.info("closing db")
+    await app.replicas.close()
     await app.db.close()
 
 
@@ -0,0 +1,98 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""Benchmark ratelimit bucket lookups with many active keys.
+
+Run with ``python tests/bench_ratelimits.py [keys]``.
+"""
+
+import sys
+import os
+import time
+import tracemalloc
+
+sys.path.append(os.getcwd())
+
+from litecord.ratelimits.bucket import Ratelimit  # noqa: E402
+from litecord.ratelimits.gcra import GCRARatelimit, LocalBackend  # noqa: E402
+
+
+def scan_expired(ratelimit: Ratelimit):
+    """Full cache scan, the way expired buckets used to be found."""
+    current = time.time()
+    dead_keys = [k for k, v in ratelimit._cache.items() if current > v._last + v.second]
+    for k in dead_keys:
+        del ratelimit._cache[k]
+
+
+def bench(keys: int, lookups: int = 10000):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    ratelimit = Ratelimit(120, 60)
+    for key in range(keys):
+        ratelimit.get_bucket(key).update_rate_limit()
+
+    usage = sum(
+        stat.size_diff
+        for stat in tracemalloc.take_snapshot().compare_to(before, "filename")
+    )
+    tracemalloc.stop()
+    print(f"{keys} keys: {usage / keys:.0f} bytes per key")
+
+    start = time.perf_counter()
+    for key in range(lookups):
+        ratelimit.get_bucket(key % keys).update_rate_limit()
+    elapsed = time.perf_counter() - start
+    print(f"  lookup: {elapsed / lookups * 1e6:.2f}us")
+
+    start = time.perf_counter()
+    for key in range(lookups // 100):
+        scan_expired(ratelimit)
+        ratelimit.get_bucket(key % keys).update_rate_limit()
+    elapsed = time.perf_counter() - start
+    print(f"  lookup with a full scan: {elapsed / (lookups // 100) * 1e6:.2f}us")
+
+    # make every bucket expire, the next lookup drops them all
+    start = time.perf_counter()
+    ratelimit.sweep(time.time() + 61)
+    elapsed = time.perf_counter() - start
+    print(f"  sweep of {keys} expired buckets: {elapsed * 1e3:.2f}ms")
+    assert not ratelimit._cache
+
+
+def bench_gcra(keys: int, lookups: int = 10000):
+    backend = LocalBackend(keys * 2)
+    ratelimit = GCRARatelimit("bench", 120, 60, backend)
+    for key in range(keys):
+        ratelimit.get_bucket(key).update_rate_limit()
+
+    print(f"{keys} keys on GCRA: {len(backend.table.buf) / keys:.0f} bytes per key")
+
+    start = time.perf_counter()
+    for key in range(lookups):
+        ratelimit.get_bucket(key % keys).update_rate_limit()
+    elapsed = time.perf_counter() - start
+    print(f"  lookup: {elapsed / lookups * 1e6:.2f}us")
+
+
+if __name__ == "__main__":
+    keys = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    bench(keys)
+    bench_gcra(keys)
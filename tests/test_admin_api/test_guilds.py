@@ -17,6 +17,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import json
 import secrets
 
 import pytest
@@ -112,3 +113,37 @@ async def test_guild_create_voice(test_cli_staff):
             """,
             region_id,
         )
+
+
+@pytest.mark.asyncio
+async def test_guild_members(test_cli_staff):
+    """Test paginating and streaming the members of a guild."""
+    user = await test_cli_staff.create_user()
+    guild = await test_cli_staff.create_guild()
+
+    resp = await test_cli_staff.put(f"/api/v6/guilds/{guild.id}/members/{user.id}")
+    assert resp.status_code == 200
+
+    member_ids = sorted([str(test_cli_staff.user["id"]), str(user.id)], key=int)
+
+    resp = await test_cli_staff.get(
+        f"/api/v6/admin/guilds/{guild.id}/members", query_string={"limit": 1}
+    )
+    assert resp.status_code == 200
+    rjson = await resp.json
+    assert [member["user"]["id"] for member in rjson] == member_ids[:1]
+
+    resp = await test_cli_staff.get(
+        f"/api/v6/admin/guilds/{guild.id}/members",
+        query_string={"limit": 1, "after": member_ids[0]},
+    )
+    assert resp.status_code == 200
+    rjson = await resp.json
+    assert [member["user"]["id"] for member in rjson] == member_ids[1:]
+
+    resp = await test_cli_staff.get(
+        f"/api/v6/admin/guilds/{guild.id}/members", query_string={"stream": "true"}
+    )
+    assert resp.status_code == 200
+    rjson = json.loads(await resp.get_data(as_text=True))
+    assert [member["user"]["id"] for member in rjson] == member_ids
@@ -16,10 +16,14 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
+import asyncio
 import secrets
 
 import pytest
 
+from litecord.common.guilds import add_member
+from litecord.presence import BasePresence
+
 
 @pytest.mark.asyncio
 async def test_guild_create(test_cli_user):
@@ -78,3 +82,108 @@ async def test_guild_create(test_cli_user):
     resp = await test_cli_user.delete(f"/api/v6/guilds/{guild_id}")
 
     assert resp.status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_guild_roles_refresh(test_cli_user):
+    """Test that role changes show up on the guild payload after
+    it was cached."""
+    guild = await test_cli_user.create_guild()
+
+    resp = await test_cli_user.get(f"/api/v6/guilds/{guild.id}")
+    assert resp.status_code == 200
+    assert len((await resp.json)["roles"]) == 1
+
+    resp = await test_cli_user.post(
+        f"/api/v6/guilds/{guild.id}/roles", json={"name": "cached"}
+    )
+    assert resp.status_code == 200
+    role_id = (await resp.json)["id"]
+
+    resp = await test_cli_user.get(f"/api/v6/guilds/{guild.id}")
+    assert resp.status_code == 200
+    assert role_id in [role["id"] for role in (await resp.json)["roles"]]
+
+    resp = await test_cli_user.delete(f"/api/v6/guilds/{guild.id}/roles/{role_id}")
+    assert resp.status_code == 204
+
+    resp = await test_cli_user.get(f"/api/v6/guilds/{guild.id}")
+    assert resp.status_code == 200
+    assert role_id not in [role["id"] for role in (await resp.json)["roles"]]
+
+
+@pytest.mark.asyncio
+async def test_guild_member_query(test_cli_user):
+    """Test member queries by name prefix, before and after
+    the guild gets an in-memory name index."""
+    guild = await test_cli_user.create_guild()
+    user_id = str(test_cli_user.user["id"])
+    username = test_cli_user.user["username"]
+    app = test_cli_user.app
+
+    async def _query(query):
+        async with app.app_context():
+            members = await app.storage.query_members(guild.id, query, 10)
+        return [member["user"]["id"] for member in members]
+
+    # the first query builds the index in the background
+    assert await _query(username[:4].upper()) == [user_id]
+    for _ in range(100):
+        if app.storage.member_names.query(guild.id, "", 1) is not None:
+            break
+        await asyncio.sleep(0.01)
+
+    assert await _query(username[:4].upper()) == [user_id]
+    assert await _query(username[2:]) == []
+
+    resp = await test_cli_user.patch(
+        f"/api/v6/guilds/{guild.id}/members/@me/nick", json={"nick": "zz_indexed"}
+    )
+    assert resp.status_code == 200
+    assert await _query("zz_ind") == [user_id]
+    assert await _query(username) == [user_id]
+
+
+@pytest.mark.asyncio
+async def test_guild_large(test_cli_user):
+    """Test that large guilds only come with their online members
+    and the requesting user."""
+    guild = await test_cli_user.create_guild()
+    user_id = test_cli_user.user["id"]
+    online = await test_cli_user.create_user()
+    offline = await test_cli_user.create_user()
+    app = test_cli_user.app
+
+    async with app.app_context():
+        await add_member(guild.id, online.id)
+        await add_member(guild.id, offline.id)
+
+    app.presence.store.set(online.id, BasePresence(status="online"), [guild.id])
+    try:
+        async with app.app_context():
+            members, member_count, is_large = await app.storage.get_sync_members(
+                guild.id, 2, user_id
+            )
+            assert is_large
+            assert member_count == 3
+            assert members.keys() == {user_id, online.id}
+
+            full = await app.storage.get_guild_full(guild.id, user_id, 2)
+            assert full["large"]
+            assert full["member_count"] == 3
+            assert {member["user"]["id"] for member in full["members"]} == {
+                str(user_id),
+                str(online.id),
+            }
+            assert [pres["user"]["id"] for pres in full["presences"]] == [
+                str(online.id)
+            ]
+
+            # at the threshold, every member and presence is sent
+            full = await app.storage.get_guild_full(guild.id, user_id, 3)
+            assert not full["large"]
+            assert full["member_count"] == 3
+            assert len(full["members"]) == 3
+            assert len(full["presences"]) == 3
+    finally:
+        app.presence.store.set(online.id, BasePresence(status="offline"), [])
@@ -0,0 +1,360 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import random
+import sys
+import os
+
+sys.path.append(os.getcwd())
+
+import pytest
+
+from litecord.permissions import EMPTY_PERMISSIONS
+from litecord.pubsub import lazy_guild
+from litecord.pubsub.lazy_guild import (
+    GroupInfo,
+    GuildMemberList,
+    ListMember,
+    LazyGuildManager,
+    Operation,
+)
+
+GROUP_IDS = [10, 11, "online", "offline"]
+
+# a small pool of names, so that display names repeat
+NAMES = ["alice", "Alice", "bob", "0cool", "zed", "Zed", "mallory"]
+
+
+def _make_list(member_count: int, rng: random.Random) -> GuildMemberList:
+    gml = GuildMemberList(1, 1, (1, "everyone"))
+    gml.list.groups = [
+        GroupInfo(group_id, str(group_id), position, EMPTY_PERMISSIONS)
+        for position, group_id in enumerate(GROUP_IDS)
+    ]
+    gml.list.reset_groups()
+
+    for member_id in range(100, 100 + member_count):
+        _add_member(gml, member_id, rng)
+
+    gml.list.sort()
+    return gml
+
+
+def _add_member(gml: GuildMemberList, member_id: int, rng: random.Random):
+    member = {
+        "user": {"id": str(member_id), "username": rng.choice(NAMES)},
+        "nick": rng.choice([None, None, rng.choice(NAMES)]),
+    }
+    gml.list.members[member_id] = ListMember(member, {"status": "online"}, ())
+    gml.list.add(rng.choice(GROUP_IDS), member_id, gml._sort_key(member_id))
+
+
+def _naive_items(gml: GuildMemberList) -> list:
+    """List every item of a member list, one group at a time."""
+    items = []
+    for group, member_ids in gml.list:
+        if not member_ids:
+            continue
+
+        items.append({"group": {"id": str(group.gid), "count": len(member_ids)}})
+        for member_id in member_ids:
+            items.append({"member": gml.list.members[member_id].item})
+
+    return items
+
+
+def _shuffle_list(gml: GuildMemberList, rng: random.Random):
+    """Insert, remove and move members between groups."""
+    member_ids = list(gml.list.members)
+
+    for member_id in rng.sample(member_ids, len(member_ids) // 3):
+        gml.list.remove(gml.list.member_groups[member_id], member_id)
+        gml.list.members[member_id].nick = rng.choice(NAMES)
+        gml.list.insert(rng.choice(GROUP_IDS), member_id, gml._sort_key(member_id))
+
+    for member_id in rng.sample(member_ids, len(member_ids) // 10):
+        gml.list.remove(gml.list.member_groups[member_id], member_id)
+        gml.list.members.pop(member_id)
+
+    for member_id in range(1000, 1000 + len(member_ids) // 10):
+        _add_member(gml, member_id, rng)
+        group_id = gml.list.member_groups[member_id]
+        gml.list.remove(group_id, member_id)
+        gml.list.insert(group_id, member_id, gml._sort_key(member_id))
+
+
+def _assert_items(gml: GuildMemberList):
+    items = _naive_items(gml)
+    assert gml.items == items
+
+    for start in range(0, len(items) + 5, 7):
+        for end in (start, start + 1, start + 50, start + 99, len(items) + 10):
+            assert gml.get_items(start, end) == items[start:end]
+
+    for member_id in gml.list.members:
+        item = items[gml.list.item_index(member_id)]
+        assert item["member"]["user"]["id"] == str(member_id)
+
+
+def test_member_list_items():
+    """Test that range items match a full listing of the member list"""
+    rng = random.Random(1)
+    gml = _make_list(300, rng)
+    _assert_items(gml)
+
+    _shuffle_list(gml, rng)
+    _assert_items(gml)
+
+    # emptying a group shifts every group after it
+    for member_id in list(gml.list.data[11]):
+        gml.list.remove(11, member_id)
+        gml.list.members.pop(member_id)
+    _assert_items(gml)
+
+
+def test_member_list_positions():
+    """Test member positions after inserts and removals across groups"""
+    rng = random.Random(2)
+    gml = _make_list(200, rng)
+
+    # everyone gets the same display name, leaving
+    # only the member IDs to break ties
+    for member_id in list(gml.list.members)[::2]:
+        gml.list.remove(gml.list.member_groups[member_id], member_id)
+        gml.list.members[member_id].nick = "alice"
+        gml.list.insert(rng.choice(GROUP_IDS), member_id, gml._sort_key(member_id))
+
+    _shuffle_list(gml, rng)
+
+    items = _naive_items(gml)
+    for group_id, member_ids in gml.list.data.items():
+        keys = [gml._sort_key(member_id) for member_id in member_ids]
+        assert keys == sorted(keys)
+        assert gml.list.keys[group_id] == keys
+
+        for rel_index, member_id in enumerate(member_ids):
+            assert gml.list.member_groups[member_id] == group_id
+            assert gml.list.relative_index(member_id) == rel_index
+
+            item = items[gml.list.item_index(member_id)]
+            assert item["member"]["user"]["id"] == str(member_id)
+
+    assert gml.list.relative_index(1) is None
+    assert gml.list.item_index(1) is None
+
+
+def test_range_index():
+    """Test that subscriptions are found through the range index"""
+    rng = random.Random(3)
+    gml = _make_list(10, rng)
+
+    for session_id in range(50):
+        for _ in range(rng.randint(1, 3)):
+            start = rng.randrange(0, 3000, 100)
+            # mostly narrow ranges, with a few too wide to be indexed
+            size = rng.choice([99, 99, 199, 5000])
+            gml._add_range(str(session_id), start, start + size)
+
+    assert gml._wide_subs
+    for item_index in range(0, 8000, 37):
+        scanned = [
+            session_id
+            for session_id in gml.state
+            if gml._is_subbed(item_index, session_id)
+        ]
+        assert sorted(gml._get_subs(item_index)) == sorted(scanned)
+
+    for session_id in range(25):
+        gml._drop_session(str(session_id))
+
+    for session_id in range(25, 50):
+        gml.unsub(str(session_id))
+
+    assert not gml.state
+    assert not gml._range_index
+    assert not gml._wide_subs
+    assert gml._get_subs(0) == []
+
+
+def _update(index: int, version: int = 0) -> Operation:
+    return Operation("UPDATE", {"index": index, "item": {"version": version}})
+
+
+def _sync(start: int, end: int) -> Operation:
+    return Operation("SYNC", {"range": [start, end], "items": []})
+
+
+def test_coalesce(monkeypatch):
+    """Test merging the queued operations of a session"""
+    monkeypatch.setattr(
+        lazy_guild,
+        "app",
+        type("App", (), {"config": {"LAZY_GUILD_COALESCE_MAX_OPS": 5}}),
+    )
+    gml = _make_list(300, random.Random(4))
+
+    # an UPDATE replaces the previous UPDATE of the same item
+    first, second, other = _update(3), _update(3, 1), _update(4)
+    assert gml._coalesce("a", [first, other, second]) == [other, second]
+
+    # a SYNC replaces the UPDATEs and SYNCs inside its range
+    sync = _sync(0, 99)
+    outside, after = _update(150), _update(6)
+    ops = [_update(5), _sync(10, 20), outside, sync, after]
+    assert gml._coalesce("a", ops) == [outside, sync, after]
+
+    # nothing is merged across an INSERT or a DELETE
+    insert = Operation("INSERT", {"index": 1, "item": {}})
+    delete = Operation("DELETE", {"index": 2})
+    ops = [_update(3), insert, _update(3), delete, _sync(0, 99)]
+    assert gml._coalesce("a", ops) == ops
+
+    # too many operations become SYNCs of the ranges they touch
+    gml._add_range("a", 0, 99)
+    gml._add_range("a", 100, 199)
+    ops = [_update(index) for index in range(120, 130)]
+    assert gml._coalesce("a", ops) == [
+        Operation("SYNC", {"range": [100, 199], "items": gml.get_items(100, 199)})
+    ]
+
+
+class _Storage:
+    overwrites = {
+        5: [],
+        6: [{"id": 2, "allow": 1024, "deny": 0}],
+        7: [{"id": 3, "allow": 1024, "deny": 0}],
+    }
+
+    async def guild_from_channel(self, channel_id):
+        return 1
+
+    async def chan_overwrites(self, channel_id, safe=True):
+        return self.overwrites[channel_id]
+
+
+class _StateManager:
+    def fetch_raw(self, session_id):
+        if session_id != "live":
+            raise KeyError(session_id)
+
+        return object()
+
+
+@pytest.mark.asyncio
+async def test_lazy_guild_eviction(monkeypatch):
+    """Test that only idle member lists are evicted over the memory budget"""
+    fake_app = type(
+        "App",
+        (),
+        {
+            "config": {"LAZY_GUILD_MEMORY_BUDGET": 1000},
+            "storage": _Storage(),
+            "state_manager": _StateManager(),
+        },
+    )
+    monkeypatch.setattr(lazy_guild, "app", fake_app)
+    manager = LazyGuildManager()
+
+    live = await manager.get_gml(5)
+    dead = await manager.get_gml(6)
+    unused = await manager.get_gml(7)
+    live._add_range("live", 0, 99)
+    dead._add_range("dead", 0, 99)
+    for gml in (live, dead, unused):
+        gml.memory = 400
+
+    # the live list becomes the most recently used one
+    assert await manager.get_gml(5) is live
+
+    # the least recently used idle list goes first, and only until
+    # the lists fit in the budget
+    manager.evict()
+    assert list(manager.lists.values()) == [unused, live]
+    assert dead.guild_id == 0 and not dead.state
+    assert 6 not in manager.state
+
+    # lists with live subscribers are kept, even over the budget
+    live.memory = 2000
+    manager.evict()
+    assert list(manager.lists.values()) == [live]
+    assert manager.evictions == 2
+
+    stats = manager.stats()
+    assert stats["lists"] == 1
+    assert stats["channels"] == 1
+    assert stats["memory"] == 2000
+    assert stats["budget"] == 1000
+    assert stats["evictions"] == 2
+    assert stats["per_list"][0]["subscribers"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lazy_guild_rekey(monkeypatch):
+    """Test that subscribers follow a channel to its new member list"""
+    storage = _Storage()
+    storage.overwrites = {**_Storage.overwrites, 8: _Storage.overwrites[6]}
+    fake_app = type(
+        "App",
+        (),
+        {"config": {}, "storage": storage, "state_manager": _StateManager()},
+    )
+    monkeypatch.setattr(lazy_guild, "app", fake_app)
+
+    queries = []
+
+    async def shard_query(self, session_id, ranges):
+        queries.append((self.channel_id, session_id, ranges))
+        for start, end in ranges:
+            self._add_range(session_id, start, end)
+
+    async def everyone_allow(gml):
+        return False
+
+    monkeypatch.setattr(GuildMemberList, "shard_query", shard_query)
+    monkeypatch.setattr(lazy_guild, "everyone_allow", everyone_allow)
+    manager = LazyGuildManager()
+
+    old = await manager.get_gml(6)
+    assert await manager.get_gml(8) is old
+    old._add_range("live", 100, 199)
+    old._add_range("live", 0, 99)
+    old._add_range("dead", 0, 99)
+
+    # nothing to move while the overwrites stay the same
+    await manager.chan_update(6)
+    assert manager.state[6] is old
+    assert queries == []
+
+    storage.overwrites[6] = [{"id": 4, "allow": 1024, "deny": 0}]
+    await manager.chan_update(6)
+
+    new = manager.state[6]
+    assert new is not old
+    assert new.list_key != old.list_key
+    assert manager.lists[new.list_key] is new
+
+    # only live sessions are moved, keeping every range they had
+    assert queries == [(6, "live", [(0, 99), (100, 199)])]
+    assert new.state == {"live": {(0, 99), (100, 199)}}
+
+    # the old list keeps serving the channel still using it
+    assert manager.state[8] is old
+    assert old.channel_ids == {8}
+    assert old.channel_id == 8
+    assert "live" in old.state
@@ -0,0 +1,107 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import asyncio
+import sys
+import os
+
+sys.path.append(os.getcwd())
+
+import pytest
+
+from litecord.message_cache import MessageCache
+
+
+def _row(message_id: int, content: str = "", channel_id: int = 1) -> dict:
+    return {"id": message_id, "channel_id": channel_id, "content": content}
+
+
+@pytest.mark.asyncio
+async def test_edit_during_fetch():
+    """Test that a message edited while it is fetched isn't cached"""
+    cache = MessageCache()
+    db = {10: _row(10, "old")}
+    fetching = asyncio.Event()
+    edited = asyncio.Event()
+
+    async def get_message(message_id):
+        # same as Storage.get_message on a cache miss
+        with cache.fill() as since:
+            row = dict(db[message_id])
+            fetching.set()
+            await edited.wait()
+            cache.put(row, since)
+        return row
+
+    async def edit_message(message_id):
+        await fetching.wait()
+        db[message_id]["content"] = "new"
+        cache.invalidate(message_id)
+        edited.set()
+
+    row, _ = await asyncio.gather(get_message(10), edit_message(10))
+    assert row["content"] == "old"
+    assert cache.get(10) is None
+
+    # once nothing is in flight, fills are cached again
+    with cache.fill() as since:
+        cache.put(dict(db[10]), since)
+    assert cache.get(10)["content"] == "new"
+    assert not cache._written
+
+
+def test_writes_during_latest_fill():
+    """Test that put_latest is skipped after writes during the fill"""
+    cache = MessageCache()
+
+    with cache.fill() as since:
+        rows = [_row(message_id) for message_id in (3, 2, 1)]
+        cache.created(1, 4)
+        cache.put_latest(1, rows, 50, since)
+    assert cache.latest_ids(1, 50) is None
+
+    with cache.fill() as since:
+        rows = [_row(message_id) for message_id in (4, 3, 2, 1)]
+        cache.delete(2)
+        cache.put_latest(1, rows, 50, since)
+    assert cache.latest_ids(1, 50) is None
+
+    # writes to other channels and messages don't matter
+    with cache.fill() as since:
+        cache.invalidate(100)
+        cache.created(2, 101)
+        cache.put_latest(1, rows, 50, since)
+    assert cache.latest_ids(1, 50) == [4, 3, 2, 1]
+
+
+def test_created_messages():
+    """Test that new messages show up in the cached latest messages"""
+    cache = MessageCache()
+    cache.put_latest(1, [_row(message_id) for message_id in (2, 1)], 50)
+
+    cache.created(1, 3)
+    assert cache.latest_ids(1, 50) == [3, 2, 1]
+
+    # the new message has to be fetched before use
+    assert cache.get_many([3, 2]).keys() == {2}
+
+    # channels without their latest messages cached are left alone
+    cache.created(2, 4)
+    assert cache.latest_ids(2, 50) is None
+    assert cache.get(4) is None
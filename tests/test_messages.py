@@ -116,3 +116,90 @@ async def test_message_pinning(test_cli_user):
     assert resp.status_code == 200
     rjson = await resp.json
     assert len(rjson) == 0
+
+
+async def test_message_listing_cache(test_cli_user):
+    guild = await test_cli_user.create_guild()
+    channel = await test_cli_user.create_guild_channel(guild_id=guild.id)
+    messages = []
+    for _ in range(5):
+        messages.append(
+            await test_cli_user.create_message(guild_id=guild.id, channel_id=channel.id)
+        )
+
+    async def _latest_page():
+        resp = await test_cli_user.get(f"/api/v6/channels/{channel.id}/messages")
+        assert resp.status_code == 200
+        return await resp.json
+
+    # the second listing is served from memory, and must match the first
+    first_page = await _latest_page()
+    assert [m["id"] for m in first_page] == [
+        str(message.id) for message in reversed(messages)
+    ]
+    assert await _latest_page() == first_page
+
+    # edits, pins and deletes must be visible on the cached page
+    edited, pinned, deleted = messages[0], messages[1], messages[2]
+
+    resp = await test_cli_user.patch(
+        f"/api/v6/channels/{channel.id}/messages/{edited.id}",
+        json={"content": "awooga"},
+    )
+    assert resp.status_code == 200
+
+    resp = await test_cli_user.put(f"/api/v6/channels/{channel.id}/pins/{pinned.id}")
+    assert resp.status_code == 204
+
+    resp = await test_cli_user.delete(
+        f"/api/v6/channels/{channel.id}/messages/{deleted.id}"
+    )
+    assert resp.status_code == 204
+
+    new_message = await test_cli_user.create_message(
+        guild_id=guild.id, channel_id=channel.id
+    )
+
+    page = {m["id"]: m for m in await _latest_page()}
+    assert str(new_message.id) in page
+    assert str(deleted.id) not in page
+    assert page[str(edited.id)]["content"] == "awooga"
+    assert page[str(pinned.id)]["pinned"]
+
+
+async def test_message_search(test_cli_user):
+    guild = await test_cli_user.create_guild()
+    channel = await test_cli_user.create_guild_channel(guild_id=guild.id)
+    await test_cli_user.create_message(
+        guild_id=guild.id, channel_id=channel.id, content="hello world"
+    )
+    linked = await test_cli_user.create_message(
+        guild_id=guild.id,
+        channel_id=channel.id,
+        content="awooga see https://Example.com/page",
+    )
+
+    # messages are indexed in the background
+    async with test_cli_user.app.app_context():
+        await test_cli_user.app.search_indexer.flush()
+
+    async def _search(**query):
+        resp = await test_cli_user.get(
+            f"/api/v6/guilds/{guild.id}/messages/search", query_string=query
+        )
+        assert resp.status_code == 200
+        return await resp.json
+
+    rjson = await _search(content="awoo")
+    assert rjson["total_results"] == 1
+    assert rjson["messages"][0][0]["id"] == str(linked.id)
+    assert rjson["messages"][0][0]["hit"]
+
+    rjson = await _search(link_hostname="example.com")
+    assert [m[0]["id"] for m in rjson["messages"]] == [str(linked.id)]
+
+    rjson = await _search(has="link")
+    assert [m[0]["id"] for m in rjson["messages"]] == [str(linked.id)]
+
+    rjson = await _search(content="nothing matches this")
+    assert rjson["total_results"] == 0
@@ -0,0 +1,166 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.append(os.getcwd())
+
+import pytest
+
+import litecord.presence
+from litecord.presence import BasePresence, PresenceManager, PresenceStore
+
+
+def test_presence_store_set():
+    """Test setting presences in the presence store"""
+    store = PresenceStore()
+    online = BasePresence(status="online")
+
+    store.set(1, online, [10, 11])
+    store.set(2, BasePresence(status="idle"), [10])
+    assert store.get(1) is online
+    assert store.online_members(10) == {1, 2}
+    assert store.online_members(11) == {1}
+
+    # leaving a guild while online
+    store.set(1, BasePresence(status="dnd"), [10])
+    assert store.get(1).status == "dnd"
+    assert store.online_members(10) == {1, 2}
+    assert store.online_members(11) == set()
+
+    # going offline removes the user from every guild
+    store.set(2, BasePresence(status="offline"), [10])
+    assert store.get(2).status == "offline"
+    assert store.online_members(10) == {1}
+    assert 2 not in store.presences
+    assert 2 not in store.user_guilds
+
+    assert store.get(3).status == "offline"
+    assert store.stats() == {"online_users": 1, "guilds": 1, "online_members": 1}
+
+
+def test_presence_store_membership():
+    """Test guild joins, leaves and deletions in the presence store"""
+    store = PresenceStore()
+    store.set(1, BasePresence(status="online"), [10])
+    store.set(2, BasePresence(status="online"), [10, 11])
+
+    # only online users are counted when joining
+    store.join(11, 1)
+    store.join(11, 3)
+    assert store.online_members(11) == {1, 2}
+
+    store.leave(10, 1)
+    assert store.online_members(10) == {2}
+    assert store.user_guilds[1] == {11}
+
+    # the last online member leaving drops the guild
+    store.leave(10, 2)
+    assert 10 not in store.guild_online
+    assert store.online_members(10) == set()
+
+    store.drop_guild(11)
+    assert store.online_members(11) == set()
+    assert store.user_guilds == {1: set(), 2: set()}
+
+    # users stay online after their guilds are gone
+    assert store.get(1).status == "online"
+    store.set(1, BasePresence(status="offline"), [])
+    assert 1 not in store.user_guilds
+
+
+def _state(status: str, game=None):
+    return SimpleNamespace(
+        current_shard=0, shard_count=1, presence=BasePresence(status, game)
+    )
+
+
+def _presence_app(monkeypatch, states: dict, dispatches: list):
+    async def get_user(user_id):
+        return {"id": str(user_id)}
+
+    async def get_user_guild_roles(user_id):
+        return {}
+
+    async def friend_dispatch(user_id, event):
+        dispatches.append((user_id, event[1]["status"]))
+
+    fake = type(
+        "App",
+        (),
+        {
+            "config": {"PRESENCE_DEBOUNCE_WINDOW": 0.01},
+            "sched": SimpleNamespace(spawn=asyncio.ensure_future),
+            "storage": SimpleNamespace(get_user=get_user),
+            "user_storage": SimpleNamespace(get_user_guild_roles=get_user_guild_roles),
+            "state_manager": SimpleNamespace(
+                user_states=lambda user_id: states.get(user_id, [])
+            ),
+            "dispatcher": SimpleNamespace(
+                friend=SimpleNamespace(dispatch=friend_dispatch)
+            ),
+        },
+    )
+    monkeypatch.setattr(litecord.presence, "app", fake)
+    return PresenceManager(fake)
+
+
+@pytest.mark.asyncio
+async def test_presence_debounce(monkeypatch):
+    """Test that presence changes in one window are dispatched once"""
+    states, dispatches = {}, []
+    presence = _presence_app(monkeypatch, states, dispatches)
+
+    # a user connecting, changing status twice, and another user connecting
+    states[1] = [_state("online")]
+    await presence.update_pres(1)
+    states[1] = [_state("idle")]
+    await presence.update_pres(1)
+    states[1] = [_state("dnd"), _state("idle")]
+    await presence.update_pres(1)
+    states[2] = [_state("online")]
+    await presence.update_pres(2)
+    assert presence.stats()["pending"] == 2
+
+    await asyncio.sleep(0.05)
+    assert sorted(dispatches) == [(1, "idle"), (2, "online")]
+    assert presence.coalesced == 2
+    assert presence.dispatched == 2
+    assert presence.store.get(1).status == "idle"
+
+    # the merged presence ends the window where it started
+    dispatches.clear()
+    states[1] = [_state("online")]
+    await presence.update_pres(1)
+    states[1] = [_state("idle")]
+    await presence.update_pres(1)
+
+    await asyncio.sleep(0.05)
+    assert dispatches == []
+    assert presence.dropped == 1
+
+    # the last session going away dispatches an offline presence
+    states[1] = []
+    await presence.update_pres(1)
+    await asyncio.sleep(0.05)
+    assert dispatches == [(1, "offline")]
+    assert presence.stats()["online_users"] == 1
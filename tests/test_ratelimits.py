@@ -25,6 +25,7 @@ sys.path.append(os.getcwd())
 import pytest
 
 from litecord.ratelimits.bucket import Ratelimit
+from litecord.ratelimits.gcra import GCRARatelimit, LocalBackend
 
 
 def test_ratelimit():
@@ -36,6 +37,39 @@ def test_ratelimit():
     assert retry_after <= 10
 
 
+def test_ratelimit_expiry():
+    """Test that only buckets past their window are dropped."""
+    r = Ratelimit(5, 10)
+    for key in range(100):
+        r.get_bucket(key).update_rate_limit()
+
+    # only the first key stays in use past the others' window
+    bucket = r.get_bucket(0)
+    bucket._last += 15
+    r.sweep(bucket._last - 4)
+    assert list(r._cache) == [0]
+
+    r.sweep(bucket._last + 11)
+    assert not r._cache
+
+
+def test_gcra_ratelimit():
+    """Test GCRA ratelimiting"""
+    r = GCRARatelimit("test", 5, 5, LocalBackend(64))
+    bucket = r.get_bucket(0)
+
+    for remaining in range(4, -1, -1):
+        assert bucket.update_rate_limit() is None
+        assert bucket.remaining == remaining
+
+    retry_after = bucket.update_rate_limit()
+    assert isinstance(retry_after, float)
+    assert 0 < retry_after <= 1
+
+    # other keys are untouched
+    assert r.get_bucket(1).remaining == 5
+
+
 @pytest.mark.asyncio
 async def test_ratelimit_headers(test_cli):
     """Test if the basic ratelimit headers are sent."""
@@ -0,0 +1,138 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import asyncio
+import contextvars
+import sys
+import os
+
+sys.path.append(os.getcwd())
+
+import pytest
+
+from litecord.replicas import ReplicaRouter
+from litecord.statements import StatementRegistry
+
+
+class _Pool:
+    """Pool that answers every query with its own name."""
+
+    def __init__(self, name: str, error: Exception = None):
+        self.name = name
+        self.error = error
+        self.queries = 0
+
+    async def fetchval(self, query, *args):
+        self.queries += 1
+        if self.error is not None:
+            raise self.error
+
+        return self.name
+
+
+def _in_request(router: ReplicaRouter, method: str, user_id=None):
+    """Route a request in its own context, and give the pool it reads from."""
+
+    def _request():
+        router.route_request(method, user_id)
+        return router.read_pool()
+
+    return contextvars.copy_context().run(_request)
+
+
+def _router(*lags) -> ReplicaRouter:
+    router = ReplicaRouter(
+        _Pool("primary"), [_Pool(f"replica{idx}") for idx in range(len(lags))]
+    )
+    router.lag.update(enumerate(lags))
+    return router
+
+
+def test_sticky_primary():
+    """Test that users read from the primary after writing"""
+    router = _router(0)
+    replica = router.replicas[0]
+
+    assert _in_request(router, "GET", 1) is replica
+    assert _in_request(router, "POST", 1) is router.primary
+    assert _in_request(router, "GET", 1) is router.primary
+
+    # other users and anonymous requests are unaffected
+    assert _in_request(router, "GET", 2) is replica
+    assert _in_request(router, "GET") is replica
+
+    # the user goes back to replicas once the lag window is over
+    router._sticky[1] = 0
+    assert _in_request(router, "GET", 1) is replica
+    assert 1 not in router._sticky
+
+    # reads outside of a request always go to the primary
+    assert router.read_pool() is router.primary
+
+
+def test_read_pool_health():
+    """Test that lagged and failed replicas are skipped"""
+    router = _router(10, None, 1)
+    for _ in range(3):
+        assert _in_request(router, "GET") is router.replicas[2]
+
+    router.mark_failed(router.replicas[2])
+    assert router.lag[2] is None
+    assert _in_request(router, "GET") is router.primary
+
+
+@pytest.mark.asyncio
+async def test_check_lag():
+    """Test that lag checks mark broken replicas as unusable"""
+    router = _router(0, 0)
+    router.replicas[0].name = 2.5
+    router.replicas[1].error = RuntimeError("canceling statement due to timeout")
+
+    await router.check_lag()
+    assert router.lag == {0: 2.5, 1: None}
+
+
+@pytest.mark.asyncio
+async def test_statement_fallback():
+    """Test that replica statements fall back to the primary"""
+    router = _router(0)
+    registry = StatementRegistry(router.primary, router)
+    registry.register("replica_safe", "SELECT 1", replica=True)
+    registry.register("primary_only", "SELECT 2")
+
+    async def _fetch(name):
+        # tasks run in a copy of the current context, like requests do
+        return await asyncio.ensure_future(_request_fetch(name))
+
+    async def _request_fetch(name):
+        router.route_request("GET", None)
+        return await registry.fetchval(name)
+
+    assert await _fetch("replica_safe") == "replica0"
+    assert await _fetch("primary_only") == "primary"
+
+    router.replicas[0].error = ConnectionResetError()
+    assert await _fetch("replica_safe") == "primary"
+    assert router.lag[0] is None
+
+    # the failed replica isn't tried again until its next lag check
+    queries = router.replicas[0].queries
+    assert await _fetch("replica_safe") == "primary"
+    assert router.replicas[0].queries == queries
+    assert registry.stats()["replica_safe"]["calls"] == 3
@@ -0,0 +1,85 @@
+"""
+
+Litecord
+Copyright (C) 2018-2021  Luna Mendes and Litecord Contributors
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import os
+
+sys.path.append(os.getcwd())
+
+from litecord.typing_tracker import TypingTracker
+
+
+def test_typing_redispatch():
+    """Test that repeated typing triggers only refresh the entry"""
+    tracker = TypingTracker(ttl=10, redispatch=8)
+
+    assert tracker.start(1, 100, now=0)
+    assert not tracker.start(1, 100, now=5)
+    assert tracker.typing(1, now=14) == [100]
+
+    # past the redispatch interval, subscribers are told again
+    assert tracker.start(1, 100, now=8)
+
+    # an expired entry dispatches on the next trigger
+    assert tracker.typing(1, now=18) == []
+    assert tracker.start(1, 100, now=18)
+
+    assert tracker.stats()["dispatched"] == 3
+    assert tracker.stats()["refreshed"] == 1
+
+
+def test_typing_channel_rate():
+    """Test the per channel cap of typing dispatches"""
+    tracker = TypingTracker(channel_rate=2)
+
+    assert tracker.start(1, 100, now=0)
+    assert tracker.start(1, 101, now=0.1)
+    assert not tracker.start(1, 102, now=0.2)
+
+    # other channels have their own window
+    assert tracker.start(2, 102, now=0.2)
+
+    # capped users try again on their next trigger
+    assert tracker.start(1, 102, now=1.0)
+    assert tracker.stats()["capped"] == 1
+
+
+def test_typing_stop_and_sweep():
+    """Test removing typing entries"""
+    tracker = TypingTracker(ttl=10, redispatch=8, channel_rate=5)
+    tracker.start(1, 100, now=0)
+    tracker.start(1, 101, now=5)
+    tracker.start(2, 100, now=0)
+
+    tracker.stop(2, 100)
+    tracker.stop(3, 100)
+    assert tracker.typing(2, now=1) == []
+    assert tracker.stats()["channels"] == 1
+
+    # the message resets the entry, the next trigger dispatches again
+    tracker.stop(1, 101)
+    assert tracker.start(1, 101, now=6)
+
+    tracker.sweep(now=12)
+    assert tracker.typing(1, now=12) == [101]
+    assert tracker.stats()["typing"] == 1
+
+    tracker.sweep(now=16)
+    assert tracker.stats()["channels"] == 0
+    assert not tracker._windows